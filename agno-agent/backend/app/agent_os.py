@@ -1,8 +1,10 @@
 """AgentOS setup for production-ready agent runtime."""
+from typing import Optional
 from agno.os import AgentOS
-from app.agents.helpdesk import get_helpdesk_agent
-from app.agents.assistant import get_assistant_agent
-from app.core.knowledge_base import get_knowledge_base
+from app.core.startup import timed
+
+# Singleton AgentOS instance
+_agent_os_instance: Optional[AgentOS] = None
 
 
 def create_agent_os() -> AgentOS:
@@ -16,20 +18,35 @@ def create_agent_os() -> AgentOS:
     - Horizontal scalability
     """
     
-    # Get agents and knowledge
-    helpdesk_agent = get_helpdesk_agent()
-    assistant_agent = get_assistant_agent()
+    # Get agents and knowledge (imported here, so their dependencies are
+    # timed as their own startup component)
+    with timed("agents"):
+        from app.agents.assistant import get_assistant_agent
+        from app.agents.helpdesk import get_helpdesk_agent
+
+        helpdesk_agent = get_helpdesk_agent()
+        assistant_agent = get_assistant_agent()
     # knowledge = get_knowledge_base()
     
     # Create AgentOS
-    agent_os = AgentOS(
-        description="Electrodry AI Helpdesk - Production Runtime",
-        agents=[helpdesk_agent, assistant_agent],
-        # knowledge=[knowledge],
-    )
+    with timed("agent_os"):
+        agent_os = AgentOS(
+            description="Electrodry AI Helpdesk - Production Runtime",
+            agents=[helpdesk_agent, assistant_agent],
+            # knowledge=[knowledge],
+        )
     
     return agent_os
 
 
-# Create the AgentOS instance
-agent_os = create_agent_os()
+def get_agent_os() -> AgentOS:
+    """
+    Get or create the AgentOS instance.
+
+    Building the agents does not open connections or call external
+    services; those are created on first use (or by the startup warm-up).
+    """
+    global _agent_os_instance
+    if _agent_os_instance is None:
+        _agent_os_instance = create_agent_os()
+    return _agent_os_instance
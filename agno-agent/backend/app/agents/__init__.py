@@ -1,6 +1,20 @@
-"""Agno agent definitions."""
-from app.agents.helpdesk import get_helpdesk_agent
-from app.agents.assistant import get_assistant_agent
+"""Agno agent definitions.
 
-__all__ = ["get_helpdesk_agent", "get_assistant_agent"]
+The agent modules are imported on first access, so importing a submodule
+(e.g. ``app.agents.price_router``) does not build the agents' dependencies.
+"""
+from typing import Any
 
+__all__ = ["get_assistant_agent", "get_helpdesk_agent"]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "get_helpdesk_agent":
+        from app.agents.helpdesk import get_helpdesk_agent
+
+        return get_helpdesk_agent
+    if name == "get_assistant_agent":
+        from app.agents.assistant import get_assistant_agent
+
+        return get_assistant_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,13 @@
 """Simple general assistant agent implementation using Agno."""
 from typing import Optional
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
-from app.core.config import settings
 from app.core.database import get_agent_db
 from app.core.knowledge_base import get_knowledge_base
+from app.core.metrics import record_run_metrics, tool_timing_hook
+from app.core.model_router import get_agent_model
+from app.core.rolling_summary import load_rolling_summary, update_rolling_summary
+from app.knowledge.prefetch import finish_knowledge_prefetch, injects_prefetched, start_knowledge_prefetch
+from app.knowledge.retrieval import get_knowledge_retriever
 
 # Singleton agent instance
 _agent_instance: Optional[Agent] = None
@@ -22,16 +25,20 @@ def create_assistant_agent() -> Agent:
     agent = Agent(
         id="general-assistant",  # Required for AgentOS compatibility
         name="General AI Assistant",
-        model=OpenAIChat(
-            id=settings.openrouter_model,
-            api_key=settings.openrouter_api_key,
-            base_url=settings.openrouter_base_url if hasattr(settings, 'openrouter_base_url') else None
-        ),
+        model=get_agent_model("general-assistant"),  # Fallback chain, hedging, fast path
         db=db,
         knowledge=knowledge,
         search_knowledge=True,
+        knowledge_retriever=get_knowledge_retriever("general-assistant"),  # Hybrid search + top-k
+        # Prefetched chunks go into the prompt with KNOWLEDGE_PREFETCH_INJECT
+        add_knowledge_to_context=injects_prefetched("general-assistant"),
         add_history_to_context=True,
         num_history_runs=5,  # Include last 5 conversation turns for context
+        # Older turns are folded into a rolling summary in the background
+        add_session_summary_to_context=True,
+        pre_hooks=[start_knowledge_prefetch, load_rolling_summary],
+        tool_hooks=[tool_timing_hook],
+        post_hooks=[finish_knowledge_prefetch, record_run_metrics, update_rolling_summary],
         instructions=[
             "You are a helpful AI assistant that can answer any question the user wants.",
             "Always be polite, clear, and informative in your responses.",
@@ -1,26 +1,52 @@
 """Helpdesk agent implementation using Agno."""
-from typing import Dict, Any, List, Optional, AsyncIterator
+from typing import Dict, Any, List, Mapping, Optional, AsyncIterator
 from uuid import uuid4
 import json
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
-from agno.tools import tool
 from app.core.config import settings
 from app.core.database import get_supabase, get_agent_db
 from app.core.knowledge_base import get_knowledge_base
-from app.agents.tools import lookup_price
+from app.knowledge.prefetch import finish_knowledge_prefetch, injects_prefetched, start_knowledge_prefetch
+from app.knowledge.retrieval import get_knowledge_retriever
+from app.core.metrics import record_run_metrics, tool_timing_hook
+from app.core.model_router import get_agent_model
+from app.core.rolling_summary import load_rolling_summary, update_rolling_summary
+from app.core.response_cache import cache_response_hook
+from app.core.tool_runtime import agent_tool
+from app.agents.pricing import normalize_service_type
+from app.agents.tools import lookup_price, lookup_prices
+from app.knowledge.scope import remember_scope_hook
 
 # Singleton agent instance
 _agent_instance: Optional[Agent] = None
 
 
-@tool
+def _quote_key(request: Mapping[str, Any]) -> List[Any]:
+    return [
+        normalize_service_type(str(request.get("service_type") or "")),
+        str(request.get("postcode") or "").strip(),
+        request.get("area_size") or None,
+        request.get("item_count") or None,
+    ]
+
+
+def _price_key(arguments: Dict[str, Any]) -> str:
+    return json.dumps(_quote_key(arguments), default=str)
+
+
+def _bulk_price_key(arguments: Dict[str, Any]) -> str:
+    requests = arguments.get("requests") or []
+    return json.dumps([_quote_key(r) if isinstance(r, Mapping) else r for r in requests], default=str)
+
+
+# Quotes are pure given the pricing table (reloads clear the cache)
+@agent_tool(cache_ttl=settings.price_tool_cache_ttl, cache_key=_price_key)
 def price_lookup_tool(
     service_type: str,
     postcode: str,
     area_size: Optional[float] = None,
     item_count: Optional[int] = None
-) -> str:
+) -> Dict[str, Any]:
     """
     Look up pricing for Electrodry services.
     
@@ -31,10 +57,24 @@ def price_lookup_tool(
         item_count: Number of items (optional)
     
     Returns:
-        JSON string with pricing information
+        Pricing information
+    """
+    return lookup_price(service_type, postcode, area_size, item_count)
+
+
+@agent_tool(cache_ttl=settings.price_tool_cache_ttl, cache_key=_bulk_price_key)
+def bulk_price_lookup_tool(requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Look up pricing for several Electrodry services or locations at once.
+    
+    Args:
+        requests: List of objects with service_type, postcode and optional
+            area_size/item_count
+    
+    Returns:
+        One pricing result per request
     """
-    result = lookup_price(service_type, postcode, area_size, item_count)
-    return json.dumps(result, indent=2)
+    return lookup_prices(requests)
 
 
 def create_helpdesk_agent() -> Agent:
@@ -50,16 +90,18 @@ def create_helpdesk_agent() -> Agent:
     agent = Agent(
         id="helpdesk-assistant",  # Required for AgentOS compatibility
         name="Electrodry Helpdesk Assistant",
-        model=OpenAIChat(
-            id=settings.openrouter_model,
-            api_key=settings.openrouter_api_key,
-            base_url=settings.openrouter_base_url if hasattr(settings, 'openrouter_base_url') else None
-        ),
+        model=get_agent_model("helpdesk-assistant"),  # Fallback chain, hedging, fast path
         knowledge=knowledge,
         search_knowledge=True,  # Enable agentic RAG
+        knowledge_retriever=get_knowledge_retriever("helpdesk-assistant"),  # Hybrid search + top-k
+        # Prefetched chunks go into the prompt with KNOWLEDGE_PREFETCH_INJECT
+        add_knowledge_to_context=injects_prefetched("helpdesk-assistant"),
         db=db,  # Fixed: use 'db' instead of 'storage'
         add_history_to_context=True,  # Fixed: correct parameter name
         num_history_runs=5,  # Include last 5 conversation turns for context
+        # Older turns are folded into a rolling summary in the background
+        add_session_summary_to_context=True,
+        pre_hooks=[start_knowledge_prefetch, load_rolling_summary],
         # # Session state for tracking user context
         session_state={
             "user_preferences": {},
@@ -68,13 +110,22 @@ def create_helpdesk_agent() -> Agent:
         },
         # add_session_state_to_context=True,  # Make session state available to agent
         # enable_agentic_state=True,  # Allow agent to update session state automatically
-        tools=[price_lookup_tool],
+        tools=[price_lookup_tool, bulk_price_lookup_tool],
+        # Price lookups scope later knowledge searches to their region/service
+        tool_hooks=[tool_timing_hook, remember_scope_hook],
+        # Store self-contained first-turn answers in the semantic response cache
+        post_hooks=(
+            [finish_knowledge_prefetch, record_run_metrics, update_rolling_summary, cache_response_hook]
+            if settings.response_cache_enabled
+            else [finish_knowledge_prefetch, record_run_metrics, update_rolling_summary]
+        ),
         instructions=[
             "You are a helpful customer service assistant for Electrodry, a professional cleaning company.",
             "Always be polite, professional, and maintain the Electrodry brand voice.",
             "Always search your knowledge base before answering questions.",
             "Always cite sources when providing information from the knowledge base.",
             "For pricing inquiries, use the price_lookup_tool to provide accurate quotes.",
+            "When comparing several services or locations, use the bulk_price_lookup_tool once instead of repeated lookups.",
             "If service is not available in a customer's region, politely explain and suggest alternatives.",
             "Never make up pricing information - always use the tool.",
             "Be concise but thorough in your responses.",
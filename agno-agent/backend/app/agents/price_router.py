@@ -0,0 +1,334 @@
+"""Fast path for self-contained price quote requests.
+
+Many helpdesk turns are pure quotes ("carpet cleaning 40 sqm in 3000").
+Instead of an LLM call deciding to run ``price_lookup_tool`` and a second
+one wording the result, ``PriceRouterMiddleware`` parses such messages
+locally, calls ``lookup_price`` and answers from a template.
+
+The parser is deliberately strict: the message must name exactly one
+service and one postcode, carry the size the service is priced by (area
+or item count) and contain nothing else than quote filler words. Anything
+else - follow-ups, several services, questions about the service itself,
+unknown postcodes - goes to the agent as before.
+
+Answered turns are stored in the agent session like a regular run, so the
+conversation can continue with the agent.
+"""
+import asyncio
+import logging
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.agents.pricing import PricingTable, get_pricing_table
+from app.agents.tools import lookup_price, lookup_prices
+from app.core.asgi import (
+    match_run,
+    parse_form,
+    read_body,
+    record_run,
+    replay_body,
+    run_response,
+)
+from app.core.metrics import FAST_PATH_SECONDS_SAVED, FAST_PATH_TURNS
+
+logger = logging.getLogger(__name__)
+
+# Words naming each built-in service; other services are matched by their name
+SERVICE_KEYWORDS: Dict[str, List[str]] = {
+    "carpet_cleaning": ["carpet", "carpets", "rug", "rugs"],
+    "upholstery_cleaning": [
+        "upholstery", "couch", "couches", "sofa", "sofas", "lounge", "lounges", "armchair", "armchairs",
+        "chair", "chairs",
+    ],
+    "tile_cleaning": ["tile", "tiles", "grout", "tiled"],
+}
+
+# Words that may surround the details of a quote request
+FILLER_WORDS = {
+    "a", "an", "the", "my", "our", "for", "of", "in", "at", "to", "on", "with", "me", "i", "we", "us",
+    "is", "it", "be", "would", "could", "can", "get", "give", "need", "want", "like", "please", "pls",
+    "what", "whats", "what's", "how", "much", "does", "do", "price", "prices", "pricing", "cost", "costs",
+    "quote", "quotes", "estimate", "rate", "clean", "cleaning", "cleaned", "service", "postcode",
+    "area", "size", "total", "approx", "approximately", "about", "around", "hi", "hello", "hey",
+    "thanks", "thank", "you", "sqm", "m2", "square", "metres", "meters", "items", "item", "pieces",
+    "piece",
+}
+
+_AREA = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(?:sqm|sq\.?\s*m(?:etres|eters)?|square\s+met(?:re|er)s?|m2|m²|metres?\s+squared)\b"
+)
+# Only the count is consumed; the word after it may name the service ("2 couches").
+# Seat counts ("3 seater sofa") are not item counts and go to the agent.
+_ITEMS = re.compile(
+    r"\b(\d+)(?=\s*(?:items?|pieces?|chairs?|armchairs?|couch(?:es)?|sofas?|lounges?)\b)"
+)
+_POSTCODE = re.compile(r"\b\d{4}\b")
+# Price questions the parser could not answer are the baseline for the latency saved
+_PRICE_QUESTION = re.compile(r"\b(?:price|prices|pricing|cost|costs|quote|quotes|estimate|how much)\b")
+_WORD = re.compile(r"[a-z0-9'²]+")
+_MAX_WORDS = 30
+
+
+@dataclass
+class PriceQuery:
+    """Parameters of a quote request, ready for ``lookup_price``."""
+
+    service_type: str
+    postcode: str
+    area_size: Optional[float] = None
+    item_count: Optional[int] = None
+
+
+def _service_keywords(table: PricingTable) -> Dict[str, str]:
+    """Keyword -> service for every service in the pricing table."""
+    keywords: Dict[str, str] = {}
+    for service in table.services:
+        words = SERVICE_KEYWORDS.get(service) or [w for w in service.split("_") if w != "cleaning"]
+        for word in words:
+            keywords[word] = service
+    return keywords
+
+
+def parse_price_query(text: str, table: Optional[PricingTable] = None) -> Optional[PriceQuery]:
+    """
+    Extract a quote request from a message.
+
+    Returns:
+        The request, or None when the message is not an unambiguous quote
+    """
+    table = table or get_pricing_table()
+    text = text.lower().replace("m²", " sqm")
+    if len(text.split()) > _MAX_WORDS or "?" in text.rstrip("?"):
+        return None
+
+    area = [float(m.group(1)) for m in _AREA.finditer(text)]
+    items = [int(m.group(1)) for m in _ITEMS.finditer(text)]
+    rest = _ITEMS.sub(" ", _AREA.sub(" ", text))
+    postcodes = set(_POSTCODE.findall(rest))
+    rest = _POSTCODE.sub(" ", rest)
+
+    keywords = _service_keywords(table)
+    services = set()
+    for word in _WORD.findall(rest):
+        if word in keywords:
+            services.add(keywords[word])
+        elif word not in FILLER_WORDS:
+            # Anything we do not understand (numbers included) goes to the agent
+            return None
+    if len(services) != 1 or len(postcodes) != 1 or len(area) > 1 or len(items) > 1:
+        return None
+
+    service = services.pop()
+    s = table.service_index[service]
+    query = PriceQuery(service_type=service, postcode=postcodes.pop())
+    if not math.isnan(table.per_sqm[s]):
+        if not area:
+            return None
+        query.area_size = area[0]
+    elif not math.isnan(table.per_item[s]):
+        if not items:
+            return None
+        query.item_count = items[0]
+    return query
+
+
+def _service_label(service_type: str) -> str:
+    return service_type.replace("_", " ")
+
+
+def render_quote(query: PriceQuery, result: Dict[str, Any]) -> Optional[str]:
+    """
+    Word a pricing result in the helpdesk's voice.
+
+    Returns:
+        The answer, or None when the result needs the agent (e.g. an
+        unknown postcode)
+    """
+    service = _service_label(query.service_type)
+    if result.get("available"):
+        lines = [
+            "Thanks for getting in touch! Here is your Electrodry quote:",
+            "",
+            f"- **Service:** {service.capitalize()}",
+            f"- **Postcode:** {query.postcode} ({result['region']})",
+        ]
+        if query.area_size is not None:
+            lines.append(f"- **Area:** {query.area_size:g} sqm")
+        if query.item_count is not None:
+            lines.append(f"- **Items:** {query.item_count}")
+        lines += [
+            f"- **Estimated price:** ${result['final_price']:,.2f} {result['currency']}",
+            "",
+            "This estimate includes regional pricing for your area; the final price is confirmed "
+            "when you book. Would you like to book a clean, or is there anything else I can help with?",
+            "",
+            "*Source: Electrodry service pricing*",
+        ]
+        return "\n".join(lines)
+
+    region = result.get("region")
+    if region is None:
+        return None
+    others = [s for s in get_pricing_table().services if s != query.service_type]
+    alternatives = [
+        _service_label(r["service_type"])
+        for r in lookup_prices([{"service_type": s, "postcode": query.postcode} for s in others])
+        if r.get("available")
+    ]
+    answer = (
+        f"Thanks for getting in touch! Unfortunately {service} isn't currently available in "
+        f"{region} (postcode {query.postcode}), so I can't give you a quote for it there."
+    )
+    if alternatives:
+        answer += (
+            f" We can still help with {' and '.join(alternatives)} in your area - "
+            "would you like a quote for one of those instead?"
+        )
+    return answer + "\n\n*Source: Electrodry service pricing*"
+
+
+def is_price_question(text: str) -> bool:
+    """Whether a message asks for a price, answerable by the fast path or not."""
+    return bool(_PRICE_QUESTION.search(text.lower()))
+
+
+def answer_price_query(text: str) -> Optional[str]:
+    """Templated answer to a pure quote request, or None to let the agent answer."""
+    query = parse_price_query(text)
+    if query is None:
+        return None
+    result = lookup_price(query.service_type, query.postcode, query.area_size, query.item_count)
+    return render_quote(query, result)
+
+
+class FastPathStats:
+    """Hit rate and latency saved by the fast path of one agent."""
+
+    def __init__(self, agent_id: str):
+        self.agent_id = agent_id
+        self.answered = 0
+        self.fallbacks = 0
+        self.seconds_saved = 0.0
+        # Moving averages of agent runs and fast-path answers
+        self.agent_seconds: Optional[float] = None
+        self.fast_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ewma(average: Optional[float], value: float) -> float:
+        return value if average is None else 0.9 * average + 0.1 * value
+
+    def record_answer(self, seconds: float) -> None:
+        with self._lock:
+            self.answered += 1
+            self.fast_seconds = self._ewma(self.fast_seconds, seconds)
+            saved = max(0.0, (self.agent_seconds or 0.0) - seconds)
+            self.seconds_saved += saved
+        FAST_PATH_TURNS.labels(self.agent_id, "answered").inc()
+        FAST_PATH_SECONDS_SAVED.labels(self.agent_id).inc(saved)
+
+    def record_fallback(self, agent_seconds: float, price_question: bool) -> None:
+        """
+        Count a run passed to the agent.
+
+        Only price questions update the agent run time the fast path is
+        compared with; other conversations are not what it replaces.
+        """
+        with self._lock:
+            self.fallbacks += 1
+            if price_question:
+                self.agent_seconds = self._ewma(self.agent_seconds, agent_seconds)
+        FAST_PATH_TURNS.labels(self.agent_id, "fallback").inc()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.answered + self.fallbacks
+        return {
+            "answered": self.answered,
+            "fallbacks": self.fallbacks,
+            "hit_rate": round(self.answered / total, 4) if total else 0.0,
+            "avg_fast_path_ms": round(self.fast_seconds * 1000, 1) if self.fast_seconds is not None else None,
+            "avg_agent_run_ms": round(self.agent_seconds * 1000, 1) if self.agent_seconds is not None else None,
+            "seconds_saved": round(self.seconds_saved, 2),
+        }
+
+
+# Stats per agent id
+_stats: Dict[str, FastPathStats] = {}
+
+
+def get_fast_path_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit rate and latency saved per agent."""
+    return {agent_id: stats.stats() for agent_id, stats in _stats.items()}
+
+
+class PriceRouterMiddleware:
+    """
+    ASGI middleware answering pure quote requests in front of the agent.
+
+    Intercepts ``POST /agents/{agent_id}/runs`` for the configured agents
+    and falls through to AgentOS when the message is not an unambiguous
+    quote, or on any error.
+    """
+
+    def __init__(self, app: ASGIApp, agent_ids: List[str]):
+        self.app = app
+        self.agent_ids = set(agent_ids)
+        for agent_id in agent_ids:
+            _stats.setdefault(agent_id, FastPathStats(agent_id))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        agent_id = match_run(scope)
+        if agent_id not in self.agent_ids:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        body = await read_body(receive)
+        replay = replay_body(body, receive)
+        form: Dict[str, Any] = {}
+        try:
+            form = await parse_form(scope, body)
+            response = await self._try_answer(form, agent_id)
+        except Exception as e:
+            logger.warning(f"Pricing fast path failed: {e}")
+            response = None
+
+        if response is None:
+            await self.app(scope, replay, send)
+            message = form.get("message")
+            price_question = isinstance(message, str) and is_price_question(message)
+            _stats[agent_id].record_fallback(time.perf_counter() - started, price_question)
+        else:
+            await response(scope, replay, send)
+            _stats[agent_id].record_answer(time.perf_counter() - started)
+
+    async def _try_answer(self, form: Dict[str, Any], agent_id: str):
+        message = form.get("message")
+        if not isinstance(message, str) or not message or "files" in form:
+            return None
+        content = answer_price_query(message)
+        if content is None:
+            return None
+
+        run_id = str(uuid4())
+        session_id = form.get("session_id") or str(uuid4())
+        metadata = {"fast_path": "pricing"}
+        await asyncio.to_thread(
+            record_run, agent_id, session_id, form.get("user_id"), run_id, message, content, metadata
+        )
+        return run_response(
+            content,
+            agent_id,
+            run_id=run_id,
+            session_id=session_id,
+            stream=str(form.get("stream", "false")).lower() == "true",
+            metadata=metadata,
+            headers={"X-Fast-Path": "pricing"},
+        )
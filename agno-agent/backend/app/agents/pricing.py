@@ -0,0 +1,469 @@
+"""Compiled, array-backed pricing tables.
+
+Pricing rules and postcode ranges are compiled once into NumPy arrays:
+
+- a dense table over every 4-digit Australian postcode (0000-9999) holding
+  the region index and a postcode/suburb-level multiplier, so a lookup is a
+  single array index instead of a scan over range strings. Narrower ranges
+  are painted after wider ones, so suburb-level overrides win.
+- per-service arrays (base price, per-sqm, per-item) and a service x region
+  matrix of availability and regional multipliers.
+
+Tables can be compiled from the built-in ``PRICING_RULES``/``POSTCODE_REGIONS``
+dicts, from CSV files or from database tables, and are hot-swapped with
+``reload_pricing_table``. NumPy is imported when the first table is
+compiled, not when the module is.
+
+A reload through the API is announced with ``pg_notify`` on
+``RELOAD_CHANNEL``; every worker running ``start_pricing_listener`` then
+reloads its own table (and tool caches).
+"""
+import csv
+import logging
+import math
+import os
+import socket
+import threading
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from app.core.config import settings
+from app.core.tool_runtime import clear_tool_caches
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+POSTCODE_SPACE = 10000
+
+# Postcode range spec: "2000-2999" -> "NSW" or {"region": "NSW", "multiplier": 1.1}
+PostcodeSpec = Union[str, Mapping[str, Any]]
+
+
+def normalize_service_type(service_type: str) -> str:
+    """Normalize a service name the way the pricing tool always has."""
+    return service_type.lower().replace(" ", "_")
+
+
+def parse_postcode(postcode: Any) -> int:
+    """Return the postcode as an int in [0, 9999], or -1 if invalid."""
+    try:
+        value = int(postcode)
+    except (TypeError, ValueError):
+        return -1
+    return value if 0 <= value < POSTCODE_SPACE else -1
+
+
+def _parse_range(range_str: str) -> Tuple[int, int]:
+    start, _, end = range_str.partition("-")
+    return int(start), int(end or start)
+
+
+@dataclass
+class PricingTable:
+    """Indexed pricing data; build with ``compile_pricing``."""
+
+    services: List[str]
+    regions: List[str]
+    base_price: "np.ndarray"  # (S,)
+    per_sqm: "np.ndarray"  # (S,) NaN when the service is not area-priced
+    per_item: "np.ndarray"  # (S,) NaN when the service is not item-priced
+    available: "np.ndarray"  # (S, R) bool
+    region_multiplier: "np.ndarray"  # (S, R)
+    postcode_region: "np.ndarray"  # (10000,) region index, -1 = unsupported
+    postcode_multiplier: "np.ndarray"  # (10000,)
+
+    def __post_init__(self):
+        self.service_index = {name: i for i, name in enumerate(self.services)}
+
+    def region_for(self, postcode: Any) -> Optional[str]:
+        """Region code for a postcode, or None."""
+        value = parse_postcode(postcode)
+        if value < 0:
+            return None
+        region = int(self.postcode_region[value])
+        return self.regions[region] if region >= 0 else None
+
+    def quote(
+        self,
+        service_type: str,
+        postcode: str,
+        area_size: Optional[float] = None,
+        item_count: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Price a single request (same result shape as ``lookup_price``)."""
+        service_type = normalize_service_type(service_type)
+        s = self.service_index.get(service_type)
+        if s is None:
+            return self._unknown_service(service_type)
+        pc = parse_postcode(postcode)
+        r = int(self.postcode_region[pc]) if pc >= 0 else -1
+        if r < 0:
+            return self._invalid_postcode(postcode)
+        if not self.available[s, r]:
+            return self._unavailable(service_type, self.regions[r])
+
+        variable_cost = 0.0
+        if not math.isnan(self.per_sqm[s]) and area_size:
+            variable_cost = float(self.per_sqm[s]) * area_size
+        elif not math.isnan(self.per_item[s]) and item_count:
+            variable_cost = float(self.per_item[s]) * item_count
+        multiplier = float(self.region_multiplier[s, r] * self.postcode_multiplier[pc])
+        return self._quote(s, r, variable_cost, multiplier)
+
+    def quote_many(self, requests: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Price many requests at once with vectorized array operations.
+
+        Args:
+            requests: Mappings with ``service_type``, ``postcode`` and optional
+                ``area_size``/``item_count``
+
+        Returns:
+            One result per request, identical to calling ``quote`` for each
+        """
+        import numpy as np
+
+        n = len(requests)
+        if n == 0:
+            return []
+        names = [normalize_service_type(str(req.get("service_type", ""))) for req in requests]
+        svc = np.fromiter((self.service_index.get(name, -1) for name in names), np.int64, n)
+        pc = np.fromiter((parse_postcode(req.get("postcode")) for req in requests), np.int64, n)
+        area = np.array([req.get("area_size") or 0.0 for req in requests], dtype=np.float64)
+        items = np.array([req.get("item_count") or 0 for req in requests], dtype=np.float64)
+
+        pc_idx = np.where(pc >= 0, pc, 0)
+        region = np.where((pc >= 0) & (svc >= 0), self.postcode_region[pc_idx], -1)
+        s = np.where(svc >= 0, svc, 0)
+        r = np.where(region >= 0, region, 0)
+        ok = (svc >= 0) & (region >= 0) & self.available[s, r]
+
+        per_sqm = self.per_sqm[s]
+        per_item = self.per_item[s]
+        variable = np.where(
+            ~np.isnan(per_sqm) & (area != 0),
+            np.nan_to_num(per_sqm) * area,
+            np.where(~np.isnan(per_item) & (items != 0), np.nan_to_num(per_item) * items, 0.0),
+        )
+        multiplier = self.region_multiplier[s, r] * self.postcode_multiplier[pc_idx]
+
+        results: List[Dict[str, Any]] = []
+        for i, req in enumerate(requests):
+            if ok[i]:
+                results.append(self._quote(int(s[i]), int(r[i]), float(variable[i]), float(multiplier[i])))
+            elif svc[i] < 0:
+                results.append(self._unknown_service(names[i]))
+            elif region[i] < 0:
+                results.append(self._invalid_postcode(req.get("postcode")))
+            else:
+                results.append(self._unavailable(names[i], self.regions[int(region[i])]))
+        return results
+
+    def _quote(self, s: int, r: int, variable_cost: float, multiplier: float) -> Dict[str, Any]:
+        base_price = float(self.base_price[s])
+        return {
+            "available": True,
+            "service_type": self.services[s],
+            "region": self.regions[r],
+            "base_price": base_price,
+            "variable_cost": variable_cost,
+            "regional_multiplier": multiplier,
+            "final_price": round((base_price + variable_cost) * multiplier, 2),
+            "currency": "AUD"
+        }
+
+    def _unknown_service(self, service_type: str) -> Dict[str, Any]:
+        return {
+            "available": False,
+            "error": f"Service type '{service_type}' not found. Available services: {', '.join(self.services)}"
+        }
+
+    def _invalid_postcode(self, postcode: Any) -> Dict[str, Any]:
+        return {
+            "available": False,
+            "error": f"Invalid postcode '{postcode}' or region not supported"
+        }
+
+    def _unavailable(self, service_type: str, region: str) -> Dict[str, Any]:
+        return {
+            "available": False,
+            "error": f"Service '{service_type}' is not available in {region}",
+            "region": region
+        }
+
+
+def compile_pricing(
+    rules: Mapping[str, Mapping[str, Any]],
+    postcode_regions: Mapping[str, PostcodeSpec],
+) -> PricingTable:
+    """
+    Compile pricing dicts into a ``PricingTable``.
+
+    Args:
+        rules: ``PRICING_RULES``-shaped mapping of service -> pricing
+        postcode_regions: Mapping of "start-end" ranges to a region code or
+            to ``{"region": ..., "multiplier": ...}`` for suburb-level pricing
+
+    Returns:
+        Compiled table
+    """
+    # Imported here so importing the agents does not load NumPy
+    import numpy as np
+
+    services = list(rules.keys())
+    regions: List[str] = []
+    for pricing in rules.values():
+        regions.extend(r for r in pricing.get("regions", {}) if r not in regions)
+    for spec in postcode_regions.values():
+        region = spec if isinstance(spec, str) else spec["region"]
+        if region not in regions:
+            regions.append(region)
+    region_index = {name: i for i, name in enumerate(regions)}
+
+    S, R = len(services), len(regions)
+    base_price = np.zeros(S)
+    per_sqm = np.full(S, np.nan)
+    per_item = np.full(S, np.nan)
+    available = np.zeros((S, R), dtype=bool)
+    region_multiplier = np.zeros((S, R))
+    for s, name in enumerate(services):
+        pricing = rules[name]
+        base_price[s] = pricing["base_price"]
+        if pricing.get("per_sqm") is not None:
+            per_sqm[s] = pricing["per_sqm"]
+        if pricing.get("per_item") is not None:
+            per_item[s] = pricing["per_item"]
+        for region, info in pricing.get("regions", {}).items():
+            r = region_index[region]
+            available[s, r] = bool(info["available"])
+            region_multiplier[s, r] = info["multiplier"]
+
+    postcode_region = np.full(POSTCODE_SPACE, -1, dtype=np.int16)
+    postcode_multiplier = np.ones(POSTCODE_SPACE)
+    parsed = [(_parse_range(range_str), spec) for range_str, spec in postcode_regions.items()]
+    # Paint wide ranges first so narrower (suburb-level) ranges override them
+    for (start, end), spec in sorted(parsed, key=lambda item: item[0][0] - item[0][1]):
+        if isinstance(spec, str):
+            region, multiplier = spec, 1.0
+        else:
+            region, multiplier = spec["region"], float(spec.get("multiplier", 1.0))
+        postcode_region[start:end + 1] = region_index[region]
+        postcode_multiplier[start:end + 1] = multiplier
+
+    return PricingTable(
+        services=services,
+        regions=regions,
+        base_price=base_price,
+        per_sqm=per_sqm,
+        per_item=per_item,
+        available=available,
+        region_multiplier=region_multiplier,
+        postcode_region=postcode_region,
+        postcode_multiplier=postcode_multiplier,
+    )
+
+
+# ----------------------------------------------------------------------
+# Loaders
+# ----------------------------------------------------------------------
+
+
+def _as_bool(value: Any) -> bool:
+    return str(value).strip().lower() in ("1", "true", "t", "yes", "y")
+
+
+def _as_float(value: Any) -> Optional[float]:
+    return float(value) if value not in (None, "") else None
+
+
+def _rules_from_rows(
+    services: Sequence[Mapping[str, Any]],
+    service_regions: Sequence[Mapping[str, Any]],
+    postcodes: Sequence[Mapping[str, Any]],
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, PostcodeSpec]]:
+    rules: Dict[str, Dict[str, Any]] = {}
+    for row in services:
+        pricing: Dict[str, Any] = {"base_price": float(row["base_price"]), "regions": {}}
+        for key in ("per_sqm", "per_item"):
+            value = _as_float(row.get(key))
+            if value is not None:
+                pricing[key] = value
+        rules[row["service_type"]] = pricing
+    for row in service_regions:
+        rules[row["service_type"]]["regions"][row["region"]] = {
+            "available": _as_bool(row["available"]),
+            "multiplier": float(row["multiplier"]),
+        }
+    postcode_regions: Dict[str, PostcodeSpec] = {
+        f"{int(row['start'])}-{int(row['end'])}": {
+            "region": row["region"],
+            "multiplier": _as_float(row.get("multiplier")) or 1.0,
+        }
+        for row in postcodes
+    }
+    return rules, postcode_regions
+
+
+def load_pricing_from_csv(directory: str) -> PricingTable:
+    """
+    Compile pricing from ``services.csv``, ``service_regions.csv`` and
+    ``postcodes.csv`` in ``directory`` (columns match the DB tables).
+    """
+    def read(name: str) -> List[Dict[str, str]]:
+        with open(os.path.join(directory, name), newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    return compile_pricing(*_rules_from_rows(
+        read("services.csv"), read("service_regions.csv"), read("postcodes.csv")
+    ))
+
+
+def load_pricing_from_db() -> PricingTable:
+    """Compile pricing from the ``ai.pricing_*`` tables."""
+    from sqlalchemy import text as sql
+
+    from app.core.database import get_engine
+
+    with get_engine().connect() as conn:
+        def read(query: str) -> List[Dict[str, Any]]:
+            return [dict(row) for row in conn.execute(sql(query)).mappings()]
+
+        return compile_pricing(*_rules_from_rows(
+            read("SELECT service_type, base_price, per_sqm, per_item FROM ai.pricing_services"),
+            read("SELECT service_type, region, available, multiplier FROM ai.pricing_service_regions"),
+            read('SELECT start_postcode AS start, end_postcode AS "end", region, multiplier'
+                 " FROM ai.pricing_postcodes"),
+        ))
+
+
+# ----------------------------------------------------------------------
+# Shared table
+# ----------------------------------------------------------------------
+
+_pricing_table: Optional[PricingTable] = None
+_pricing_lock = threading.Lock()
+
+
+def _load_configured() -> PricingTable:
+    if settings.pricing_source == "csv":
+        return load_pricing_from_csv(settings.pricing_csv_dir)
+    if settings.pricing_source == "db":
+        return load_pricing_from_db()
+    # Built-in rules live in app.agents.tools, which imports this module
+    from app.agents.tools import POSTCODE_REGIONS, PRICING_RULES
+
+    return compile_pricing(PRICING_RULES, POSTCODE_REGIONS)
+
+
+def get_pricing_table() -> PricingTable:
+    """Get the compiled pricing table, compiling it on first use."""
+    global _pricing_table
+    if _pricing_table is None:
+        with _pricing_lock:
+            if _pricing_table is None:
+                _pricing_table = _load_configured()
+    return _pricing_table
+
+
+def reload_pricing_table() -> PricingTable:
+    """
+    Recompile pricing from the configured source and swap it in.
+
+    In-flight lookups keep using the previous table; the swap is a single
+    reference assignment.
+    """
+    global _pricing_table
+    table = _load_configured()
+    with _pricing_lock:
+        _pricing_table = table
+    # Memoized quotes of the agent tools were priced with the previous table
+    clear_tool_caches()
+    logger.info(
+        f"Pricing reloaded from '{settings.pricing_source}': "
+        f"{len(table.services)} services, {len(table.regions)} regions"
+    )
+    return table
+
+
+# ----------------------------------------------------------------------
+# Reload broadcast
+# ----------------------------------------------------------------------
+
+# Postgres channel on which a reload is announced to every worker
+RELOAD_CHANNEL = "pricing_reload"
+
+_listener: Optional[threading.Thread] = None
+_listener_pid: Optional[int] = None
+_listener_stop = threading.Event()
+
+
+def _origin() -> str:
+    # Evaluated per call: forked workers share the master's module state
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def broadcast_pricing_reload() -> None:
+    """Ask the other workers (on every host) to reload their pricing table."""
+    from sqlalchemy import text as sql
+
+    from app.core.database import get_engine
+
+    with get_engine().begin() as conn:
+        conn.execute(sql("SELECT pg_notify(:channel, :origin)"), {"channel": RELOAD_CHANNEL, "origin": _origin()})
+
+
+def _listen() -> None:
+    import psycopg
+
+    from app.core.database import get_engine
+
+    conninfo = get_engine().url.set(drivername="postgresql").render_as_string(hide_password=False)
+    backoff = 1.0
+    while not _listener_stop.is_set():
+        try:
+            with psycopg.connect(conninfo, autocommit=True) as conn:
+                conn.execute(f"LISTEN {RELOAD_CHANNEL}")
+                backoff = 1.0
+                while not _listener_stop.is_set():
+                    origins = {notify.payload for notify in conn.notifies(timeout=1.0)}
+                    if origins - {_origin()}:
+                        try:
+                            reload_pricing_table()
+                        except Exception as e:
+                            # The previous table stays active
+                            logger.warning(f"Broadcast pricing reload failed: {e}")
+        except Exception as e:
+            logger.warning(f"Pricing reload listener failed, retrying in {backoff:.0f}s: {e}")
+            _listener_stop.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+def start_pricing_listener() -> None:
+    """Reload pricing in this worker whenever another worker reloads it."""
+    global _listener, _listener_pid
+    if _listener is not None and _listener.is_alive() and _listener_pid == os.getpid():
+        return
+    _listener_stop.clear()
+    _listener_pid = os.getpid()
+    _listener = threading.Thread(target=_listen, name="pricing-reload", daemon=True)
+    _listener.start()
+
+
+def stop_pricing_listener() -> None:
+    global _listener
+    _listener_stop.set()
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.join(timeout=4.0)
+    _listener = None
@@ -1,5 +1,6 @@
 """Price lookup tool for service pricing."""
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Mapping, Optional, Sequence
+from app.agents.pricing import get_pricing_table
 
 # Mock pricing data - in production, this would come from a database or API
 PRICING_RULES = {
@@ -58,15 +59,7 @@ def get_region_from_postcode(postcode: str) -> Optional[str]:
     Returns:
         Region code or None
     """
-    try:
-        post_int = int(postcode)
-        for range_str, region in POSTCODE_REGIONS.items():
-            start, end = map(int, range_str.split('-'))
-            if start <= post_int <= end:
-                return region
-    except ValueError:
-        pass
-    return None
+    return get_pricing_table().region_for(postcode)
 
 
 def lookup_price(
@@ -87,56 +80,18 @@ def lookup_price(
     Returns:
         Dictionary with pricing information
     """
-    # Normalize service type
-    service_type = service_type.lower().replace(" ", "_")
-    
-    # Check if service exists
-    if service_type not in PRICING_RULES:
-        return {
-            "available": False,
-            "error": f"Service type '{service_type}' not found. Available services: {', '.join(PRICING_RULES.keys())}"
-        }
-    
-    # Get region from postcode
-    region = get_region_from_postcode(postcode)
-    if not region:
-        return {
-            "available": False,
-            "error": f"Invalid postcode '{postcode}' or region not supported"
-        }
-    
-    pricing = PRICING_RULES[service_type]
-    region_info = pricing["regions"].get(region)
-    
-    if not region_info or not region_info["available"]:
-        return {
-            "available": False,
-            "error": f"Service '{service_type}' is not available in {region}",
-            "region": region
-        }
-    
-    # Calculate price
-    base_price = pricing["base_price"]
-    multiplier = region_info["multiplier"]
-    
-    # Add variable costs
-    variable_cost = 0.0
-    if "per_sqm" in pricing and area_size:
-        variable_cost = pricing["per_sqm"] * area_size
-    elif "per_item" in pricing and item_count:
-        variable_cost = pricing["per_item"] * item_count
-    
-    final_price = (base_price + variable_cost) * multiplier
-    
-    return {
-        "available": True,
-        "service_type": service_type,
-        "region": region,
-        "base_price": base_price,
-        "variable_cost": variable_cost,
-        "regional_multiplier": multiplier,
-        "final_price": round(final_price, 2),
-        "currency": "AUD"
-    }
+    return get_pricing_table().quote(service_type, postcode, area_size, item_count)
 
 
+def lookup_prices(requests: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Look up pricing for many (service, postcode, size) requests at once.
+    
+    Args:
+        requests: Mappings with service_type, postcode and optional
+            area_size/item_count
+        
+    Returns:
+        One pricing dictionary per request, in order
+    """
+    return get_pricing_table().quote_many(requests)
@@ -0,0 +1,95 @@
+"""Bulk knowledge ingestion endpoints."""
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from pydantic import BaseModel
+
+from app.core.auth import verify_admin
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.knowledge.ingest import IngestionPipeline, IngestStats
+
+router = APIRouter(prefix="/api/v1/knowledge", tags=["knowledge"])
+
+# Ingestion jobs started by this process, keyed by job id. The registry is
+# bounded; running jobs do not expire, finished ones after ingest_job_ttl.
+_jobs_cache: Optional[TTLCache[Dict[str, Any]]] = None
+_jobs_lock = threading.Lock()
+
+
+def _jobs() -> TTLCache[Dict[str, Any]]:
+    global _jobs_cache
+    if _jobs_cache is None:
+        with _jobs_lock:
+            if _jobs_cache is None:
+                _jobs_cache = TTLCache(max_size=settings.ingest_job_history)
+    return _jobs_cache
+
+
+class IngestRequest(BaseModel):
+    """Server-side directory or archive to ingest."""
+
+    path: str
+    workers: Optional[int] = None
+    force: bool = False
+
+
+def _run_job(job: Dict[str, Any], request: IngestRequest) -> None:
+
+    def on_progress(stats: IngestStats) -> None:
+        job["stats"] = stats.report()
+
+    try:
+        pipeline = IngestionPipeline(
+            workers=request.workers, force=request.force, on_progress=on_progress
+        )
+        job["stats"] = pipeline.run(request.path).report()
+        job["status"] = "completed"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        _jobs().set(job["job_id"], job, ttl=settings.ingest_job_ttl)
+
+
+@router.post("/ingest", status_code=status.HTTP_202_ACCEPTED)
+async def start_ingestion(
+    request: IngestRequest, _: Dict[str, Any] = Depends(verify_admin)
+) -> Dict[str, Any]:
+    """Start a bulk ingestion job in the background (admin only)."""
+    job_id = str(uuid4())
+    job = {"job_id": job_id, "path": request.path, "status": "running", "stats": None}
+    _jobs().set(job_id, job)
+    threading.Thread(target=_run_job, args=(job, request), daemon=True).start()
+    return job
+
+
+@router.put("/documents")
+async def upsert_document(
+    file: UploadFile = File(...),
+    source: Optional[str] = Form(None),
+    _: Dict[str, Any] = Depends(verify_admin),
+) -> Dict[str, Any]:
+    """
+    Add or incrementally update one document (admin only).
+
+    ``source`` identifies the document across versions (defaults to the
+    file name); only chunks that changed since the last version are
+    re-embedded.
+    """
+    data = await file.read()
+    pipeline = IngestionPipeline()
+    stats = await asyncio.to_thread(pipeline.ingest_document, source or file.filename, data)
+    return stats.report()
+
+
+@router.get("/ingest/{job_id}")
+async def ingestion_status(job_id: str, _: Dict[str, Any] = Depends(verify_admin)) -> Dict[str, Any]:
+    """Progress and throughput of an ingestion job (admin only)."""
+    job = _jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingestion job not found")
+    return job
@@ -0,0 +1,75 @@
+"""Bulk pricing endpoints."""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
+
+from app.agents.pricing import broadcast_pricing_reload, reload_pricing_table
+from app.agents.tools import lookup_prices
+from app.core.auth import get_current_user, verify_admin
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/pricing", tags=["pricing"])
+
+MAX_QUOTES_PER_REQUEST = 10000
+
+
+class QuoteItem(BaseModel):
+    """One (service, postcode, size) tuple to price."""
+
+    service_type: str
+    postcode: str
+    area_size: Optional[float] = None
+    item_count: Optional[int] = None
+
+
+class QuoteRequest(BaseModel):
+    """Batch of quotes to price."""
+
+    items: List[QuoteItem] = Field(..., max_length=MAX_QUOTES_PER_REQUEST)
+
+
+@router.post("/quotes")
+async def bulk_quotes(
+    request: QuoteRequest, _: Dict[str, Any] = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Price many requests at once; results are returned in request order."""
+    # Up to MAX_QUOTES_PER_REQUEST quotes: priced off the event loop
+    quotes = await asyncio.to_thread(lookup_prices, [item.model_dump() for item in request.items])
+    return {"quotes": quotes, "count": len(quotes)}
+
+
+@router.post("/reload")
+async def reload_pricing(_: Dict[str, Any] = Depends(verify_admin)) -> Dict[str, Any]:
+    """
+    Recompile pricing from the configured source (admin only).
+
+    This worker reloads before answering; the others are notified and
+    reload in the background when ``pricing_reload_broadcast`` is on.
+    """
+    try:
+        table = await asyncio.to_thread(reload_pricing_table)
+    except Exception as e:
+        # The previous table stays active
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Pricing reload failed: {e}",
+        )
+    broadcast = False
+    if settings.pricing_reload_broadcast:
+        try:
+            await asyncio.to_thread(broadcast_pricing_reload)
+            broadcast = True
+        except Exception as e:
+            logger.warning(f"Pricing reload was not broadcast to the other workers: {e}")
+    return {
+        "services": len(table.services),
+        "regions": len(table.regions),
+        "worker": os.getpid(),
+        "broadcast": broadcast,
+    }
@@ -0,0 +1,81 @@
+"""Operational endpoints (resource usage, caches, startup)."""
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from app.agents.price_router import get_fast_path_stats
+from app.core.admission import get_admission_status
+from app.core.auth import get_token_cache, verify_admin
+from app.core.config import settings
+from app.core.database import get_pool_status
+from app.core.embedding_cache import CachingEmbedder
+from app.core.knowledge_base import get_embedder
+from app.core.response_cache import get_response_cache
+from app.core.session_store import get_session_store
+from app.core.single_flight import get_single_flight_stats
+from app.core.startup import get_startup_timings
+from app.core.tool_runtime import get_tool_cache_stats
+
+router = APIRouter(prefix="/api/v1/system", tags=["system"])
+
+
+@router.get("/pools")
+async def pool_status(_: Dict[str, Any] = Depends(verify_admin)) -> Dict[str, Any]:
+    """Connection pool usage per database (admin only)."""
+    return {"pools": get_pool_status()}
+
+
+@router.get("/caches")
+async def cache_status(_: Dict[str, Any] = Depends(verify_admin)) -> Dict[str, Any]:
+    """Hit/miss counters for in-process caches (admin only)."""
+    # Imported here: the replica module loads NumPy
+    from app.knowledge.replica import get_replica_stats
+
+    embedder = get_embedder()
+    session_store = get_session_store()
+    return {
+        "auth_tokens": get_token_cache().stats(),
+        "embeddings": embedder.stats() if isinstance(embedder, CachingEmbedder) else None,
+        "responses": get_response_cache().stats() if settings.response_cache_enabled else None,
+        "sessions": session_store.stats() if session_store is not None else None,
+        "coalesced": get_single_flight_stats(),
+        "knowledge_replicas": get_replica_stats(),
+        "tool_results": get_tool_cache_stats(),
+    }
+
+
+@router.get("/admission")
+async def admission_status(_: Dict[str, Any] = Depends(verify_admin)) -> Dict[str, Any]:
+    """LLM run slots and wait queues per model (admin only)."""
+    return {"models": get_admission_status()}
+
+
+@router.get("/models")
+async def model_routing_status(_: Dict[str, Any] = Depends(verify_admin)) -> Dict[str, Any]:
+    """Model fallback chain and circuit breaker state (admin only)."""
+    # Imported here: the model router loads the OpenAI SDK (with the agents)
+    from app.core.model_router import get_routing_status
+
+    return {
+        "primary": settings.openrouter_model,
+        "fallbacks": settings.model_fallbacks,
+        "fast": settings.model_fast,
+        "hedge_after": settings.model_hedge_after,
+        "circuits": get_routing_status(),
+    }
+
+
+@router.get("/fast-path")
+async def fast_path_status(_: Dict[str, Any] = Depends(verify_admin)) -> Dict[str, Any]:
+    """Pricing fast path hit rate and latency saved per agent (admin only)."""
+    return {"agents": get_fast_path_stats()}
+
+
+@router.get("/startup")
+async def startup_breakdown(_: Dict[str, Any] = Depends(verify_admin)) -> Dict[str, Any]:
+    """Per-component startup timings in milliseconds (admin only)."""
+    return {
+        "components": {
+            name: round(seconds * 1000, 1) for name, seconds in get_startup_timings().items()
+        }
+    }
@@ -0,0 +1,327 @@
+"""Admission control for LLM-backed agent runs.
+
+Each model gets an ``AdmissionController`` that caps concurrent runs (per
+model and per tenant), queues the overflow in a bounded wait queue served
+round-robin across tenants, and rejects with 503 + ``Retry-After`` when the
+queue is full, a run waited longer than ``admission_max_wait`` or the
+provider rate limit would not allow a call within that time.
+
+Runs are admitted by ``AdmissionMiddleware`` around
+``POST /agents/{agent_id}/runs``. The tenant is the subject of the verified
+bearer token; only runs without one fall back to the form's ``user_id``,
+else its ``session_id``, else the client address. Individual model calls inside
+a run are paced by the per-model request and token buckets (``throttle``),
+which follow the provider's RPM/TPM limits.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.asgi import match_run, parse_form, read_body, replay_body
+from app.core.auth import verified_subject
+from app.core.config import settings
+from app.core.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT_SECONDS,
+    RATE_LIMIT_WAIT_SECONDS,
+)
+from app.core.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a run cannot be admitted; ``retry_after`` is in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"LLM capacity exhausted ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency caps, fair wait queue and rate limits for one model.
+
+    ``acquire``/``release`` run on the event loop; ``throttle`` and
+    ``athrottle`` may be called from any thread.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        max_concurrency: int = 32,
+        max_per_tenant: int = 2,
+        max_queue: int = 100,
+        max_wait: float = 30.0,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+    ):
+        self.model_id = model_id
+        self.max_concurrency = max_concurrency
+        self.max_per_tenant = max_per_tenant
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.requests = TokenBucket.per_minute(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket.per_minute(tokens_per_minute) if tokens_per_minute else None
+
+        self._in_flight = 0
+        self._active: Dict[str, int] = {}
+        # Waiters per tenant; tenants are served round-robin in this order
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        # Moving average of run duration, for Retry-After estimates
+        self._run_seconds = 5.0
+
+    # ------------------------------------------------------------------
+    # Run admission
+    # ------------------------------------------------------------------
+
+    def _can_start(self, tenant: str) -> bool:
+        return (
+            self._in_flight < self.max_concurrency
+            and self._active.get(tenant, 0) < self.max_per_tenant
+        )
+
+    def _start(self, tenant: str) -> None:
+        self._in_flight += 1
+        self._active[tenant] = self._active.get(tenant, 0) + 1
+
+    def _update_gauges(self) -> None:
+        ADMISSION_QUEUE_DEPTH.labels(self.model_id).set(self._queued)
+        ADMISSION_IN_FLIGHT.labels(self.model_id).set(self._in_flight)
+
+    def retry_after(self) -> int:
+        """Seconds until a new run would likely get a slot."""
+        backlog = (self._queued + 1) / max(self.max_concurrency, 1)
+        return max(1, math.ceil(self._run_seconds * backlog))
+
+    def _reject(self, reason: str, retry_after: Optional[int] = None) -> AdmissionRejected:
+        ADMISSION_REJECTED.labels(self.model_id, reason).inc()
+        return AdmissionRejected(reason, retry_after or self.retry_after())
+
+    def _remove(self, tenant: str, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(tenant)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[tenant]
+
+    def _dispatch(self) -> None:
+        """Start queued runs, one per tenant per round, while slots are free."""
+        while self._queued and self._in_flight < self.max_concurrency:
+            started = False
+            for tenant in list(self._queues):
+                if self._in_flight >= self.max_concurrency:
+                    break
+                if self._active.get(tenant, 0) >= self.max_per_tenant:
+                    continue
+                queue = self._queues[tenant]
+                waiter = queue.popleft()
+                self._queued -= 1
+                if queue:
+                    self._queues.move_to_end(tenant)
+                else:
+                    del self._queues[tenant]
+                if waiter.done():
+                    continue
+                self._start(tenant)
+                waiter.set_result(None)
+                started = True
+            if not started:
+                break
+        self._update_gauges()
+
+    async def acquire(self, tenant: str) -> float:
+        """
+        Wait for a run slot.
+
+        Args:
+            tenant: Fairness and per-tenant cap key (user or session)
+
+        Returns:
+            Seconds waited
+
+        Raises:
+            AdmissionRejected: Queue full, wait timed out or rate limited
+        """
+        if self.requests is not None:
+            wait = self.requests.wait_time()
+            if wait > self.max_wait:
+                raise self._reject("rate_limit", math.ceil(wait))
+
+        if tenant not in self._queues and self._can_start(tenant):
+            self._start(tenant)
+            self._update_gauges()
+            ADMISSION_WAIT_SECONDS.labels(self.model_id).observe(0.0)
+            return 0.0
+
+        if self._queued >= self.max_queue:
+            raise self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(tenant, deque()).append(waiter)
+        self._queued += 1
+        self._update_gauges()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self._remove(tenant, waiter)
+            self._update_gauges()
+            raise self._reject("timeout")
+        except BaseException:
+            # Client went away while queued (or the slot was granted as it did)
+            if waiter.done() and not waiter.cancelled():
+                self.release(tenant)
+            else:
+                self._remove(tenant, waiter)
+                self._update_gauges()
+            raise
+        waited = time.monotonic() - started
+        ADMISSION_WAIT_SECONDS.labels(self.model_id).observe(waited)
+        return waited
+
+    def release(self, tenant: str, run_seconds: Optional[float] = None) -> None:
+        """Free a run slot and start the next queued run."""
+        self._in_flight -= 1
+        active = self._active.get(tenant, 0) - 1
+        if active > 0:
+            self._active[tenant] = active
+        else:
+            self._active.pop(tenant, None)
+        if run_seconds is not None:
+            self._run_seconds = 0.9 * self._run_seconds + 0.1 * run_seconds
+        self._dispatch()
+
+    # ------------------------------------------------------------------
+    # Provider rate limits (per model call)
+    # ------------------------------------------------------------------
+
+    def throttle(self, tokens: int = 0) -> float:
+        """Block until the request and token buckets allow one call."""
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire()
+        if self.tokens is not None and tokens:
+            waited += self.tokens.acquire(tokens)
+        if waited:
+            RATE_LIMIT_WAIT_SECONDS.labels(self.model_id).observe(waited)
+        return waited
+
+    async def athrottle(self, tokens: int = 0) -> float:
+        """Async ``throttle``."""
+        waited = 0.0
+        if self.requests is not None:
+            waited += await self.requests.async_acquire()
+        if self.tokens is not None and tokens:
+            waited += await self.tokens.async_acquire(tokens)
+        if waited:
+            RATE_LIMIT_WAIT_SECONDS.labels(self.model_id).observe(waited)
+        return waited
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "tenants_waiting": len(self._queues),
+            "avg_run_seconds": round(self._run_seconds, 2),
+        }
+
+
+# Controllers per model id
+_controllers: Dict[str, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_admission_controller(model_id: str) -> AdmissionController:
+    """
+    Get or create the admission controller of a model.
+
+    Limits come from ``admission_*`` settings and can be overridden per
+    model via ``admission_model_overrides``
+    (e.g. ``{"google/gemini-2.5-flash": {"requests_per_minute": 500}}``).
+    """
+    controller = _controllers.get(model_id)
+    if controller is None:
+        with _controllers_lock:
+            controller = _controllers.get(model_id)
+            if controller is None:
+                options = {
+                    "max_concurrency": settings.admission_max_concurrency,
+                    "max_per_tenant": settings.admission_max_per_tenant,
+                    "max_queue": settings.admission_max_queue,
+                    "max_wait": settings.admission_max_wait,
+                    "requests_per_minute": settings.admission_requests_per_minute,
+                    "tokens_per_minute": settings.admission_tokens_per_minute,
+                }
+                options.update(settings.admission_model_overrides.get(model_id, {}))
+                controller = _controllers[model_id] = AdmissionController(model_id, **options)
+    return controller
+
+
+def get_admission_status() -> Dict[str, Dict[str, Any]]:
+    """Queue and slot usage of every model controller."""
+    return {model_id: controller.stats() for model_id, controller in _controllers.items()}
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting ``POST /agents/{agent_id}/runs`` through the
+    controller of the agent's model.
+
+    The slot is held until the response (including a stream) has been sent.
+    """
+
+    def __init__(self, app: ASGIApp, agent_models: Dict[str, str]):
+        self.app = app
+        self.agent_models = agent_models
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        agent_id = match_run(scope)
+        if agent_id not in self.agent_models:
+            await self.app(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        replay = replay_body(body, receive)
+        # Form fields are client-controlled: a verified token's subject wins
+        tenant = await verified_subject(Headers(scope=scope).get("authorization"))
+        if tenant is None:
+            form = await parse_form(scope, body)
+            client = scope.get("client")
+            tenant = str(form.get("user_id") or form.get("session_id") or (client[0] if client else "anonymous"))
+
+        controller = get_admission_controller(self.agent_models[agent_id])
+        try:
+            await controller.acquire(tenant)
+        except AdmissionRejected as e:
+            logger.warning(f"Run on {agent_id} rejected for {tenant}: {e}")
+            response = JSONResponse(
+                {"detail": "The assistant is busy, please retry shortly.", "reason": e.reason},
+                status_code=503,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, replay, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, replay, send)
+        finally:
+            controller.release(tenant, time.monotonic() - started)
@@ -0,0 +1,157 @@
+"""Helpers for ASGI middleware around AgentOS agent runs."""
+import json
+import re
+import time
+from contextlib import suppress
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.types import Message, Receive, Scope
+
+# AgentOS run endpoint: POST /agents/{agent_id}/runs
+RUN_PATH = re.compile(r"^/agents/(?P<agent_id>[^/]+)/runs/?$")
+
+
+def match_run(scope: Scope) -> Optional[str]:
+    """Agent id when ``scope`` is an agent run request, else None."""
+    if scope["type"] != "http" or scope.get("method") != "POST":
+        return None
+    match = RUN_PATH.match(scope.get("path", ""))
+    return match["agent_id"] if match else None
+
+
+async def read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def replay_body(body: bytes, receive: Optional[Receive] = None) -> Receive:
+    """Receive callable that yields the buffered body, then defers to ``receive``."""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        if receive is not None:
+            return await receive()
+        return {"type": "http.disconnect"}
+
+    return replay
+
+
+async def parse_form(scope: Scope, body: bytes) -> Dict[str, Any]:
+    """Form fields of a buffered run request (urlencoded or multipart)."""
+    content_type = Headers(scope=scope).get("content-type", "")
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        return {k: v[-1] for k, v in parse_qs(body.decode("utf-8")).items()}
+    if content_type.startswith("multipart/form-data"):
+        form = await Request(scope, replay_body(body)).form()
+        return {k: v for k, v in form.items()}
+    return {}
+
+
+def record_run(
+    agent_id: str,
+    session_id: str,
+    user_id: Optional[str],
+    run_id: str,
+    message: str,
+    content: str,
+    metadata: Dict[str, Any],
+) -> None:
+    """Store a turn answered without running the agent in its session, like a regular run."""
+    from agno.db.base import SessionType
+    from agno.models.message import Message
+    from agno.run.agent import RunInput, RunOutput, RunStatus
+    from agno.session.agent import AgentSession
+
+    from app.core.database import get_agent_db
+
+    db = get_agent_db()
+    session = db.get_session(session_id=session_id, session_type=SessionType.AGENT, deserialize=True)
+    now = int(time.time())
+    if session is None:
+        session = AgentSession(session_id=session_id, agent_id=agent_id, user_id=user_id, created_at=now)
+    run = RunOutput(
+        run_id=run_id,
+        agent_id=agent_id,
+        session_id=session_id,
+        user_id=user_id,
+        input=RunInput(input_content=message),
+        content=content,
+        messages=[Message(role="user", content=message), Message(role="assistant", content=content)],
+        metadata=metadata,
+        status=RunStatus.completed,
+        created_at=now,
+    )
+    session.upsert_run(run=run)
+    session.updated_at = now
+    db.upsert_session(session)
+    # Runs live in their own table; adapters without one store them inline with the session
+    with suppress(NotImplementedError):
+        db.upsert_run(run=run, session_id=session_id, user_id=user_id, run_index=len(session.runs) - 1)
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def _stream_run(
+    content: str, agent_id: str, run_id: str, session_id: Optional[str], metadata: Dict[str, Any]
+) -> AsyncIterator[str]:
+    """Replay an answer as RunStarted/RunContent/RunCompleted events."""
+    base = {"agent_id": agent_id, "run_id": run_id, "session_id": session_id}
+    yield _sse({"event": "RunStarted", "created_at": int(time.time()), **base})
+    for token in re.findall(r"\S+\s*|\s+", content):
+        yield _sse({"event": "RunContent", "content": token, "content_type": "str", **base})
+    yield _sse({
+        "event": "RunCompleted",
+        "content": content,
+        "content_type": "str",
+        "metadata": metadata,
+        **base,
+    })
+
+
+def run_response(
+    content: str,
+    agent_id: str,
+    run_id: str,
+    session_id: Optional[str],
+    stream: bool,
+    metadata: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Answer a run request without running the agent.
+
+    The response mimics AgentOS: SSE run events when the client asked for
+    a stream, otherwise the completed run as JSON.
+    """
+    if stream:
+        return StreamingResponse(
+            _stream_run(content, agent_id, run_id, session_id, metadata),
+            media_type="text/event-stream",
+            headers=headers,
+        )
+    return JSONResponse(
+        {
+            "run_id": run_id,
+            "agent_id": agent_id,
+            "session_id": session_id,
+            "content": content,
+            "content_type": "str",
+            "status": "COMPLETED",
+            "metadata": metadata,
+        },
+        headers=headers,
+    )
@@ -1,54 +1,183 @@
-"""Authentication middleware and utilities."""
+"""Authentication middleware and utilities.
+
+Tokens are verified locally by default: the Supabase JWT signature and
+expiry are checked in-process against the project secret (HS256) or the
+project JWKS, and verified claims are cached by token hash until the
+token expires. The remote ``supabase.auth.get_user`` check is kept for
+revocation-sensitive routes and runs off the event loop.
+"""
+import asyncio
+import hashlib
+import jwt
 from fastapi import HTTPException, Security, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import Client
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.database import get_supabase
+from app.core.metrics import stage
 from typing import Optional, Dict, Any
 
 security = HTTPBearer()
 
+# Verified claims keyed by sha256(token); entries expire with the token
+# (created on first use, so importing this module does not load the settings)
+_token_cache: Optional[TTLCache[Dict[str, Any]]] = None
+
+# Singleton JWKS client (fetches and caches the signing keys)
+_jwks_client: Optional[jwt.PyJWKClient] = None
+
+
+def _credentials_error(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def get_token_cache() -> TTLCache[Dict[str, Any]]:
+    """Get the verified-token cache (exposed for stats and tests)."""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TTLCache(max_size=settings.auth_token_cache_size)
+    return _token_cache
+
+
+def get_jwks_client() -> jwt.PyJWKClient:
+    """Get or create the JWKS client used for asymmetric Supabase tokens."""
+    global _jwks_client
+    if _jwks_client is None:
+        jwks_url = settings.supabase_jwks_url or (
+            f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+        )
+        _jwks_client = jwt.PyJWKClient(
+            jwks_url,
+            cache_jwk_set=True,
+            lifespan=settings.auth_jwks_cache_ttl,
+        )
+    return _jwks_client
+
+
+def _user_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "user_id": claims.get("sub"),
+        "email": claims.get("email"),
+        "role": claims.get("role", "user"),
+    }
+
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    """
+    Verify signature, expiry and audience of a Supabase JWT.
+
+    Blocking when the JWKS has to be (re-)fetched; callers on the event
+    loop should run this in a thread unless a shared secret is configured.
+    """
+    if settings.supabase_jwt_secret:
+        key: Any = settings.supabase_jwt_secret
+        algorithms = ["HS256"]
+    else:
+        key = get_jwks_client().get_signing_key_from_jwt(token).key
+        algorithms = ["RS256", "ES256"]
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=algorithms,
+        audience=settings.auth_jwt_audience,
+        options={"require": ["exp", "sub"]},
+    )
+
+
+async def verify_token_local(token: str) -> Dict[str, Any]:
+    """
+    Verify a Supabase JWT locally, using the claims cache when possible.
+
+    Args:
+        token: Raw bearer token
+
+    Returns:
+        User data from verified token
+
+    Raises:
+        HTTPException: If token is invalid or expired
+    """
+    cache_key = _token_key(token)
+    user = get_token_cache().get(cache_key)
+    if user is not None:
+        return user
+
+    try:
+        if settings.supabase_jwt_secret:
+            claims = _decode_token(token)
+        else:
+            claims = await asyncio.to_thread(_decode_token, token)
+    except Exception as e:
+        raise _credentials_error(f"Could not validate credentials: {e!s}")
+
+    user = _user_from_claims(claims)
+    get_token_cache().set(cache_key, user, expires_at=float(claims["exp"]))
+    return user
+
+
+async def verify_token_remote(token: str) -> Dict[str, Any]:
+    """
+    Verify a token against Supabase Auth (detects revoked sessions).
+
+    The supabase client is synchronous, so the call runs in a worker
+    thread to keep the event loop free.
+
+    Args:
+        token: Raw bearer token
+
+    Returns:
+        User data from Supabase
+
+    Raises:
+        HTTPException: If token is invalid, expired or revoked
+    """
+    try:
+        supabase = get_supabase()
+        response = await asyncio.to_thread(supabase.auth.get_user, token)
+    except Exception as e:
+        raise _credentials_error(f"Could not validate credentials: {e!s}")
+
+    if not response or not response.user:
+        raise _credentials_error("Invalid authentication credentials")
+
+    return {
+        "user_id": response.user.id,
+        "email": response.user.email,
+        "role": response.user.role if hasattr(response.user, "role") else "user"
+    }
+
 
 async def verify_token(
     credentials: HTTPAuthorizationCredentials = Security(security)
 ) -> Dict[str, Any]:
     """
     Verify Supabase JWT token from Authorization header.
-    
+
+    Uses local verification unless ``auth_verification_mode`` is "remote".
+
     Args:
         credentials: HTTP Bearer token credentials
-        
+
     Returns:
         User data from verified token
-        
+
     Raises:
         HTTPException: If token is invalid or expired
     """
     token = credentials.credentials
-    
-    try:
-        supabase = get_supabase()
-        # Verify the token by getting the user
-        response = supabase.auth.get_user(token)
-        
-        if not response.user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        return {
-            "user_id": response.user.id,
-            "email": response.user.email,
-            "role": response.user.role if hasattr(response.user, "role") else "user"
-        }
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Could not validate credentials: {str(e)}",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    with stage("auth"):
+        if settings.auth_verification_mode == "remote":
+            return await verify_token_remote(token)
+        return await verify_token_local(token)
 
 
 async def get_current_user(
@@ -59,20 +188,28 @@ async def get_current_user(
 
 
 async def verify_admin(
-    user: Dict[str, Any] = Security(get_current_user)
+    credentials: HTTPAuthorizationCredentials = Security(security)
 ) -> Dict[str, Any]:
     """
     Verify user has admin role.
-    
+
+    Admin routes are revocation-sensitive, so the token is re-checked
+    against Supabase when ``auth_admin_remote_check`` is enabled.
+
     Args:
-        user: Current authenticated user
-        
+        credentials: HTTP Bearer token credentials
+
     Returns:
         User data if admin
-        
+
     Raises:
         HTTPException: If user is not an admin
     """
+    if settings.auth_admin_remote_check:
+        user = await verify_token_remote(credentials.credentials)
+    else:
+        user = await verify_token(credentials)
+
     if user.get("role") != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -81,3 +218,25 @@ async def verify_admin(
     return user
 
 
+async def verified_subject(authorization: Optional[str]) -> Optional[str]:
+    """
+    User id of a valid bearer token, for keying per-user limits.
+
+    Args:
+        authorization: ``Authorization`` header value
+
+    Returns:
+        The token's ``sub`` claim, or None without a valid bearer token
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return (await verify_token_local(token.strip())).get("user_id")
+    except HTTPException:
+        return None
+
+
+def invalidate_token(token: str) -> None:
+    """Drop a token from the local claims cache (e.g. on sign-out)."""
+    get_token_cache().pop(_token_key(token))
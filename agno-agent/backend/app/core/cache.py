@@ -0,0 +1,104 @@
+"""In-process caching primitives shared across the backend."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Bounded, thread-safe LRU cache with a per-entry expiry.
+
+    Entries are evicted when they expire or, once the cache is full,
+    in least-recently-used order. Every entry may carry its own expiry
+    (e.g. a JWT ``exp`` claim); otherwise ``default_ttl`` is applied.
+    """
+
+    def __init__(self, max_size: int = 1024, default_ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[Hashable, Tuple[V, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Return the cached value for ``key`` or None if missing/expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: V,
+        ttl: Optional[float] = None,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        """
+        Store ``value`` under ``key``.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Seconds until the entry expires (overrides default_ttl)
+            expires_at: Absolute unix timestamp at which the entry expires
+        """
+        if expires_at is None:
+            ttl = ttl if ttl is not None else self.default_ttl
+            expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """Remove ``key`` and return its value, if present."""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[0] if item else None
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self) -> int:
+        """Remove all expired entries and return how many were dropped."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                key
+                for key, (_, expires_at) in self._data.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
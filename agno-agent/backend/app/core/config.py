@@ -1,6 +1,7 @@
 """Application configuration settings."""
+from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -16,12 +17,24 @@ class Settings(BaseSettings):
     # Supabase Configuration (Authentication Only)
     supabase_url: str
     supabase_service_key: str
-    
+
+    # Authentication
+    # "local" verifies Supabase JWTs in-process (HS256 secret or JWKS);
+    # "remote" calls supabase.auth.get_user for every request.
+    auth_verification_mode: str = "local"
+    supabase_jwt_secret: Optional[str] = None  # Legacy HS256 project secret
+    supabase_jwks_url: Optional[str] = None  # Defaults to <supabase_url>/auth/v1/.well-known/jwks.json
+    auth_jwt_audience: str = "authenticated"
+    auth_jwks_cache_ttl: int = 600  # Seconds before the JWKS is re-fetched
+    auth_token_cache_size: int = 10000  # Max verified tokens kept in memory
+    auth_admin_remote_check: bool = True  # Re-check admins against Supabase (revocation)
+
     # PgVector Database Configuration (Vector DB & Knowledge Base)
     pgvector_db_url: str  # Local PostgreSQL with pgvector extension
     
     # OpenAI Configuration
     openai_api_key: str
+    openai_base_url: Optional[str] = None  # OpenAI-compatible embeddings endpoint
     
     # OpenRouter Configuration
     openrouter_api_key: str
@@ -34,10 +47,22 @@ class Settings(BaseSettings):
     
     # Environment
     environment: str = "development"
+    # Build agents, DB pools and clients in the lifespan instead of on the
+    # first request (everything is created lazily either way)
+    startup_warmup: bool = True
     
     # Database
     database_pool_size: int = 5
     database_max_overflow: int = 10
+
+    # Production server (gunicorn.conf.py)
+    web_concurrency: int = 0  # Worker processes (0 = one per CPU)
+    server_max_requests: int = 2000  # Recycle a worker after this many requests (0 = never)
+    server_max_requests_jitter: int = 200  # Spread recycling so workers do not restart together
+    server_graceful_timeout: int = 120  # Seconds in-flight (streaming) responses get on SIGTERM
+    server_keepalive: int = 5
+    health_check_timeout: float = 2.0  # Seconds per readiness check (DB, model provider)
+    health_model_check_ttl: int = 30  # Seconds a model provider check result is reused
     
     # Embedding Configuration
     embedding_model: str = "text-embedding-3-small"
@@ -45,7 +70,163 @@ class Settings(BaseSettings):
     chunk_size: int = 1000
     chunk_overlap: int = 200
 
+    # Bulk Ingestion
+    ingest_workers: int = 0  # Chunking processes (0 = CPU count)
+    ingest_embed_batch_size: int = 256  # Texts per embedding request
+    ingest_embed_concurrency: int = 4  # Embedding requests in flight
+    ingest_embed_requests_per_minute: int = 3000
+    ingest_embed_tokens_per_minute: int = 1000000
+    ingest_insert_batch_size: int = 500  # Rows per multi-row INSERT
+    ingest_job_history: int = 256  # Ingestion jobs kept for GET /knowledge/ingest/{id}
+    ingest_job_ttl: int = 3600  # Seconds a finished job stays queryable
+
+    # Vector Index (common_knowledge_chunks)
+    vector_index_type: str = "hnsw"  # "hnsw" or "ivfflat"
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 40  # Applied per query (SET LOCAL hnsw.ef_search)
+    ivfflat_lists: int = 0  # 0 = derive from row count at build time
+    ivfflat_probes: int = 10  # Applied per query (SET LOCAL ivfflat.probes)
+    vector_index_maintenance_work_mem: str = "2GB"
+    vector_index_build_workers: int = 2
+    # Compact vectors the ANN index is built on: "none", "halfvec", "binary" or
+    # "matryoshka" (pgvector >= 0.7; candidates are re-scored at full precision)
+    vector_quantization: str = "none"
+    vector_quantization_dimensions: int = 512  # Leading dimensions kept by "matryoshka"
+    vector_rescore_factor: int = 4  # Compact-index candidates per result
+
+    # Knowledge Retrieval (defaults for every agent)
+    knowledge_search_mode: str = "hybrid"  # "vector", "keyword" or "hybrid" (RRF)
+    knowledge_search_candidates: int = 30  # Candidate pool per search source
+    knowledge_search_top_k: int = 5  # Chunks that end up in the prompt
+    knowledge_search_rerank: bool = False  # Local cross-encoder re-ranking
+    knowledge_search_max_tokens: int = 2500  # Chunk text per search (0 = top_k only)
+    knowledge_content_language: str = "english"  # Full-text search configuration
+    knowledge_reranker_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    knowledge_search_coalesce: bool = True  # Share identical in-flight embeddings/searches
+    # Per-agent overrides, e.g. {"general-assistant": {"mode": "vector"}}
+    knowledge_search_overrides: Dict[str, Dict[str, Any]] = {}
+
+    # Knowledge Replica (in-process copy of the chunk vectors, opt-in)
+    knowledge_replica_enabled: bool = False
+    knowledge_replica_dir: str = "data/knowledge_replica"  # Snapshots, memory-mapped by every worker
+    knowledge_replica_dtype: str = "float32"  # "float32" or "float16" (half the memory)
+    knowledge_replica_max_bytes: int = 536870912  # Larger matrices stay in pgvector
+    knowledge_replica_max_lag: float = 5.0  # Seconds without a confirmed change feed before falling back
+    knowledge_replica_max_delta: int = 5000  # Changed rows applied in memory before a new snapshot
+
+    # Knowledge Scope (region/service metadata filters on agent searches)
+    knowledge_scope_enabled: bool = True  # Scope searches to the session's region/service once known
+    knowledge_scope_indexes: bool = True  # Partial ANN indexes per region and service (built with the index)
+
+    # Knowledge Prefetch (speculative retrieval on the user's message, opt-in)
+    knowledge_prefetch_enabled: bool = False
+    knowledge_prefetch_agents: List[str] = ["helpdesk-assistant", "general-assistant"]
+    knowledge_prefetch_min_overlap: float = 0.8  # Share of a search query's words found in the message
+    knowledge_prefetch_inject: bool = False  # Also add the prefetched chunks to the prompt
+
+    # Embedding Cache (memory LRU + Postgres table in the pgvector DB)
+    embedding_cache_enabled: bool = True
+    embedding_cache_memory_size: int = 10000
+    embedding_cache_persistent: bool = True
+
+    # Context Budget (prompt token cap per model call, rolling session summaries)
+    context_max_prompt_tokens: int = 8000  # 0 = no cap
+    context_budget_overrides: Dict[str, int] = {}  # e.g. {"general-assistant": 4000}
+    context_summary_enabled: bool = True
+    context_summary_keep_turns: int = 3  # Newest history turns replayed verbatim, older ones summarized
+    context_summary_model: Optional[str] = None  # Defaults to OPENROUTER_MODEL
+    context_summary_max_words: int = 250
+
+    # Admission Control (agent runs per model, per worker process)
+    admission_enabled: bool = True
+    admission_max_concurrency: int = 32  # Runs holding a model slot
+    admission_max_per_tenant: int = 2  # Concurrent runs per user/session
+    admission_max_queue: int = 100  # Waiting runs before 503
+    admission_max_wait: float = 30.0  # Seconds a run may wait for a slot
+    admission_requests_per_minute: int = 0  # Provider RPM per model (0 = unlimited)
+    admission_tokens_per_minute: int = 0  # Provider input TPM per model (0 = unlimited)
+    # Per-model overrides, e.g. {"google/gemini-2.5-flash": {"requests_per_minute": 500}}
+    admission_model_overrides: Dict[str, Dict[str, Any]] = {}
+
+    # Model Routing (fallback chain, hedged requests, fast path for simple turns)
+    model_fallbacks: List[str] = []  # Tried in order after OPENROUTER_MODEL
+    model_fast: Optional[str] = None  # Smaller model for greetings and pure price lookups
+    model_timeout: float = 60.0  # Seconds per attempt (connect/read, so time to first token for streams)
+    model_timeouts: Dict[str, float] = {}  # Per-model overrides, e.g. {"openai/gpt-4o-mini": 20}
+    model_hedge_after: float = 0.0  # Seconds before a duplicate request is sent (0 = off)
+    model_circuit_failures: int = 5  # Consecutive failures that open a model's circuit
+    model_circuit_cooldown: float = 30.0  # Seconds before an open circuit lets a probe through
+
+    # Agent Tools (compact outputs, memoized pure tools, thread pool for blocking tools)
+    tool_workers: int = 16  # Threads running blocking tool functions, per worker process
+    tool_cache_size: int = 4096  # Memoized results per tool
+    price_tool_cache_ttl: float = 300.0  # Seconds a quote is reused for the same arguments (0 = off)
+
+    # Session Store (per-process cache of hot sessions, write-behind persistence)
+    session_cache_enabled: bool = True
+    session_cache_size: int = 1000  # Sessions kept per worker
+    session_cache_ttl: int = 1800  # Seconds an idle session stays cached
+    session_flush_interval: float = 0.2  # Seconds between write-behind passes
+    session_flush_max_delay: float = 5.0  # Upper bound on unflushed changes, even mid-stream
+    # Only trust a cached session on the worker its affinity cookie names
+    # (set false when running a single worker)
+    session_affinity: bool = True
+    session_affinity_cookie: str = "session_worker"
+
+    # Session Archive (zstd cold storage of old runs and idle sessions, opt-in;
+    # requires the `archive` extra)
+    session_archive_enabled: bool = False
+    session_archive_interval: int = 3600  # Seconds between archival passes
+    session_archive_idle_days: float = 30.0  # Sessions untouched this long move to cold storage
+    session_hot_runs: int = 20  # Newest runs per session kept in the runs table (0 = all)
+    session_archive_batch: int = 500  # Max sessions and runs moved per pass
+    session_archive_zstd_level: int = 10
+
+    # Pricing Fast Path (quotes answered without running the agent)
+    price_router_enabled: bool = True
+    price_router_agents: List[str] = ["helpdesk-assistant"]
+
+    # Semantic Response Cache (first-turn FAQ answers, opt-in)
+    response_cache_enabled: bool = False
+    response_cache_agents: List[str] = ["helpdesk-assistant"]
+    response_cache_similarity: float = 0.95  # Minimum cosine similarity for a hit
+    response_cache_ttl: int = 86400  # Seconds
+    response_cache_max_entries: int = 500
+
+    # Observability (Prometheus scrape endpoint, optional OTLP traces)
+    metrics_enabled: bool = True
+    metrics_path: str = "/api/v1/metrics"  # AgentOS already serves its own /metrics
+    otel_exporter_otlp_endpoint: Optional[str] = None  # e.g. http://otel-collector:4318/v1/traces
+    otel_service_name: str = "electrodry-helpdesk"
+
+    # Pricing (compiled once, hot-reloadable via POST /api/v1/pricing/reload)
+    pricing_source: str = "builtin"  # "builtin", "csv" or "db" (ai.pricing_* tables)
+    pricing_csv_dir: Optional[str] = None  # services.csv, service_regions.csv, postcodes.csv
+    # Announce reloads over Postgres LISTEN/NOTIFY so every worker reloads
+    pricing_reload_broadcast: bool = True
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Load the settings from the environment (and ``.env``) on first use."""
+    return Settings()
+
+
+class _LazySettings:
+    """Stand-in for the settings that loads them on first attribute access."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(get_settings(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(get_settings(), name)
+
 
-# Global settings instance
-settings = Settings()
+# Global settings instance: importing this module does not read the
+# environment, so modules can be imported without credentials
+settings: Settings = _LazySettings()  # type: ignore[assignment]
 
@@ -0,0 +1,230 @@
+"""Prompt token budgeting for agent runs.
+
+Every model call of an agent is capped at ``max_prompt_tokens``. When the
+prompt is over budget the history replayed by Agno is reduced, oldest
+first:
+
+1. History turns already covered by the session's rolling summary are dropped
+   (see ``app.core.rolling_summary``)
+2. Tool results (knowledge search output) of older history turns are
+   replaced by a short placeholder
+3. Whole history turns are dropped until the prompt fits
+
+The system message and the current run are never touched; knowledge
+chunks returned by searches are capped separately by the retriever (see
+``fit_documents``). Tokens saved are counted in
+``agent_context_tokens_saved`` and in ``run_output.metadata``.
+"""
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from agno.knowledge.document import Document
+from agno.models.message import Message
+from agno.models.openai import OpenAIChat
+from agno.models.response import ModelResponse
+from agno.utils.tokens import count_text_tokens, count_tokens, count_tool_tokens
+
+from app.core.admission import get_admission_controller
+from app.core.config import settings
+from app.core.metrics import CONTEXT_TOKENS_SAVED, current_agent
+
+logger = logging.getLogger(__name__)
+
+# History turns of the current session not yet covered by its rolling summary
+# (None = no summary, replay whatever Agno selected)
+uncovered_history_turns: ContextVar[Optional[int]] = ContextVar("uncovered_history_turns", default=None)
+
+OMITTED_TOOL_RESULT = "[Tool result omitted from history to fit the context budget]"
+
+
+def get_max_prompt_tokens(agent_id: str) -> int:
+    """Prompt token cap of an agent (``context_budget_overrides`` wins), 0 = none."""
+    return settings.context_budget_overrides.get(agent_id, settings.context_max_prompt_tokens)
+
+
+def _turns(messages: Sequence[Message]) -> List[List[int]]:
+    """Indexes of history messages grouped into turns (each starting at a user message)."""
+    turns: List[List[int]] = []
+    for i, message in enumerate(messages):
+        if not message.from_history:
+            continue
+        if message.role == "user" or not turns:
+            turns.append([i])
+        else:
+            turns[-1].append(i)
+    return turns
+
+
+def fit_history(
+    messages: List[Message],
+    max_tokens: int,
+    keep_turns: Optional[int] = None,
+    extra_tokens: int = 0,
+    model_id: str = "gpt-4o",
+) -> Tuple[List[Message], int, int]:
+    """
+    Reduce replayed history so the prompt fits ``max_tokens``.
+
+    Args:
+        messages: Messages of a model call (history is ``from_history``)
+        max_tokens: Prompt budget (0 = only apply ``keep_turns``)
+        keep_turns: Keep at most this many of the newest history turns
+        extra_tokens: Tokens outside the messages (tool definitions)
+        model_id: Model id used to pick the tokenizer
+
+    Returns:
+        Messages to send, prompt tokens before and after
+    """
+    sizes = [count_tokens([m], model_id=model_id) for m in messages]
+    before = extra_tokens + sum(sizes)
+    turns = _turns(messages)
+    if not turns:
+        return messages, before, before
+
+    total = before
+    dropped: set = set()
+    replaced: Dict[int, Message] = {}
+
+    def drop(turn: List[int]) -> None:
+        nonlocal total
+        for i in turn:
+            if i not in dropped:
+                dropped.add(i)
+                total -= sizes[i]
+
+    if keep_turns is not None and len(turns) > keep_turns:
+        for turn in turns[:len(turns) - keep_turns]:
+            drop(turn)
+
+    if max_tokens and total > max_tokens:
+        for turn in turns[:-1]:
+            for i in turn:
+                if i in dropped or messages[i].role != "tool":
+                    continue
+                stub = messages[i].model_copy(update={"content": OMITTED_TOOL_RESULT})
+                stub_tokens = count_tokens([stub], model_id=model_id)
+                if stub_tokens < sizes[i]:
+                    replaced[i] = stub
+                    total -= sizes[i] - stub_tokens
+                    sizes[i] = stub_tokens
+            if total <= max_tokens:
+                break
+
+    if max_tokens:
+        for turn in turns:
+            if total <= max_tokens:
+                break
+            drop(turn)
+
+    if total == before:
+        return messages, before, before
+    fitted = [replaced.get(i, m) for i, m in enumerate(messages) if i not in dropped]
+    return fitted, before, total
+
+
+def fit_documents(
+    documents: List[Document], max_tokens: int, model_id: str = "gpt-4o"
+) -> Tuple[List[Document], int]:
+    """
+    Keep ranked documents while they fit ``max_tokens``.
+
+    The best document is always kept (truncated if it alone is over budget).
+
+    Returns:
+        Documents to use and tokens saved
+    """
+    if not max_tokens or not documents:
+        return documents, 0
+    kept: List[Document] = []
+    used = saved = 0
+    for doc in documents:
+        tokens = count_text_tokens(doc.content, model_id)
+        if used + tokens <= max_tokens:
+            kept.append(doc)
+            used += tokens
+        elif not kept:
+            # ~4 characters per token; only the head of an oversized chunk is used
+            doc.content = doc.content[:max_tokens * 4]
+            kept.append(doc)
+            used = count_text_tokens(doc.content, model_id)
+            saved += tokens - used
+        else:
+            saved += tokens
+    return kept, saved
+
+
+def record_saved(agent_id: Optional[str], source: str, tokens: int, run_response: Any = None) -> None:
+    """Count tokens kept out of the prompt (metrics and run metadata)."""
+    if tokens <= 0:
+        return
+    CONTEXT_TOKENS_SAVED.labels(agent_id or current_agent.get(), source).inc(tokens)
+    if run_response is not None:
+        if run_response.metadata is None:
+            run_response.metadata = {}
+        key = f"context_tokens_saved_{source}"
+        run_response.metadata[key] = run_response.metadata.get(key, 0) + tokens
+
+
+@dataclass
+class BudgetedOpenAIChat(OpenAIChat):
+    """
+    OpenAIChat that fits every request into a prompt token budget.
+
+    Only the list sent to the API is reduced; the run's own messages (and
+    what Agno stores in the session) are left as they are. Calls are also
+    paced by the model's provider rate limits (see ``app.core.admission``).
+    """
+
+    max_prompt_tokens: int = 0
+
+    def _fit(self, messages: List[Message], kwargs: Dict[str, Any]) -> Tuple[List[Message], int]:
+        """Messages to send and their prompt tokens (0 when not counted)."""
+        keep_turns = uncovered_history_turns.get()
+        controller = get_admission_controller(self.id) if settings.admission_enabled else None
+        count_only = controller is not None and controller.tokens is not None
+        if not self.max_prompt_tokens and keep_turns is None and not count_only:
+            return messages, 0
+        try:
+            tools = kwargs.get("tools")
+            extra = count_tool_tokens(tools, self.id) if tools else 0
+            fitted, before, after = fit_history(
+                messages, self.max_prompt_tokens, keep_turns=keep_turns, extra_tokens=extra, model_id=self.id
+            )
+        except Exception as e:
+            # Never fail a run over budgeting (e.g. a tokenizer that cannot load)
+            logger.warning(f"Context budget skipped: {e}")
+            return messages, 0
+        if after < before:
+            run_response = kwargs.get("run_response")
+            record_saved(getattr(run_response, "agent_id", None), "history", before - after, run_response)
+            logger.debug(f"Prompt fitted to budget: {before} -> {after} tokens")
+        elif self.max_prompt_tokens and after > self.max_prompt_tokens:
+            logger.warning(f"Prompt over budget without history to trim ({after} tokens)")
+        return fitted, after
+
+    def _prepare(self, messages: List[Message], kwargs: Dict[str, Any]) -> List[Message]:
+        messages, tokens = self._fit(messages, kwargs)
+        if settings.admission_enabled:
+            get_admission_controller(self.id).throttle(tokens)
+        return messages
+
+    async def _aprepare(self, messages: List[Message], kwargs: Dict[str, Any]) -> List[Message]:
+        messages, tokens = self._fit(messages, kwargs)
+        if settings.admission_enabled:
+            await get_admission_controller(self.id).athrottle(tokens)
+        return messages
+
+    def invoke(self, messages: List[Message], **kwargs: Any) -> ModelResponse:
+        return super().invoke(messages=self._prepare(messages, kwargs), **kwargs)
+
+    async def ainvoke(self, messages: List[Message], **kwargs: Any) -> ModelResponse:
+        return await super().ainvoke(messages=await self._aprepare(messages, kwargs), **kwargs)
+
+    def invoke_stream(self, messages: List[Message], **kwargs: Any) -> Iterator[ModelResponse]:
+        yield from super().invoke_stream(messages=self._prepare(messages, kwargs), **kwargs)
+
+    async def ainvoke_stream(self, messages: List[Message], **kwargs: Any) -> AsyncIterator[ModelResponse]:
+        async for response in super().ainvoke_stream(messages=await self._aprepare(messages, kwargs), **kwargs):
+            yield response
@@ -3,41 +3,218 @@
 Architecture:
 - Supabase: Used ONLY for user authentication (Supabase Auth)
 - PgVector: Local PostgreSQL with pgvector for vector embeddings and knowledge base
+
+All PostgreSQL consumers (agent sessions, knowledge contents, vector store)
+share one SQLAlchemy engine - and therefore one connection pool - per DB URL.
 """
-from typing import Optional
-from supabase import create_client, Client
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from agno.db.postgres import PostgresDb
 from app.core.config import settings
+from app.core.metrics import stage
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Supabase client for authentication only (created on first use)
+_supabase_client: Optional["Client"] = None
+_supabase_lock = threading.Lock()
+
+# Process-wide engine registry keyed by DB URL
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
 
-# Supabase client for authentication only
-supabase: Client = create_client(
-    settings.supabase_url,
-    settings.supabase_service_key
-)
+# Async engines (psycopg3 async driver) keyed by DB URL
+_async_engines: Dict[str, AsyncEngine] = {}
+
+# Statements executed per engine (reported with the pool status)
+_query_counts: Dict[Engine, int] = {}
 
 # Singleton PostgresDb instance for agent sessions
 _agent_db_instance: Optional[PostgresDb] = None
 
 
-def get_supabase() -> Client:
-    """Get Supabase client instance for authentication."""
-    return supabase
+def get_supabase() -> "Client":
+    """Get (or create on first use) the Supabase client for authentication."""
+    global _supabase_client
+    if _supabase_client is None:
+        with _supabase_lock:
+            if _supabase_client is None:
+                # Imported here: the supabase package is slow to import
+                from supabase import create_client
+
+                _supabase_client = create_client(
+                    settings.supabase_url,
+                    settings.supabase_service_key
+                )
+    return _supabase_client
+
+
+def get_engine(db_url: Optional[str] = None) -> Engine:
+    """
+    Get or create the shared SQLAlchemy engine for a database URL.
+
+    Pool sizing follows ``database_pool_size``/``database_max_overflow`` so
+    the total number of Postgres connections per process is bounded no
+    matter how many agents, vector stores or content DBs use the URL.
+
+    Args:
+        db_url: Database URL (defaults to settings.pgvector_db_url)
+
+    Returns:
+        Shared engine for the URL
+    """
+    db_url = db_url or settings.pgvector_db_url
+    engine = _engines.get(db_url)
+    if engine is not None:
+        return engine
+
+    with _engines_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = create_engine(
+                db_url,
+                pool_size=settings.database_pool_size,
+                max_overflow=settings.database_max_overflow,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+            )
+            _query_counts[engine] = 0
+            event.listen(engine, "before_cursor_execute", _count_query)
+            _engines[db_url] = engine
+    return engine
+
+
+def get_async_engine(db_url: Optional[str] = None) -> AsyncEngine:
+    """
+    Get or create the shared async engine for a database URL.
+
+    Used where the event loop must not wait on Postgres (session store
+    loads and write-behind flushes); sized like ``get_engine``.
+    """
+    db_url = db_url or settings.pgvector_db_url
+    with _engines_lock:
+        engine = _async_engines.get(db_url)
+        if engine is None:
+            engine = create_async_engine(
+                db_url,
+                pool_size=settings.database_pool_size,
+                max_overflow=settings.database_max_overflow,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+            )
+            _async_engines[db_url] = engine
+    return engine
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Unlocked increment: the counter is a diagnostic, not an exact tally
+    _query_counts[conn.engine] += 1
+
+
+def get_pool_status() -> Dict[str, Dict[str, Any]]:
+    """
+    Report connection pool usage for every registered engine.
+
+    Returns:
+        Mapping of (password-masked) DB URL to pool counters
+    """
+    status: Dict[str, Dict[str, Any]] = {}
+    for engine in list(_engines.values()):
+        pool = engine.pool
+        status[engine.url.render_as_string(hide_password=True)] = {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.database_max_overflow,
+            "queries": _query_counts.get(engine, 0),
+        }
+    return status
+
+
+def to_vector_literal(embedding: Sequence[float]) -> str:
+    """Format an embedding as a pgvector literal for ``CAST(:x AS vector)``."""
+    return "[" + ",".join(f"{v:.7g}" for v in embedding) + "]"
+
+
+def dispose_engines() -> None:
+    """Close all pooled connections (used on shutdown)."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+
+
+def reset_after_fork() -> None:
+    """
+    Drop pooled connections inherited from the parent process.
+
+    Called in every forked server worker; the parent's connections are left
+    open for the parent (``close=False``) and each worker opens its own.
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose(close=False)
+        _async_engines.clear()
+
+
+async def dispose_async_engines() -> None:
+    """Close all pooled async connections (used on shutdown)."""
+    for engine in list(_async_engines.values()):
+        await engine.dispose()
+
+
+class InstrumentedPostgresDb(PostgresDb):
+    """
+    PostgresDb that records session load/save times per agent run and
+    restores archived sessions when they are read again.
+    """
+
+    def get_session(self, session_id: str, *args: Any, **kwargs: Any) -> Any:
+        with stage("session_load"):
+            session = super().get_session(session_id, *args, **kwargs)
+            if session is None and settings.session_archive_enabled:
+                # Imported here: the archive reflects this DB's tables
+                from app.core.session_archive import restore_session
+
+                if restore_session(session_id):
+                    session = super().get_session(session_id, *args, **kwargs)
+            return session
+
+    def upsert_session(self, *args: Any, **kwargs: Any) -> Any:
+        with stage("session_save"):
+            return super().upsert_session(*args, **kwargs)
+
+    def upsert_run(self, *args: Any, **kwargs: Any) -> None:
+        with stage("session_save"):
+            super().upsert_run(*args, **kwargs)
 
 
 def get_agent_db() -> PostgresDb:
     """
     Get or create the shared PostgresDb instance for agent sessions.
     Uses local pgvector database.
-    
+
     This ensures all agents share the same database connection pool
-    and session table for better resource management.
+    and session table for better resource management. With
+    ``session_cache_enabled`` it is a ``SessionStore`` caching hot sessions
+    and persisting them write-behind.
     """
     global _agent_db_instance
     if _agent_db_instance is None:
-        _agent_db_instance = PostgresDb(
-            db_url=settings.pgvector_db_url,
+        if settings.session_cache_enabled:
+            # Imported here: the session store builds on InstrumentedPostgresDb
+            from app.core.session_store import SessionStore
+
+            db_class = SessionStore
+        else:
+            db_class = InstrumentedPostgresDb
+        _agent_db_instance = db_class(
+            id="agent-db",
+            db_engine=get_engine(),
             session_table="agent_sessions"
         )
     return _agent_db_instance
-
-
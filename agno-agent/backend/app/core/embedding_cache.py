@@ -0,0 +1,327 @@
+"""Two-tier embedding cache (in-memory LRU + Postgres table).
+
+Embeddings are keyed by (model, dimensions, normalized text hash), so a
+repeated customer question or an unchanged document chunk is never sent
+to the embedding API twice. The wrapper is a drop-in ``Embedder`` and is
+used for both query embeddings (knowledge search) and document
+embeddings (ingestion). With ``coalesce`` on, concurrent requests for the
+same single text share one in-flight lookup/embedding call.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from agno.knowledge.embedder.base import Embedder
+from sqlalchemy import text as sql
+from sqlalchemy.engine import Engine
+
+from app.core.cache import TTLCache
+from app.core.metrics import stage
+from app.core.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+Embedding = List[float]
+Usage = Optional[Dict[str, Any]]
+
+
+def normalize_text(value: str) -> str:
+    """Normalize text before hashing/embedding (NFC, collapsed whitespace)."""
+    return " ".join(unicodedata.normalize("NFC", value).split())
+
+
+def embed_texts(embedder: Embedder, texts: List[str]) -> Tuple[List[Embedding], List[Usage]]:
+    """
+    Embed several texts with as few upstream requests as possible.
+
+    Agno embedders only expose batching on the async interface, so the
+    async batch call is driven from here when the caller is not already
+    inside an event loop (e.g. ingestion worker threads). Otherwise each
+    text is embedded on its own.
+    """
+    if len(texts) > 1:
+        if hasattr(embedder, "get_embeddings_batch_and_usage"):
+            return embedder.get_embeddings_batch_and_usage(texts)
+        if hasattr(embedder, "async_get_embeddings_batch_and_usage"):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(embedder.async_get_embeddings_batch_and_usage(texts))
+    results = [embedder.get_embedding_and_usage(t) for t in texts]
+    return [e for e, _ in results], [u for _, u in results]
+
+
+def _pack(embedding: Sequence[float]) -> bytes:
+    return array("f", embedding).tobytes()
+
+
+def _unpack(payload: bytes) -> Embedding:
+    values = array("f")
+    values.frombytes(payload)
+    return values.tolist()
+
+
+@dataclass
+class CachingEmbedder(Embedder):
+    """
+    Embedder wrapper that serves repeated texts from cache.
+
+    Lookups go memory -> Postgres -> wrapped embedder, and misses are
+    written back to both tiers. Batch calls resolve all cached texts with
+    a single query and only send the misses upstream. Single-text calls
+    (query embeddings) are coalesced when ``coalesce`` is set; only the
+    caller that made the upstream call gets its usage.
+    """
+
+    embedder: Optional[Embedder] = None
+    memory_size: int = 10000
+    db_engine: Optional[Engine] = None
+    schema: str = "ai"
+    table_name: str = "embedding_cache"
+    coalesce: bool = False
+
+    memory_hits: int = field(default=0, init=False)
+    db_hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        if self.embedder is None:
+            raise ValueError("CachingEmbedder requires an embedder to wrap")
+        self.dimensions = self.embedder.dimensions
+        self.enable_batch = True
+        self.batch_size = getattr(self.embedder, "batch_size", self.batch_size)
+        self._memory: TTLCache[Embedding] = TTLCache(max_size=self.memory_size)
+        self._stats_lock = threading.Lock()
+        self._table_ready = False
+
+    @property
+    def model_id(self) -> str:
+        return getattr(self.embedder, "id", type(self.embedder).__name__)
+
+    # ------------------------------------------------------------------
+    # Keys and storage tiers
+    # ------------------------------------------------------------------
+
+    def cache_key(self, value: str) -> str:
+        """Cache key for a (normalized) text under the wrapped model."""
+        digest = hashlib.sha256(normalize_text(value).encode("utf-8")).hexdigest()
+        return f"{self.model_id}:{self.dimensions}:{digest}"
+
+    def _table(self) -> str:
+        return f"{self.schema}.{self.table_name}"
+
+    def _ensure_table(self) -> None:
+        if self._table_ready or self.db_engine is None:
+            return
+        with self.db_engine.begin() as conn:
+            conn.execute(sql(f"CREATE SCHEMA IF NOT EXISTS {self.schema}"))
+            conn.execute(sql(
+                f"CREATE TABLE IF NOT EXISTS {self._table()} ("
+                " cache_key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " dimensions INTEGER NOT NULL,"
+                " embedding BYTEA NOT NULL,"
+                " created_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+            ))
+        self._table_ready = True
+
+    def _db_get_many(self, keys: List[str]) -> Dict[str, Embedding]:
+        if self.db_engine is None or not keys:
+            return {}
+        try:
+            self._ensure_table()
+            with self.db_engine.connect() as conn:
+                rows = conn.execute(
+                    sql(
+                        f"SELECT cache_key, embedding FROM {self._table()}"
+                        " WHERE cache_key = ANY(:keys)"
+                    ),
+                    {"keys": keys},
+                ).fetchall()
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return {}
+        return {row.cache_key: _unpack(bytes(row.embedding)) for row in rows}
+
+    def _db_put_many(self, entries: Dict[str, Embedding]) -> None:
+        if self.db_engine is None or not entries:
+            return
+        try:
+            self._ensure_table()
+            with self.db_engine.begin() as conn:
+                conn.execute(
+                    sql(
+                        f"INSERT INTO {self._table()}"
+                        " (cache_key, model, dimensions, embedding)"
+                        " VALUES (:cache_key, :model, :dimensions, :embedding)"
+                        " ON CONFLICT (cache_key) DO NOTHING"
+                    ),
+                    [
+                        {
+                            "cache_key": key,
+                            "model": self.model_id,
+                            "dimensions": len(embedding),
+                            "embedding": _pack(embedding),
+                        }
+                        for key, embedding in entries.items()
+                    ],
+                )
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    def _count(self, memory: int = 0, db: int = 0, missed: int = 0) -> None:
+        with self._stats_lock:
+            self.memory_hits += memory
+            self.db_hits += db
+            self.misses += missed
+
+    def lookup_many(self, texts: Sequence[str]) -> Tuple[List[str], Dict[str, Embedding]]:
+        """
+        Resolve cached embeddings for ``texts`` from memory and Postgres.
+
+        Returns:
+            The cache key for every text and a mapping of key -> embedding
+            for the keys that were found.
+        """
+        keys = [self.cache_key(t) for t in texts]
+        found: Dict[str, Embedding] = {}
+        for key in keys:
+            cached = self._memory.get(key)
+            if cached is not None:
+                found[key] = cached
+        memory_hits = len(found)
+
+        pending = [k for k in dict.fromkeys(keys) if k not in found]
+        from_db = self._db_get_many(pending)
+        for key, embedding in from_db.items():
+            self._memory.set(key, embedding)
+        found.update(from_db)
+
+        self._count(memory=memory_hits, db=len(from_db))
+        return keys, found
+
+    def store_many(self, entries: Dict[str, Embedding]) -> None:
+        """Write freshly computed embeddings to both cache tiers."""
+        for key, embedding in entries.items():
+            self._memory.set(key, embedding)
+        self._db_put_many(entries)
+
+    # ------------------------------------------------------------------
+    # Embedder interface
+    # ------------------------------------------------------------------
+
+    def get_embedding(self, text: str) -> Embedding:
+        return self.get_embedding_and_usage(text)[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[Embedding, Usage]:
+        if not self.coalesce:
+            return self._embed_one(text)
+        (embedding, usage), shared = get_single_flight("embedding").do(
+            self.cache_key(text), self._embed_one, text
+        )
+        return embedding, None if shared else usage
+
+    def _embed_one(self, text: str) -> Tuple[Embedding, Usage]:
+        embeddings, usages = self.get_embeddings_batch_and_usage([text])
+        return embeddings[0], usages[0]
+
+    def get_embeddings_batch_and_usage(
+        self, texts: List[str]
+    ) -> Tuple[List[Embedding], List[Usage]]:
+        keys, found = self.lookup_many(texts)
+        missing = self._missing(texts, keys, found)
+        usages: Dict[str, Usage] = {}
+        if missing:
+            computed: Dict[str, Embedding] = {}
+            for batch in self._batches(list(missing.items())):
+                embeddings, batch_usages = self._embed_batch([t for _, t in batch])
+                for (key, _), embedding, usage in zip(batch, embeddings, batch_usages):
+                    computed[key] = embedding
+                    usages[key] = usage
+            self.store_many(computed)
+            found.update(computed)
+        return [found[k] for k in keys], [usages.get(k) for k in keys]
+
+    async def async_get_embedding(self, text: str) -> Embedding:
+        return (await self.async_get_embedding_and_usage(text))[0]
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[Embedding, Usage]:
+        if not self.coalesce:
+            return await self._async_embed_one(text)
+        (embedding, usage), shared = await get_single_flight("embedding").ado(
+            self.cache_key(text), self._async_embed_one, text
+        )
+        return embedding, None if shared else usage
+
+    async def _async_embed_one(self, text: str) -> Tuple[Embedding, Usage]:
+        embeddings, usages = await self.async_get_embeddings_batch_and_usage([text])
+        return embeddings[0], usages[0]
+
+    async def async_get_embeddings_batch_and_usage(
+        self, texts: List[str]
+    ) -> Tuple[List[Embedding], List[Usage]]:
+        keys, found = await asyncio.to_thread(self.lookup_many, texts)
+        missing = self._missing(texts, keys, found)
+        usages: Dict[str, Usage] = {}
+        if missing:
+            computed: Dict[str, Embedding] = {}
+            for batch in self._batches(list(missing.items())):
+                embeddings, batch_usages = await self._async_embed_batch([t for _, t in batch])
+                for (key, _), embedding, usage in zip(batch, embeddings, batch_usages):
+                    computed[key] = embedding
+                    usages[key] = usage
+            await asyncio.to_thread(self.store_many, computed)
+            found.update(computed)
+        return [found[k] for k in keys], [usages.get(k) for k in keys]
+
+    # ------------------------------------------------------------------
+    # Upstream calls
+    # ------------------------------------------------------------------
+
+    def _missing(
+        self, texts: Sequence[str], keys: List[str], found: Dict[str, Embedding]
+    ) -> Dict[str, str]:
+        missing = {
+            key: normalize_text(value)
+            for key, value in zip(keys, texts)
+            if key not in found
+        }
+        self._count(missed=len(missing))
+        return missing
+
+    def _batches(self, items: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        size = max(1, self.batch_size)
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def _embed_batch(self, texts: List[str]) -> Tuple[List[Embedding], List[Usage]]:
+        with stage("embedding", texts=len(texts)):
+            return embed_texts(self.embedder, texts)
+
+    async def _async_embed_batch(self, texts: List[str]) -> Tuple[List[Embedding], List[Usage]]:
+        with stage("embedding", texts=len(texts)):
+            if len(texts) > 1 and hasattr(self.embedder, "async_get_embeddings_batch_and_usage"):
+                return await self.embedder.async_get_embeddings_batch_and_usage(texts)
+            results = await asyncio.gather(
+                *(self.embedder.async_get_embedding_and_usage(t) for t in texts)
+            )
+        return [e for e, _ in results], [u for _, u in results]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for both tiers."""
+        lookups = self.memory_hits + self.db_hits + self.misses
+        hits = self.memory_hits + self.db_hits
+        return {
+            "model": self.model_id,
+            "dimensions": self.dimensions,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory": self._memory.stats(),
+            "persistent": self.db_engine is not None,
+        }
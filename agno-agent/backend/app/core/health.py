@@ -0,0 +1,115 @@
+"""Liveness and readiness probes.
+
+Liveness answers whether the worker should be restarted: its event loop
+serves requests and its background tasks (session write-behind flusher)
+are running. Readiness answers whether it should get traffic: the DB pool
+hands out a working connection and the model provider is reachable with at
+least one model of the chain not circuit-broken. Model provider checks are
+reused for ``health_model_check_ttl`` seconds so frequent probes do not
+turn into provider traffic.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from sqlalchemy import text as sql
+
+from app.core.config import settings
+from app.core.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+_started_at = time.time()
+# Last model provider check: (checked_at, result)
+_provider_check: Optional[Tuple[float, Dict[str, Any]]] = None
+# Background tasks that must keep running for the worker to be alive
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+def watch_task(name: str, task: asyncio.Task) -> None:
+    """Fail liveness if a background task dies."""
+    _tasks[name] = task
+
+
+def _select_one() -> None:
+    with get_engine().connect() as conn:
+        conn.execute(sql("SELECT 1"))
+
+
+async def check_database() -> Dict[str, Any]:
+    """Check out a pooled connection and run a query."""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.to_thread(_select_one), settings.health_check_timeout)
+    except Exception as e:
+        # The probe is unauthenticated: the message (host, port, user) is only logged
+        logger.warning(f"Readiness database check failed: {e!r}")
+        return {"ok": False, "error": type(e).__name__}
+    return {
+        "ok": True,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def _probe_provider() -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(timeout=settings.health_check_timeout) as client:
+            response = await client.get(
+                f"{settings.openrouter_base_url.rstrip('/')}/models",
+                headers={"Authorization": f"Bearer {settings.openrouter_api_key}"},
+            )
+    except Exception as e:
+        logger.warning(f"Readiness model provider check failed: {e!r}")
+        return {"ok": False, "error": type(e).__name__}
+    return {
+        "ok": response.status_code < 500 and response.status_code != 401,
+        "status_code": response.status_code,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def check_models() -> Dict[str, Any]:
+    """Provider reachability (cached) and circuit state of the model chain."""
+    global _provider_check
+    # Imported here: the model router loads the OpenAI SDK (with the agents)
+    from app.core.model_router import get_routing_status
+
+    now = time.monotonic()
+    if _provider_check is None or now - _provider_check[0] >= settings.health_model_check_ttl:
+        _provider_check = (now, await _probe_provider())
+    provider = _provider_check[1]
+
+    chain = [settings.openrouter_model, *settings.model_fallbacks]
+    circuits = get_routing_status()
+    available = [model for model in chain if not circuits.get(model, {}).get("open")]
+    return {
+        "ok": provider["ok"] and bool(available),
+        "provider": provider,
+        "available_models": available,
+    }
+
+
+def liveness() -> Tuple[bool, Dict[str, Any]]:
+    """Whether the worker is healthy enough to keep running."""
+    tasks = {name: not task.done() for name, task in _tasks.items()}
+    alive = all(tasks.values())
+    return alive, {
+        "status": "alive" if alive else "failing",
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - _started_at, 1),
+        "background_tasks": tasks,
+    }
+
+
+async def readiness() -> Tuple[bool, Dict[str, Any]]:
+    """Whether the worker can serve agent runs."""
+    database, models = await asyncio.gather(check_database(), check_models())
+    ready = database["ok"] and models["ok"]
+    return ready, {
+        "status": "ready" if ready else "not_ready",
+        "checks": {"database": database, "models": models},
+    }
@@ -1,48 +1,283 @@
+import copy
+import json
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+from sqlalchemy import and_, select
+from sqlalchemy import text as sql
+from agno.knowledge.document import Document
 from agno.knowledge.knowledge import Knowledge
-from agno.knowledge.embedder.openai import OpenAIEmbedder
-from agno.vectordb.pgvector import PgVector
+from agno.knowledge.embedder.base import Embedder
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector import HNSW, PgVector
+from agno.vectordb.score import normalize_score, score_to_distance_threshold
 from agno.db.postgres import PostgresDb
 from app.core.config import settings
+from app.core.database import get_engine, to_vector_literal
+from app.core.embedding_cache import CachingEmbedder, normalize_text
+from app.core.single_flight import get_single_flight
+from app.knowledge.index import candidate_search_param, get_compact_vectors, get_vector_index_config
+from app.knowledge.scope import scope_condition
 
-def get_knowledge_base() -> Knowledge:
+if TYPE_CHECKING:
+    from app.knowledge.replica import VectorReplica
+
+logger = logging.getLogger(__name__)
+
+# Process-wide registry of knowledge objects keyed by DB URL, so every agent
+# shares one embedder, vector store and contents DB (and one engine/pool).
+_embedder_instance: Optional[Embedder] = None
+_vector_dbs: Dict[str, PgVector] = {}
+_contents_dbs: Dict[str, PostgresDb] = {}
+_knowledge_bases: Dict[str, Knowledge] = {}
+_registry_lock = threading.RLock()
+
+
+class LazyKnowledge(Knowledge):
+    """
+    Knowledge base that does not touch the database when constructed.
+
+    ``Knowledge`` creates the vector table on construction, which made
+    building the agents (and importing ``app.main``) open a connection.
+    Table creation is left to ``ensure_knowledge_schema`` (run by the
+    startup warm-up) and to the ingestion pipeline.
+    """
+
+    def __post_init__(self):
+        vector_db, self.vector_db = self.vector_db, None
+        try:
+            super().__post_init__()
+        finally:
+            self.vector_db = vector_db
+
+
+class ServingPgVector(PgVector):
+    """
+    PgVector used by the agents to serve knowledge searches.
+
+    Searches with the same normalized query, limit, filters and owner that
+    overlap in time run once; every caller gets its own copies of the
+    resulting documents (retrievers truncate and re-score them). Vector
+    searches go to the in-process replica first, when one is attached.
+
+    With ``vector_quantization`` vector searches run on the compact index
+    and re-rank its candidates at full precision. Region/service filters
+    are rendered as the predicates of the partial scope indexes.
+    """
+
+    coalesce: bool = True
+    replica: Optional["VectorReplica"] = None
+
+    def _coalesced(
+        self,
+        kind: str,
+        search: Callable[..., List[Document]],
+        query: str,
+        limit: int,
+        filters: Any,
+        user_id: Optional[str],
+    ) -> List[Document]:
+        if not self.coalesce:
+            return search(query=query, limit=limit, filters=filters, user_id=user_id)
+        key = (
+            kind,
+            self.table_name,
+            normalize_text(query),
+            limit,
+            json.dumps(filters, sort_keys=True, default=str),
+            user_id,
+        )
+        documents, _ = get_single_flight("knowledge_search").do(
+            key, search, query=query, limit=limit, filters=filters, user_id=user_id
+        )
+        return [copy.copy(doc) for doc in documents]
+
+    def _dsl_to_sqlalchemy(self, filter_expr, table):
+        condition = scope_condition(filter_expr)
+        if condition is not None:
+            return condition
+        return super()._dsl_to_sqlalchemy(filter_expr, table)
+
+    def _rescored_vector_search(
+        self, query: str, limit: int = 5, filters: Any = None, user_id: Optional[str] = None
+    ) -> List[Document]:
+        query_embedding = self.embedder.get_embedding(query)
+        if query_embedding is None:
+            logger.error(f"Error getting embedding for Query: {query}")
+            return []
+        compact = get_compact_vectors()
+        candidates = limit * settings.vector_rescore_factor
+        table = self.table
+
+        # Candidates: nearest by the compact expression (served by its index)
+        stmt = select(table.c.id, table.c.name, table.c.meta_data, table.c.content, table.c.usage, table.c.embedding)
+        stmt = self._apply_user_scope(stmt, user_id)
+        if isinstance(filters, dict):
+            stmt = stmt.where(table.c.meta_data.contains(filters))
+        elif filters:
+            stmt = stmt.where(and_(*[
+                self._dsl_to_sqlalchemy(f.to_dict() if hasattr(f, "to_dict") else f, table) for f in filters
+            ]))
+        order = sql(f"{compact.expression} {compact.operator} {compact.query}").bindparams(
+            q=to_vector_literal(query_embedding)
+        )
+        candidate_rows = stmt.order_by(order).limit(candidates).subquery("candidates")
+
+        # Re-rank at full precision
+        distance = candidate_rows.c.embedding.cosine_distance(query_embedding)
+        stmt = select(
+            candidate_rows.c.id,
+            candidate_rows.c.name,
+            candidate_rows.c.meta_data,
+            candidate_rows.c.content,
+            candidate_rows.c.usage,
+            distance.label("distance"),
+        )
+        if self.similarity_threshold is not None:
+            stmt = stmt.where(distance <= score_to_distance_threshold(self.similarity_threshold, Distance.cosine))
+        stmt = stmt.order_by(distance).limit(limit)
+
+        if isinstance(self.vector_index, HNSW):
+            search_param = candidate_search_param("hnsw", self.vector_index.ef_search, candidates)
+        else:
+            search_param = candidate_search_param("ivfflat", self.vector_index.probes, candidates)
+        try:
+            with self.Session() as sess, sess.begin():
+                sess.execute(sql(search_param))
+                results = sess.execute(stmt).fetchall()
+        except Exception as e:
+            logger.error(f"Error performing quantized vector search: {e}")
+            return []
+
+        documents = []
+        for result in results:
+            meta_data = dict(result.meta_data or {})
+            meta_data["similarity_score"] = normalize_score(result.distance, Distance.cosine)
+            documents.append(Document(
+                id=result.id,
+                name=result.name,
+                meta_data=meta_data,
+                content=result.content,
+                embedder=self.embedder,
+                usage=result.usage,
+            ))
+        return documents
+
+    def vector_search(self, query: str, limit: int = 5, filters: Any = None, user_id: Optional[str] = None) -> List[Document]:
+        if self.replica is not None:
+            documents = self.replica.vector_search(query=query, limit=limit, filters=filters, user_id=user_id)
+            if documents is not None:
+                return documents
+        if settings.vector_quantization != "none" and self.distance == Distance.cosine:
+            return self._coalesced("vector", self._rescored_vector_search, query, limit, filters, user_id)
+        return self._coalesced("vector", super().vector_search, query, limit, filters, user_id)
+
+    def keyword_search(self, query: str, limit: int = 5, filters: Any = None, user_id: Optional[str] = None) -> List[Document]:
+        return self._coalesced("keyword", super().keyword_search, query, limit, filters, user_id)
+
+    def hybrid_search(self, query: str, limit: int = 5, filters: Any = None, user_id: Optional[str] = None) -> List[Document]:
+        return self._coalesced("hybrid", super().hybrid_search, query, limit, filters, user_id)
+
+
+def get_embedder() -> Embedder:
     """
-    Create and return the shared Knowledge base instance.
+    Get or create the shared embedder.
+
+    The OpenAI embedder is wrapped in a CachingEmbedder (memory LRU plus a
+    Postgres table, coalescing identical in-flight query embeddings) unless
+    ``embedding_cache_enabled`` is off.
+    """
+    global _embedder_instance
+    if _embedder_instance is None:
+        # Imported here: the OpenAI SDK is slow to import
+        from agno.knowledge.embedder.openai import OpenAIEmbedder
+
+        with _registry_lock:
+            if _embedder_instance is None:
+                embedder: Embedder = OpenAIEmbedder(
+                    id=settings.embedding_model,
+                    dimensions=settings.embedding_dimensions,
+                    api_key=settings.openai_api_key,
+                    base_url=settings.openai_base_url,
+                )
+                if settings.embedding_cache_enabled:
+                    embedder = CachingEmbedder(
+                        embedder=embedder,
+                        memory_size=settings.embedding_cache_memory_size,
+                        db_engine=get_engine() if settings.embedding_cache_persistent else None,
+                        coalesce=settings.knowledge_search_coalesce,
+                    )
+                _embedder_instance = embedder
+    return _embedder_instance
+
+
+def get_vector_db(db_url: Optional[str] = None) -> PgVector:
+    """Get or create the shared PgVector store for a database URL."""
+    db_url = db_url or settings.pgvector_db_url
+    with _registry_lock:
+        if db_url not in _vector_dbs:
+            vector_db = ServingPgVector(
+                table_name="common_knowledge_chunks",
+                db_engine=get_engine(db_url),
+                embedder=get_embedder(),
+                vector_index=get_vector_index_config(),
+                content_language=settings.knowledge_content_language,
+            )
+            vector_db.coalesce = settings.knowledge_search_coalesce
+            if settings.knowledge_replica_enabled:
+                # Imported here: NumPy is only needed with a replica
+                from app.knowledge.replica import get_vector_replica
+
+                vector_db.replica = get_vector_replica(vector_db)
+            _vector_dbs[db_url] = vector_db
+        return _vector_dbs[db_url]
+
+
+def get_contents_db(db_url: Optional[str] = None) -> PostgresDb:
+    """Get or create the shared contents DB (knowledge metadata/status)."""
+    db_url = db_url or settings.pgvector_db_url
+    with _registry_lock:
+        if db_url not in _contents_dbs:
+            _contents_dbs[db_url] = PostgresDb(
+                id="knowledge-contents-db",
+                db_engine=get_engine(db_url),
+                knowledge_table="common_knowledge_contents",
+            )
+        return _contents_dbs[db_url]
+
+
+def get_knowledge_base(db_url: Optional[str] = None) -> Knowledge:
+    """
+    Get or create the shared Knowledge base instance.
     Uses local PgVector database for storage and OpenAI for embeddings.
-    
+
     Following Agno best practices:
     - Uses PostgresDb for content tracking (metadata, status)
     - Uses PgVector for vector embeddings storage
     - Embedder is initialized separately and shared
-    
+
+    The instance is cached per DB URL, so repeated calls (one per agent)
+    return the same object and reuse the engine from ``get_engine``.
+
     Note: Chunking is configured in the Reader when adding content,
-    not in the Knowledge class itself. See settings.chunk_size and 
+    not in the Knowledge class itself. See settings.chunk_size and
     settings.chunk_overlap for the configured values to use in readers.
     """
-    # Initialize embedder (shared between vector db and knowledge base)
-    embedder = OpenAIEmbedder(
-        id=settings.embedding_model,
-        dimensions=settings.embedding_dimensions,
-        api_key=settings.openai_api_key
-    )
-    
-    # Initialize vector database for storing embeddings (local pgvector)
-    vector_db = PgVector(
-        table_name="common_knowledge_chunks",
-        db_url=settings.pgvector_db_url,
-        embedder=embedder,
-    )
-    
-    # Initialize contents database for tracking content metadata (local pgvector)
-    contents_db = PostgresDb(
-        db_url=settings.pgvector_db_url,
-        knowledge_table="common_knowledge_contents",
-    )
-    
-    # Create knowledge base with both databases
-    return Knowledge(
-        name="Common Documentation",
-        vector_db=vector_db,
-        contents_db=contents_db,  # Enables content tracking and management
-        max_results=10,  # Maximum number of search results to return
-    )
+    db_url = db_url or settings.pgvector_db_url
+    with _registry_lock:
+        if db_url not in _knowledge_bases:
+            # Create knowledge base with both databases
+            _knowledge_bases[db_url] = LazyKnowledge(
+                name="Common Documentation",
+                vector_db=get_vector_db(db_url),
+                contents_db=get_contents_db(db_url),  # Enables content tracking and management
+                max_results=settings.knowledge_search_candidates,  # Candidate pool; retrievers trim to top-k
+            )
+        return _knowledge_bases[db_url]
+
 
+def ensure_knowledge_schema(db_url: Optional[str] = None) -> None:
+    """Create the vector table (and pgvector extension) if missing."""
+    vector_db = get_vector_db(db_url)
+    if not vector_db.exists():
+        vector_db.create()
@@ -0,0 +1,384 @@
+"""Per-run latency, token and cache metrics.
+
+Every agent run is broken down into stages recorded in the
+``agent_stage_seconds`` histogram (labelled by agent and stage):
+
+- ``auth``: bearer token verification
+- ``session_load`` / ``session_save``: ``agent_sessions`` reads and writes
+- ``embedding``: upstream embedding calls (cache misses only)
+- ``vector_search`` / ``keyword_search`` / ``rerank``: knowledge retrieval
+- ``tool``: tool execution (also per tool in ``agent_tool_seconds``)
+- ``llm_ttft`` / ``llm_total``: time to first token and duration of each
+  model call, taken from Agno's own message metrics
+
+Token counts go to ``agent_tokens_total`` (and tokens trimmed by the context
+budget to ``agent_context_tokens_saved_total``) and cache hit/miss counters are
+read from the in-process caches at scrape time. Identical concurrent
+embedding and search calls that were coalesced are counted in
+``single_flight_calls_total``. Metrics are served in
+Prometheus format at ``metrics_path`` (``/api/v1/metrics``; AgentOS already
+owns ``/metrics``); when ``otel_exporter_otlp_endpoint`` is
+set, every stage is also exported as an OpenTelemetry span.
+"""
+import inspect
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.asgi import match_run
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Agent id of the run being served (set per request by AgentRunMetricsMiddleware)
+current_agent: ContextVar[str] = ContextVar("current_agent", default="none")
+
+_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+STAGE_SECONDS = Histogram(
+    "agent_stage_seconds",
+    "Time spent per stage of an agent run",
+    ["agent", "stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+TOOL_SECONDS = Histogram(
+    "agent_tool_seconds",
+    "Tool execution time",
+    ["agent", "tool", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+TOOL_OUTPUT_TOKENS = Histogram(
+    "agent_tool_output_tokens",
+    "Size of tool outputs added to the prompt, in tokens",
+    ["agent", "tool"],
+    buckets=(10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+RUN_SECONDS = Histogram(
+    "agent_run_seconds",
+    "End-to-end agent run latency (until the response is fully sent)",
+    ["agent", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+TOKENS = Counter(
+    "agent_tokens",
+    "Model tokens by kind (input, output, cache_read, reasoning)",
+    ["agent", "kind"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "llm_admission_queue_depth",
+    "Agent runs waiting for an LLM slot",
+    ["model"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "llm_admission_in_flight",
+    "Agent runs holding an LLM slot",
+    ["model"],
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "llm_admission_wait_seconds",
+    "Time agent runs waited for an LLM slot",
+    ["model"],
+    buckets=_LATENCY_BUCKETS,
+)
+ADMISSION_REJECTED = Counter(
+    "llm_admission_rejected",
+    "Agent runs rejected with 503 (queue_full, timeout, rate_limit)",
+    ["model", "reason"],
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "llm_rate_limit_wait_seconds",
+    "Time model calls waited for the provider rate limit buckets",
+    ["model"],
+    buckets=_LATENCY_BUCKETS,
+)
+CONTEXT_TOKENS_SAVED = Counter(
+    "agent_context_tokens_saved",
+    "Prompt tokens kept out of model calls by the context budget (history, knowledge)",
+    ["agent", "source"],
+)
+MODEL_CALLS = Counter(
+    "llm_model_calls",
+    "Model call attempts by outcome (ok, error, cancelled, circuit_open)",
+    ["model", "outcome"],
+)
+MODEL_HEDGES = Counter(
+    "llm_hedged_requests",
+    "Duplicate model requests sent because the first one was slower than the hedge threshold",
+    ["model"],
+)
+CIRCUIT_OPEN = Gauge(
+    "llm_circuit_open",
+    "1 while the circuit breaker of a model is open",
+    ["model"],
+)
+FAST_PATH_TURNS = Counter(
+    "agent_fast_path_turns",
+    "Run requests answered by the pricing fast path (answered) or passed to the agent (fallback)",
+    ["agent", "outcome"],
+)
+FAST_PATH_SECONDS_SAVED = Counter(
+    "agent_fast_path_seconds_saved",
+    "Estimated latency saved by the pricing fast path (average agent run time of price questions minus fast-path time)",
+    ["agent"],
+)
+SESSION_WRITES = Counter(
+    "session_store_writes",
+    "Session and run writes of the session store",
+    ["kind", "mode"],
+)
+SESSION_WRITE_DELAY = Histogram(
+    "session_store_write_delay_seconds",
+    "Time from a session's first unflushed change until it was persisted",
+    buckets=_LATENCY_BUCKETS,
+)
+KNOWLEDGE_REPLICA_SEARCHES = Counter(
+    "knowledge_replica_searches",
+    "Vector searches answered by the in-process replica (hit) or sent to pgvector (stale, unloaded, filters, too_large, unsupported)",
+    ["outcome"],
+)
+KNOWLEDGE_PREFETCH_TURNS = Counter(
+    "knowledge_prefetch_turns",
+    "Agent turns by outcome of their speculative knowledge prefetch (hit, miss, unused, error)",
+    ["agent", "outcome"],
+)
+KNOWLEDGE_PREFETCH_SAVED = Histogram(
+    "knowledge_prefetch_saved_seconds",
+    "Knowledge retrieval time per turn that overlapped session loading and the first model call",
+    ["agent"],
+    buckets=_LATENCY_BUCKETS,
+)
+COALESCED_CALLS = Counter(
+    "single_flight_calls",
+    "Embedding and knowledge search calls that ran upstream (leader) or joined an identical in-flight call (follower)",
+    ["operation", "role"],
+)
+
+# OpenTelemetry tracer, set by setup_tracing when OTLP export is enabled
+_tracer: Any = None
+
+
+@contextmanager
+def stage(name: str, agent: Optional[str] = None, **attributes: Any) -> Iterator[None]:
+    """
+    Time a stage of the current agent run.
+
+    Args:
+        name: Stage name (label value of ``agent_stage_seconds``)
+        agent: Agent id (defaults to the agent of the current request)
+        **attributes: Extra span attributes
+    """
+    agent = agent or current_agent.get()
+    span = (
+        _tracer.start_as_current_span(name, attributes={"agent.id": agent, **attributes})
+        if _tracer is not None else nullcontext()
+    )
+    started = time.perf_counter()
+    with span:
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.labels(agent, name).observe(time.perf_counter() - started)
+
+
+def tool_timing_hook(
+    function_name: str,
+    function_call: Callable[..., Any],
+    arguments: Dict[str, Any],
+    agent: Any = None,
+) -> Any:
+    """Agno tool hook that times every tool call."""
+    agent_id = getattr(agent, "id", None) or current_agent.get()
+    status = "error"
+    awaited = False
+    started = time.perf_counter()
+    try:
+        with stage("tool", agent=agent_id, tool=function_name):
+            result = function_call(**arguments)
+        if inspect.isawaitable(result):
+            # Async tool: the call only created the coroutine
+            awaited = True
+            return _timed_tool(result, agent_id, function_name, started)
+        status = "ok"
+        return result
+    finally:
+        if not awaited:
+            TOOL_SECONDS.labels(agent_id, function_name, status).observe(time.perf_counter() - started)
+
+
+async def _timed_tool(result: Awaitable[Any], agent_id: str, function_name: str, started: float) -> Any:
+    status = "error"
+    try:
+        with stage("tool", agent=agent_id, tool=function_name):
+            value = await result
+        status = "ok"
+        return value
+    finally:
+        TOOL_SECONDS.labels(agent_id, function_name, status).observe(time.perf_counter() - started)
+
+
+def record_run_metrics(run_output: Any, agent: Any = None) -> None:
+    """
+    Agno post-hook recording model timings and token counts of a run.
+
+    Each assistant message produced by this run carries Agno's
+    ``time_to_first_token`` and ``duration`` for its model call.
+    """
+    agent_id = getattr(agent, "id", None) or current_agent.get()
+    for message in run_output.messages or []:
+        if message.role != "assistant" or message.from_history or message.metrics is None:
+            continue
+        if message.metrics.time_to_first_token is not None:
+            STAGE_SECONDS.labels(agent_id, "llm_ttft").observe(message.metrics.time_to_first_token)
+        if message.metrics.duration is not None:
+            STAGE_SECONDS.labels(agent_id, "llm_total").observe(message.metrics.duration)
+
+    metrics = run_output.metrics
+    if metrics is not None:
+        for kind in ("input", "output", "cache_read", "reasoning"):
+            count = getattr(metrics, f"{kind}_tokens", 0) or 0
+            if count:
+                TOKENS.labels(agent_id, kind).inc(count)
+
+
+class CacheCollector:
+    """Exports hit/miss counters of the in-process caches at scrape time."""
+
+    def describe(self):
+        # Nothing to describe up front; avoids running collect() at registration
+        return []
+
+    def collect(self):
+        # Imported here: these modules import this one
+        from app.core.auth import get_token_cache
+        from app.core.embedding_cache import CachingEmbedder
+        from app.core.knowledge_base import get_embedder
+        from app.core.response_cache import get_response_cache
+        from app.core.session_store import get_session_store
+        from app.core.tool_runtime import get_tool_cache_stats
+
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+
+        tokens = get_token_cache().stats()
+        hits.add_metric(["auth_tokens"], tokens["hits"])
+        misses.add_metric(["auth_tokens"], tokens["misses"])
+
+        embedder = get_embedder()
+        if isinstance(embedder, CachingEmbedder):
+            hits.add_metric(["embeddings_memory"], embedder.memory_hits)
+            hits.add_metric(["embeddings_db"], embedder.db_hits)
+            misses.add_metric(["embeddings"], embedder.misses)
+
+        if settings.response_cache_enabled:
+            responses = get_response_cache().stats()
+            hits.add_metric(["responses"], responses["hits"])
+            misses.add_metric(["responses"], responses["misses"])
+
+        session_store = get_session_store()
+        if session_store is not None:
+            hits.add_metric(["sessions"], session_store.hits)
+            misses.add_metric(["sessions"], session_store.loads)
+
+        for name, tool_cache in get_tool_cache_stats().items():
+            hits.add_metric([f"tool_{name}"], tool_cache["hits"])
+            misses.add_metric([f"tool_{name}"], tool_cache["misses"])
+
+        yield hits
+        yield misses
+
+
+REGISTRY.register(CacheCollector())
+
+
+class AgentRunMetricsMiddleware:
+    """
+    ASGI middleware timing ``POST /agents/{agent_id}/runs`` end to end.
+
+    Also sets ``current_agent`` so stages recorded while serving the run
+    are labelled with the agent id.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        agent_id = match_run(scope)
+        if agent_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = current_agent.set(agent_id)
+        status = {"code": 500}
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        span = (
+            _tracer.start_as_current_span("agent_run", attributes={"agent.id": agent_id})
+            if _tracer is not None else nullcontext()
+        )
+        try:
+            with span:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            RUN_SECONDS.labels(agent_id, str(status["code"])).observe(time.perf_counter() - started)
+            current_agent.reset(token)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus scrape endpoint."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+def setup_tracing() -> None:
+    """Export stage spans (and Agno's own spans, if instrumented) over OTLP."""
+    global _tracer
+    if not settings.otel_exporter_otlp_endpoint or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        raise ImportError(
+            "`opentelemetry-sdk` not installed. Please install using `pip install backend[otel]`"
+        )
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.otel_service_name}))
+    provider.add_span_processor(
+        BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.otel_exporter_otlp_endpoint))
+    )
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("app")
+
+    try:
+        from openinference.instrumentation.agno import AgnoInstrumentor
+
+        AgnoInstrumentor().instrument()
+    except ImportError:
+        logger.info("openinference-instrumentation-agno not installed; exporting stage spans only")
+    logger.info(f"OTLP tracing enabled ({settings.otel_exporter_otlp_endpoint})")
@@ -0,0 +1,490 @@
+"""Model routing: fallback chain, hedged requests and a fast path.
+
+Every agent model call goes through ``RoutedOpenAIChat``, which tries an
+ordered chain of OpenRouter models instead of a single one:
+
+- ``model_fast`` (if set) comes first for simple turns (greetings, short
+  pure price questions); the regular chain is the fallback.
+- ``openrouter_model`` then each of ``model_fallbacks``. A model is left
+  for the next one when a call fails with a provider error (5xx, 408/429,
+  connection errors or the per-model timeout).
+- Each model has a circuit breaker: after ``model_circuit_failures``
+  consecutive failures it is skipped for ``model_circuit_cooldown`` seconds,
+  then a single probe call decides whether it is closed again. The last
+  model of a chain is always tried.
+- With ``model_hedge_after`` set, a call that has not answered (streams:
+  not produced a first chunk) within that many seconds gets a duplicate
+  request to the next model of the chain (or the same model when it is the
+  last one); whichever answers first is used and the other is cancelled.
+
+The model that served a call is recorded in ``run_output.metadata``.
+"""
+import asyncio
+import copy
+import logging
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from agno.exceptions import ContextWindowExceededError, ModelProviderError
+from agno.models.message import Message
+from agno.models.openai import OpenAIChat
+from agno.models.response import ModelResponse
+
+from app.core.admission import get_admission_controller
+from app.core.config import settings
+from app.core.context_budget import BudgetedOpenAIChat, get_max_prompt_tokens
+from app.core.metrics import CIRCUIT_OPEN, MODEL_CALLS, MODEL_HEDGES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Sync calls run here so they can be raced against a hedge
+_call_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="model-call")
+
+_GREETING = re.compile(
+    r"^(hi|hello|hey|hiya|g'?day|good (morning|afternoon|evening)|thanks?( you)?|thank you( so much)?|"
+    r"cheers|ok(ay)?|great|perfect|bye|goodbye)\b[\s!.,:)]*(there|mate|team)?[\s!.,:)]*$",
+    re.IGNORECASE,
+)
+_PRICE_WORDS = re.compile(r"\b(price|prices|pricing|cost|costs|quote|how much|rate)\b", re.IGNORECASE)
+_POSTCODE = re.compile(r"\b\d{4}\b")
+_SIMPLE_MAX_WORDS = 25
+
+
+def is_simple_turn(text: str) -> bool:
+    """Whether a user message is a greeting/thanks or a short, self-contained price question."""
+    text = text.strip()
+    if not text:
+        return False
+    if _GREETING.match(text):
+        return True
+    return (
+        len(text.split()) <= _SIMPLE_MAX_WORDS
+        and _PRICE_WORDS.search(text) is not None
+        and _POSTCODE.search(text) is not None
+    )
+
+
+def _current_input(messages: Sequence[Message]) -> str:
+    for message in reversed(messages):
+        if message.role == "user" and not message.from_history:
+            return message.get_content_string()
+    return ""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Provider errors worth another model: timeouts, connection errors, 408/429 and 5xx."""
+    if not isinstance(error, ModelProviderError) or isinstance(error, ContextWindowExceededError):
+        return False
+    return error.status_code in (408, 429) or error.status_code >= 500
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker of one model (thread-safe)."""
+
+    def __init__(self, model_id: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.model_id = model_id
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """Whether a call may go to the model (one probe per cooldown while open)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.cooldown:
+                return False
+            if self._probe_at is not None and now - self._probe_at < self.cooldown:
+                return False
+            self._probe_at = now
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit of {self.model_id} closed")
+            self._failures = 0
+            self._opened_at = self._probe_at = None
+        CIRCUIT_OPEN.labels(self.model_id).set(0)
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is None and self._failures < self.failure_threshold:
+                return
+            if self._opened_at is None:
+                logger.warning(f"Circuit of {self.model_id} opened after {self._failures} failures")
+            self._opened_at = time.monotonic()
+            self._probe_at = None
+        CIRCUIT_OPEN.labels(self.model_id).set(1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"open": self.is_open, "consecutive_failures": self._failures}
+
+
+# Circuit breakers per model id (shared by every agent and run)
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(model_id: str) -> CircuitBreaker:
+    """Get or create the circuit breaker of a model."""
+    with _breakers_lock:
+        if model_id not in _breakers:
+            _breakers[model_id] = CircuitBreaker(
+                model_id,
+                failure_threshold=settings.model_circuit_failures,
+                cooldown=settings.model_circuit_cooldown,
+            )
+        return _breakers[model_id]
+
+
+def get_routing_status() -> Dict[str, Dict[str, Any]]:
+    """Circuit state of every model called so far."""
+    return {model_id: breaker.stats() for model_id, breaker in _breakers.items()}
+
+
+def get_model_timeout(model_id: str) -> float:
+    """Per-attempt timeout of a model (``model_timeouts`` wins)."""
+    return settings.model_timeouts.get(model_id, settings.model_timeout)
+
+
+@dataclass
+class RoutedOpenAIChat(BudgetedOpenAIChat):
+    """
+    Budgeted OpenAIChat that routes each call over a chain of models.
+
+    The prompt is fitted to the budget once; every attempt (fallback or
+    hedge) is paced by the rate limits of the model it goes to.
+    """
+
+    fallback_models: List[str] = field(default_factory=list)
+    fast_model: Optional[str] = None
+    hedge_after: float = 0.0
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+
+    def route(self, messages: Sequence[Message]) -> List[str]:
+        """Models to try for a call, in order."""
+        chain = [self.id] + [m for m in self.fallback_models if m != self.id]
+        if self.fast_model and self.fast_model not in chain and is_simple_turn(_current_input(messages)):
+            chain.insert(0, self.fast_model)
+        return chain
+
+    def _target(self, model_id: str, is_async: bool) -> OpenAIChat:
+        """Copy of this model calling ``model_id`` (sharing the HTTP client)."""
+        if is_async:
+            self.get_async_client()
+        else:
+            self.get_client()
+        target = copy.copy(self)
+        target.id = model_id
+        target.request_params = {**(self.request_params or {}), "timeout": get_model_timeout(model_id)}
+        return target
+
+    @staticmethod
+    def _next(queue: List[str]) -> Optional[str]:
+        """Pop the next model whose circuit allows a call (the last one always does)."""
+        while queue:
+            model_id = queue.pop(0)
+            if not queue or get_circuit_breaker(model_id).allow():
+                return model_id
+            MODEL_CALLS.labels(model_id, "circuit_open").inc()
+        return None
+
+    @staticmethod
+    def _succeeded(model_id: str) -> None:
+        get_circuit_breaker(model_id).success()
+        MODEL_CALLS.labels(model_id, "ok").inc()
+
+    @staticmethod
+    def _failed(model_id: str, error: BaseException) -> None:
+        if is_retryable(error):
+            get_circuit_breaker(model_id).failure()
+        MODEL_CALLS.labels(model_id, "error").inc()
+        logger.warning(f"Model call to {model_id} failed: {error}")
+
+    @staticmethod
+    def _served(kwargs: Dict[str, Any], model_id: str, hedged: bool) -> None:
+        run_response = kwargs.get("run_response")
+        if run_response is None:
+            return
+        if run_response.metadata is None:
+            run_response.metadata = {}
+        run_response.metadata["model_served"] = model_id
+        if hedged:
+            run_response.metadata["model_hedged"] = True
+
+    def _throttle(self, model_id: str, tokens: int) -> None:
+        if settings.admission_enabled:
+            get_admission_controller(model_id).throttle(tokens)
+
+    async def _athrottle(self, model_id: str, tokens: int) -> None:
+        if settings.admission_enabled:
+            await get_admission_controller(model_id).athrottle(tokens)
+
+    # ------------------------------------------------------------------
+    # Racing attempts (fallback + hedging)
+    # ------------------------------------------------------------------
+
+    def _race(
+        self,
+        chain: List[str],
+        call: Callable[[str], T],
+        discard: Optional[Callable[[T], None]] = None,
+    ) -> Tuple[str, T, bool]:
+        """Run ``call`` over the chain in worker threads; returns (model, result, hedged)."""
+        queue = list(chain)
+        pending: Dict[Future, str] = {}
+        hedged = False
+        error: Optional[BaseException] = None
+
+        def attempt(model_id: str) -> T:
+            try:
+                result = call(model_id)
+            except BaseException as e:
+                self._failed(model_id, e)
+                raise
+            self._succeeded(model_id)
+            return result
+
+        if not self.hedge_after:
+            # Plain fallback, in the calling thread
+            while True:
+                model_id = self._next(queue)
+                try:
+                    return model_id, attempt(model_id), False
+                except Exception as e:
+                    if not queue or not is_retryable(e):
+                        raise
+
+        def launch(model_id: str) -> None:
+            pending[_call_pool.submit(copy_context().run, attempt, model_id)] = model_id
+
+        def abandon(future: Future) -> None:
+            # Threads cannot be cancelled; drop the result once the loser finishes
+            if discard is not None:
+                future.add_done_callback(lambda f: f.exception() is None and discard(f.result()))
+
+        launch(self._next(queue))
+        try:
+            while pending:
+                timeout = self.hedge_after if self.hedge_after and not hedged else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    model_id = self._next(queue) or next(iter(pending.values()))
+                    MODEL_HEDGES.labels(model_id).inc()
+                    launch(model_id)
+                    continue
+                winner: Optional[Tuple[str, T]] = None
+                for future in done:
+                    model_id = pending.pop(future)
+                    if future.exception() is not None:
+                        if not is_retryable(future.exception()):
+                            raise future.exception()
+                        error = future.exception()
+                    elif winner is None:
+                        winner = (model_id, future.result())
+                    elif discard is not None:
+                        discard(future.result())
+                if winner is not None:
+                    return winner[0], winner[1], hedged
+                if not pending:
+                    next_model = self._next(queue)
+                    if next_model is None:
+                        raise error
+                    launch(next_model)
+            raise error
+        finally:
+            for future in pending:
+                if not future.cancel():
+                    abandon(future)
+
+    async def _arace(
+        self,
+        chain: List[str],
+        call: Callable[[str], Awaitable[T]],
+        discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    ) -> Tuple[str, T, bool]:
+        """Async ``_race``; losing attempts are cancelled."""
+        queue = list(chain)
+        pending: Dict[asyncio.Future, str] = {}
+        hedged = False
+        error: Optional[BaseException] = None
+
+        async def attempt(model_id: str) -> T:
+            try:
+                result = await call(model_id)
+            except asyncio.CancelledError:
+                MODEL_CALLS.labels(model_id, "cancelled").inc()
+                raise
+            except Exception as e:
+                self._failed(model_id, e)
+                raise
+            self._succeeded(model_id)
+            return result
+
+        if not self.hedge_after:
+            while True:
+                model_id = self._next(queue)
+                try:
+                    return model_id, await attempt(model_id), False
+                except Exception as e:
+                    if not queue or not is_retryable(e):
+                        raise
+
+        def launch(model_id: str) -> None:
+            pending[asyncio.ensure_future(attempt(model_id))] = model_id
+
+        launch(self._next(queue))
+        try:
+            while pending:
+                timeout = self.hedge_after if self.hedge_after and not hedged else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    model_id = self._next(queue) or next(iter(pending.values()))
+                    MODEL_HEDGES.labels(model_id).inc()
+                    launch(model_id)
+                    continue
+                winner: Optional[Tuple[str, T]] = None
+                for task in done:
+                    model_id = pending.pop(task)
+                    if task.exception() is not None:
+                        if not is_retryable(task.exception()):
+                            raise task.exception()
+                        error = task.exception()
+                    elif winner is None:
+                        winner = (model_id, task.result())
+                    elif discard is not None:
+                        await discard(task.result())
+                if winner is not None:
+                    return winner[0], winner[1], hedged
+                if not pending:
+                    next_model = self._next(queue)
+                    if next_model is None:
+                        raise error
+                    launch(next_model)
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # ------------------------------------------------------------------
+    # Model interface
+    # ------------------------------------------------------------------
+
+    def invoke(self, messages: List[Message], **kwargs: Any) -> ModelResponse:
+        messages, tokens = self._fit(messages, kwargs)
+
+        def call(model_id: str) -> ModelResponse:
+            self._throttle(model_id, tokens)
+            return OpenAIChat.invoke(self._target(model_id, is_async=False), messages=messages, **kwargs)
+
+        model_id, response, hedged = self._race(self.route(messages), call)
+        self._served(kwargs, model_id, hedged)
+        return response
+
+    async def ainvoke(self, messages: List[Message], **kwargs: Any) -> ModelResponse:
+        messages, tokens = self._fit(messages, kwargs)
+
+        async def call(model_id: str) -> ModelResponse:
+            await self._athrottle(model_id, tokens)
+            return await OpenAIChat.ainvoke(self._target(model_id, is_async=True), messages=messages, **kwargs)
+
+        model_id, response, hedged = await self._arace(self.route(messages), call)
+        self._served(kwargs, model_id, hedged)
+        return response
+
+    def invoke_stream(self, messages: List[Message], **kwargs: Any) -> Iterator[ModelResponse]:
+        messages, tokens = self._fit(messages, kwargs)
+
+        def call(model_id: str) -> Tuple[Optional[ModelResponse], Iterator[ModelResponse]]:
+            # An attempt succeeds once the stream produced its first chunk
+            self._throttle(model_id, tokens)
+            stream = OpenAIChat.invoke_stream(self._target(model_id, is_async=False), messages=messages, **kwargs)
+            return next(stream, None), stream
+
+        model_id, (first, stream), hedged = self._race(
+            self.route(messages), call, discard=lambda opened: opened[1].close()
+        )
+        self._served(kwargs, model_id, hedged)
+        try:
+            if first is not None:
+                yield first
+                yield from stream
+        except Exception as e:
+            self._failed(model_id, e)
+            raise
+
+    async def ainvoke_stream(self, messages: List[Message], **kwargs: Any) -> AsyncIterator[ModelResponse]:
+        messages, tokens = self._fit(messages, kwargs)
+
+        async def call(model_id: str) -> Tuple[Optional[ModelResponse], AsyncIterator[ModelResponse]]:
+            await self._athrottle(model_id, tokens)
+            stream = OpenAIChat.ainvoke_stream(self._target(model_id, is_async=True), messages=messages, **kwargs)
+            try:
+                return await stream.__anext__(), stream
+            except StopAsyncIteration:
+                return None, stream
+
+        async def discard(opened: Tuple[Optional[ModelResponse], AsyncIterator[ModelResponse]]) -> None:
+            await opened[1].aclose()
+
+        model_id, (first, stream), hedged = await self._arace(self.route(messages), call, discard)
+        self._served(kwargs, model_id, hedged)
+        try:
+            if first is not None:
+                yield first
+                async for response in stream:
+                    yield response
+        except Exception as e:
+            self._failed(model_id, e)
+            raise
+        finally:
+            await stream.aclose()
+
+
+def get_agent_model(agent_id: str) -> RoutedOpenAIChat:
+    """Build the routed, budgeted model of an agent from the ``model_*`` settings."""
+    return RoutedOpenAIChat(
+        id=settings.openrouter_model,
+        api_key=settings.openrouter_api_key,
+        base_url=settings.openrouter_base_url,
+        max_prompt_tokens=get_max_prompt_tokens(agent_id),
+        fallback_models=list(settings.model_fallbacks),
+        fast_model=settings.model_fast,
+        hedge_after=settings.model_hedge_after,
+        # Failing over beats the SDK's own retries of a slow or broken model
+        max_retries=0 if settings.model_fallbacks or settings.model_hedge_after else None,
+    )
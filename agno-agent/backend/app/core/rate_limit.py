@@ -0,0 +1,71 @@
+"""Rate limiting primitives."""
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    ``rate`` tokens are added per second up to ``capacity``. ``acquire``
+    blocks (or awaits, for ``async_acquire``) until enough tokens are
+    available; ``try_acquire`` never waits.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float) -> "TokenBucket":
+        """Bucket allowing ``limit`` tokens per minute with a one-minute burst."""
+        return cls(rate=limit / 60.0, capacity=limit)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: float) -> float:
+        """Take ``tokens`` (possibly going negative) and return the wait time."""
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take ``tokens`` if available right now."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until ``tokens`` would be available."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until ``tokens`` are granted; returns the time waited."""
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def async_acquire(self, tokens: float = 1.0) -> float:
+        """Await until ``tokens`` are granted; returns the time waited."""
+        wait = self._reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
@@ -0,0 +1,360 @@
+"""Semantic response cache for high-frequency FAQ turns.
+
+Final answers are stored with the embedding of the question that produced
+them. A new first-turn question whose embedding is within
+``response_cache_similarity`` (cosine) of a stored one is answered from
+the cache - streamed back as AgentOS-style SSE events when the client
+asked for a stream - without running the agent at all.
+
+Only self-contained answers are cached: the run must be the first in its
+session and must not have called any tool other than the knowledge search
+(prices are always looked up live). Entries are tagged with a fingerprint
+of ``common_knowledge_contents`` and are dropped as soon as the knowledge
+base changes. Answered turns are stored in the agent session like a
+regular run, so the conversation can continue with the agent.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import text as sql
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.asgi import (
+    match_run,
+    parse_form,
+    read_body,
+    record_run,
+    replay_body,
+    run_response,
+)
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_engine, to_vector_literal
+from app.core.embedding_cache import normalize_text
+from app.core.knowledge_base import get_embedder
+
+logger = logging.getLogger(__name__)
+
+# Tools whose results only depend on the knowledge base (covered by its fingerprint)
+_KNOWLEDGE_TOOLS = {"search_knowledge_base"}
+
+
+class ResponseCache:
+    """Postgres-backed semantic cache of final agent answers."""
+
+    def __init__(
+        self,
+        db_engine: Engine,
+        dimensions: int,
+        similarity: float,
+        ttl: int,
+        max_entries: int,
+        schema: str = "ai",
+        table_name: str = "agent_response_cache",
+        knowledge_table: str = "common_knowledge_contents",
+    ):
+        self.db_engine = db_engine
+        self.dimensions = dimensions
+        self.similarity = similarity
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.table = f"{schema}.{table_name}"
+        self.schema = schema
+        self.knowledge_table = f"{schema}.{knowledge_table}"
+        self._version_cache: TTLCache[str] = TTLCache(max_size=1, default_ttl=5)
+        self._purged_version: Optional[str] = None
+        self._table_ready = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stored = 0
+
+    def _ensure_table(self) -> None:
+        if self._table_ready:
+            return
+        with self.db_engine.begin() as conn:
+            conn.execute(sql(f"CREATE SCHEMA IF NOT EXISTS {self.schema}"))
+            conn.execute(sql(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                " id BIGSERIAL PRIMARY KEY,"
+                " agent_id TEXT NOT NULL,"
+                " query TEXT NOT NULL,"
+                " query_hash TEXT NOT NULL,"
+                f" embedding vector({self.dimensions}) NOT NULL,"
+                " response TEXT NOT NULL,"
+                " knowledge_version TEXT NOT NULL,"
+                " hit_count INTEGER NOT NULL DEFAULT 0,"
+                " created_at TIMESTAMPTZ NOT NULL DEFAULT now(),"
+                " last_hit_at TIMESTAMPTZ NOT NULL DEFAULT now(),"
+                " UNIQUE (agent_id, query_hash))"
+            ))
+        self._table_ready = True
+
+    def knowledge_version(self) -> str:
+        """
+        Fingerprint of the knowledge contents table.
+
+        Any insert, update or delete in ``common_knowledge_contents``
+        changes the fingerprint. The value is memoized for a few seconds.
+        """
+        version = self._version_cache.get("version")
+        if version is not None:
+            return version
+        try:
+            with self.db_engine.connect() as conn:
+                row = conn.execute(sql(
+                    "SELECT count(*) AS n, coalesce(md5(string_agg("
+                    "id::text || ':' || coalesce(updated_at::text, '') || ':' || coalesce(status::text, ''),"
+                    " ',' ORDER BY id)), '') AS digest"
+                    f" FROM {self.knowledge_table}"
+                )).one()
+            version = f"{row.n}:{row.digest}"
+        except Exception as e:
+            logger.warning(f"Could not fingerprint knowledge contents: {e}")
+            version = "unknown"
+        self._version_cache.set("version", version)
+        return version
+
+    def lookup(self, agent_id: str, embedding: List[float]) -> Optional[str]:
+        """
+        Return a cached answer semantically equal to the query, if any.
+
+        Args:
+            agent_id: Agent the answer was produced by
+            embedding: Query embedding
+
+        Returns:
+            Cached response text, or None on a miss
+        """
+        self._ensure_table()
+        version = self.knowledge_version()
+        vector = to_vector_literal(embedding)
+        with self.db_engine.begin() as conn:
+            if version != self._purged_version:
+                # Knowledge changed since the last lookup: drop stale answers
+                conn.execute(
+                    sql(f"DELETE FROM {self.table} WHERE knowledge_version <> :version"),
+                    {"version": version},
+                )
+                self._purged_version = version
+            row = conn.execute(
+                sql(
+                    f"SELECT id, response, 1 - (embedding <=> CAST(:q AS vector)) AS similarity"
+                    f" FROM {self.table}"
+                    " WHERE agent_id = :agent_id"
+                    " AND created_at > now() - make_interval(secs => :ttl)"
+                    " ORDER BY embedding <=> CAST(:q AS vector) LIMIT 1"
+                ),
+                {"q": vector, "agent_id": agent_id, "ttl": self.ttl},
+            ).first()
+            if row is None or row.similarity < self.similarity:
+                self._count("misses")
+                return None
+            conn.execute(
+                sql(
+                    f"UPDATE {self.table} SET hit_count = hit_count + 1,"
+                    " last_hit_at = now() WHERE id = :id"
+                ),
+                {"id": row.id},
+            )
+        self._count("hits")
+        return row.response
+
+    def store(self, agent_id: str, query: str, embedding: List[float], response: str) -> None:
+        """Store a final answer and trim the table to ``max_entries``."""
+        self._ensure_table()
+        normalized = normalize_text(query)
+        with self.db_engine.begin() as conn:
+            conn.execute(
+                sql(
+                    f"INSERT INTO {self.table}"
+                    " (agent_id, query, query_hash, embedding, response, knowledge_version)"
+                    " VALUES (:agent_id, :query, :query_hash, CAST(:embedding AS vector),"
+                    " :response, :version)"
+                    " ON CONFLICT (agent_id, query_hash) DO UPDATE SET"
+                    " response = EXCLUDED.response,"
+                    " knowledge_version = EXCLUDED.knowledge_version,"
+                    " created_at = now()"
+                ),
+                {
+                    "agent_id": agent_id,
+                    "query": normalized,
+                    "query_hash": hashlib.sha256(normalized.encode("utf-8")).hexdigest(),
+                    "embedding": to_vector_literal(embedding),
+                    "response": response,
+                    "version": self.knowledge_version(),
+                },
+            )
+            conn.execute(
+                sql(
+                    f"DELETE FROM {self.table} WHERE id IN ("
+                    f" SELECT id FROM {self.table}"
+                    " ORDER BY last_hit_at DESC OFFSET :max_entries)"
+                ),
+                {"max_entries": self.max_entries},
+            )
+        self._count("stored")
+
+    def invalidate(self) -> None:
+        """Drop every cached answer."""
+        self._ensure_table()
+        self._version_cache.clear()
+        with self.db_engine.begin() as conn:
+            conn.execute(sql(f"DELETE FROM {self.table}"))
+        self._purged_version = None
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "stored": self.stored,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "similarity_threshold": self.similarity,
+        }
+
+
+# Singleton response cache instance
+_response_cache_instance: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the shared response cache."""
+    global _response_cache_instance
+    if _response_cache_instance is None:
+        _response_cache_instance = ResponseCache(
+            db_engine=get_engine(),
+            dimensions=settings.embedding_dimensions,
+            similarity=settings.response_cache_similarity,
+            ttl=settings.response_cache_ttl,
+            max_entries=settings.response_cache_max_entries,
+        )
+    return _response_cache_instance
+
+
+def _embed(query: str) -> List[float]:
+    return get_embedder().get_embedding(normalize_text(query))
+
+
+def _has_prior_runs(session: Any, run_id: Optional[str] = None) -> bool:
+    runs = getattr(session, "runs", None) or []
+    return any(getattr(run, "run_id", None) != run_id for run in runs)
+
+
+def _uses_live_tools(run_output: Any) -> bool:
+    tools = getattr(run_output, "tools", None) or []
+    return any(getattr(tool, "tool_name", None) not in _KNOWLEDGE_TOOLS for tool in tools)
+
+
+def _store(agent_id: str, query: str, content: str) -> None:
+    get_response_cache().store(agent_id, query, _embed(query), content)
+
+
+async def cache_response_hook(run_output: Any, session: Any = None, **kwargs: Any) -> None:
+    """
+    Agent post-hook that stores self-contained answers in the cache.
+
+    Skips runs that called tools other than the knowledge search, produced
+    non-text content, or are not the first turn of their session (their
+    answers depend on history). The embedding and the insert run in a
+    worker thread.
+    """
+    try:
+        content = getattr(run_output, "content", None)
+        run_input = getattr(run_output, "input", None)
+        query = getattr(run_input, "input_content", None)
+        if not isinstance(content, str) or not isinstance(query, str) or not content:
+            return
+        if _uses_live_tools(run_output):
+            return
+        if session is not None and _has_prior_runs(session, getattr(run_output, "run_id", None)):
+            return
+        await asyncio.to_thread(_store, run_output.agent_id, query, content)
+    except Exception as e:
+        logger.warning(f"Response cache store failed: {e}")
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware that answers cacheable agent runs from the cache.
+
+    Intercepts ``POST /agents/{agent_id}/runs`` for the configured agents,
+    buffers and replays the form body, and falls through to AgentOS on a
+    miss or on any error.
+    """
+
+    def __init__(self, app: ASGIApp, agent_ids: List[str]):
+        self.app = app
+        self.agent_ids = set(agent_ids)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        agent_id = match_run(scope)
+        if agent_id not in self.agent_ids:
+            await self.app(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        replay = replay_body(body, receive)
+        try:
+            response = await self._try_cache(scope, body, agent_id)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            response = None
+
+        if response is None:
+            await self.app(scope, replay, send)
+        else:
+            await response(scope, replay, send)
+
+    async def _try_cache(self, scope: Scope, body: bytes, agent_id: str):
+        form = await parse_form(scope, body)
+        message = form.get("message")
+        if not message or "files" in form:
+            return None
+
+        cache = get_response_cache()
+        session_id = form.get("session_id")
+        if session_id and await asyncio.to_thread(_session_has_runs, session_id):
+            cache._count("bypassed")
+            return None
+
+        embedding = await asyncio.to_thread(_embed, message)
+        content = await asyncio.to_thread(cache.lookup, agent_id, embedding)
+        if content is None:
+            return None
+
+        run_id = str(uuid4())
+        session_id = session_id or str(uuid4())
+        metadata = {"response_cache": "hit"}
+        await asyncio.to_thread(
+            record_run, agent_id, session_id, form.get("user_id"), run_id, message, content, metadata
+        )
+        return run_response(
+            content,
+            agent_id,
+            run_id=run_id,
+            session_id=session_id,
+            stream=str(form.get("stream", "false")).lower() == "true",
+            metadata=metadata,
+            headers={"X-Response-Cache": "hit"},
+        )
+
+
+def _session_has_runs(session_id: str) -> bool:
+    from agno.db.base import SessionType
+
+    from app.core.database import get_agent_db
+
+    session = get_agent_db().get_session(session_id=session_id, session_type=SessionType.AGENT)
+    return session is not None and _has_prior_runs(session)
@@ -0,0 +1,258 @@
+"""Rolling per-session conversation summaries.
+
+After each turn, history turns older than the newest
+``context_summary_keep_turns`` are folded into a short summary by a
+background worker, so the request path never waits for the summarizer. A
+history turn is a run Agno replays as history: one of the agent's own
+top-level runs that did not fail or get cancelled. The summary is
+incremental: only the turns added since the last fold are sent, together
+with the previous summary. It is stored in the ``rolling_summary`` column of
+``ai.agent_sessions`` (written with a targeted UPDATE, so Agno's own
+session upserts never overwrite it).
+
+On the next turn ``load_rolling_summary`` puts the summary into the system
+prompt (as the session summary) and tells the context budget how many
+history turns it does not cover yet; older turns are no longer replayed.
+Records are cached per worker next to the hot sessions (written through
+by the fold), so a turn only reads Postgres for a session it has not seen;
+that read runs in a worker thread. The column is added by migration 0006.
+"""
+import asyncio
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.models.message import Message
+from agno.models.openai import OpenAIChat
+from agno.run.base import HISTORY_SKIP_STATUSES
+from agno.session.summary import SessionSummary
+from sqlalchemy import text as sql
+from sqlalchemy.exc import ProgrammingError
+
+from app.core.admission import get_admission_controller
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.context_budget import uncovered_history_turns
+from app.core.database import get_agent_db, get_engine
+from app.core.metrics import stage
+from app.core.session_store import flush_session
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a customer support conversation. "
+    "Update the current summary with the new turns. Keep what the assistant needs "
+    "later: customer details, services, postcodes and prices quoted, decisions and "
+    "open questions. Drop small talk. Answer with the updated summary only, "
+    "at most {max_words} words."
+)
+
+# Characters kept per message when building the summarizer input
+_MAX_MESSAGE_CHARS = 2000
+# Newest pending turns folded at once (older backlog is skipped)
+_MAX_PENDING_TURNS = 20
+
+# Summaries are computed off the request path
+_summary_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rolling-summary")
+_in_flight: set = set()
+_in_flight_lock = threading.Lock()
+# Summary records by session id ({} = none yet), like the session cache
+# (created on first use)
+_records_cache: Optional[TTLCache[Dict[str, Any]]] = None
+_records_lock = threading.Lock()
+
+# Singleton summarizer model
+_summary_model_instance: Optional[OpenAIChat] = None
+
+
+def _records() -> TTLCache[Dict[str, Any]]:
+    """Summary records by session id, like the session cache."""
+    global _records_cache
+    if _records_cache is None:
+        with _records_lock:
+            if _records_cache is None:
+                _records_cache = TTLCache(
+                    max_size=settings.session_cache_size, default_ttl=settings.session_cache_ttl
+                )
+    return _records_cache
+
+
+def get_summary_model() -> OpenAIChat:
+    """Get or create the model used to fold turns into summaries."""
+    global _summary_model_instance
+    if _summary_model_instance is None:
+        _summary_model_instance = OpenAIChat(
+            id=settings.context_summary_model or settings.openrouter_model,
+            api_key=settings.openrouter_api_key,
+            base_url=settings.openrouter_base_url,
+        )
+    return _summary_model_instance
+
+
+def _table() -> str:
+    db = get_agent_db()
+    return f"{db.db_schema}.{db.session_table_name}"
+
+
+def load_summary(session_id: str, cached: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Stored rolling summary record of a session, if any.
+
+    Args:
+        session_id: Session to load the record of
+        cached: Serve the record from the worker's cache (folds read
+            Postgres, another worker may have folded the session since)
+    """
+    record = _records().get(session_id) if cached else None
+    if record is None:
+        try:
+            with get_engine().connect() as conn:
+                row = conn.execute(
+                    sql(f"SELECT rolling_summary FROM {_table()} WHERE session_id = :session_id"),
+                    {"session_id": session_id},
+                ).first()
+        except ProgrammingError as e:
+            # Agno creates the sessions table on first use; migration 0006 adds the column
+            logger.debug(f"Rolling summary column not available: {e}")
+            row = None
+        record = (row.rolling_summary if row is not None else None) or {}
+        _records().set(session_id, record)
+    return record or None
+
+
+def store_summary(session_id: str, record: Dict[str, Any]) -> None:
+    # A new session's row may still be waiting for the write-behind flush
+    flush_session(session_id)
+    with get_engine().begin() as conn:
+        conn.execute(
+            sql(
+                f"UPDATE {_table()} SET rolling_summary = CAST(:record AS jsonb)"
+                " WHERE session_id = :session_id"
+            ),
+            {"session_id": session_id, "record": json.dumps(record)},
+        )
+    _records().set(session_id, record)
+
+
+def _history_turns(runs: List[Any], agent_id: Optional[str], exclude: Optional[str]) -> List[Any]:
+    """Runs Agno replays as history turns, filtered like ``session.get_messages``."""
+    return [
+        run for run in runs
+        if run.run_id != exclude
+        and getattr(run, "parent_run_id", None) is None
+        and getattr(run, "status", None) not in HISTORY_SKIP_STATUSES
+        and (agent_id is None or getattr(run, "agent_id", None) == agent_id)
+    ]
+
+
+def _run_text(run: Any) -> Tuple[str, str]:
+    """(user input, assistant answer) of a run, truncated."""
+    question = run.input.input_content_string() if run.input is not None else ""
+    answer = run.get_content_as_string() if run.content is not None else ""
+    return question[:_MAX_MESSAGE_CHARS], answer[:_MAX_MESSAGE_CHARS]
+
+
+def fold_turns(previous: Optional[str], turns: List[Tuple[str, str]]) -> str:
+    """Ask the summarizer model to fold new turns into the previous summary."""
+    transcript = "\n\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns)
+    model = get_summary_model()
+    if settings.admission_enabled:
+        # Summaries share the provider's rate limits with agent runs
+        get_admission_controller(model.id).throttle()
+    response = model.response(messages=[
+        Message(
+            role="system",
+            content=SUMMARY_INSTRUCTIONS.format(max_words=settings.context_summary_max_words),
+        ),
+        Message(
+            role="user",
+            content=f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}",
+        ),
+    ])
+    return (response.content or "").strip()
+
+
+def _summarize(session_id: str, runs: List[Tuple[str, Tuple[str, str]]]) -> None:
+    try:
+        record = load_summary(session_id, cached=False) or {}
+        run_ids = [run_id for run_id, _ in runs]
+        last = record.get("last_run_id")
+        pending = runs[run_ids.index(last) + 1:] if last in run_ids else runs
+        if not pending:
+            return
+        with stage("rolling_summary"):
+            summary = fold_turns(record.get("summary"), [turn for _, turn in pending[-_MAX_PENDING_TURNS:]])
+        if not summary:
+            return
+        store_summary(session_id, {
+            "summary": summary,
+            "last_run_id": pending[-1][0],
+            "runs": record.get("runs", 0) + len(pending),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
+    except Exception as e:
+        logger.warning(f"Rolling summary for session {session_id} failed: {e}")
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(session_id)
+
+
+async def load_rolling_summary(session: Any = None, run_context: Any = None, agent: Any = None) -> None:
+    """
+    Agent pre-hook putting the stored summary into the session.
+
+    The summary is added to the system prompt through Agno's
+    ``add_session_summary_to_context``; history turns it covers are left out
+    of the prompt by the context budget.
+    """
+    uncovered_history_turns.set(None)
+    if not settings.context_summary_enabled or session is None:
+        return
+    try:
+        record = await asyncio.to_thread(load_summary, session.session_id)
+    except Exception as e:
+        logger.warning(f"Loading rolling summary failed: {e}")
+        return
+    if not record or not record.get("summary"):
+        return
+
+    updated_at = record.get("updated_at")
+    session.summary = SessionSummary(
+        summary=record["summary"],
+        updated_at=datetime.fromisoformat(updated_at) if updated_at else None,
+    )
+    turns = _history_turns(session.runs or [], getattr(agent, "id", None), getattr(run_context, "run_id", None))
+    run_ids = [run.run_id for run in turns]
+    if record.get("last_run_id") in run_ids:
+        uncovered_history_turns.set(len(run_ids) - run_ids.index(record["last_run_id"]) - 1)
+
+
+def update_rolling_summary(run_output: Any, session: Any = None) -> None:
+    """
+    Agent post-hook scheduling a background fold of history turns that fell
+    out of the verbatim window.
+
+    At most one fold per session is in flight; a skipped fold is picked up
+    by the next turn since folding is incremental.
+    """
+    if not settings.context_summary_enabled or session is None:
+        return
+    agent_id = getattr(run_output, "agent_id", None)
+    turns = [*_history_turns(session.runs or [], agent_id, run_output.run_id), run_output]
+    keep = settings.context_summary_keep_turns
+    foldable = turns[:-keep] if keep else turns
+    if not foldable:
+        return
+
+    session_id = session.session_id
+    with _in_flight_lock:
+        if session_id in _in_flight:
+            return
+        _in_flight.add(session_id)
+    snapshot = [(run.run_id, _run_text(run)) for run in foldable]
+    # Copy the context so the stage is labelled with the current agent
+    _summary_pool.submit(copy_context().run, _summarize, session_id, snapshot)
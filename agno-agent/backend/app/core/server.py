@@ -0,0 +1,27 @@
+"""Gunicorn worker for the production server profile (see ``gunicorn.conf.py``)."""
+from typing import Any, ClassVar, Dict
+
+from uvicorn_worker import UvicornWorker
+
+from app.core.config import settings
+
+# Seconds kept after draining for the lifespan shutdown (write-behind
+# session flush, pool disposal) before gunicorn kills the worker
+_SHUTDOWN_MARGIN = 10
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    """
+    Uvicorn worker that drains in-flight responses on SIGTERM.
+
+    The worker stops accepting connections and lets running requests
+    (streamed agent runs included) finish for up to
+    ``server_graceful_timeout`` minus a margin, so the app's shutdown still
+    runs before gunicorn's own graceful timeout expires.
+    """
+
+    CONFIG_KWARGS: ClassVar[Dict[str, Any]] = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "lifespan": "on",
+        "timeout_graceful_shutdown": max(1, settings.server_graceful_timeout - _SHUTDOWN_MARGIN),
+    }
@@ -0,0 +1,443 @@
+"""Cold storage for old runs and idle agent sessions.
+
+Agno stores every run of a session (messages, tool calls, knowledge
+references) as a JSON row of the runs table, forever, and agents load all
+runs of a session on every turn although only the last
+``num_history_runs`` reach the prompt. The archival job keeps the hot
+tables down to what conversations need:
+
+- runs beyond the newest ``session_hot_runs`` of a session move to
+  ``ai.agent_run_archive``,
+- sessions idle for ``session_archive_idle_days`` move entirely: the
+  session row to ``ai.agent_session_archive``, its runs to
+  ``ai.agent_run_archive``.
+
+Archived payloads are zstd-compressed JSON. Reading an archived session
+restores it: the row and its newest ``session_hot_runs`` runs go back to
+the hot tables. Runs that old have been folded into the rolling summary
+long before (``context_summary_keep_turns`` is much smaller).
+
+Sessions stored before Agno's runs table (whole history in the ``runs``
+column of ``agent_sessions``) are split into run rows by ``migrate``.
+
+Usage:
+    python -m app.core.session_archive report
+    python -m app.core.session_archive migrate [--drop-legacy]
+    python -m app.core.session_archive archive [--idle-days 30] [--hot-runs 20]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import MetaData, Table, delete, func, select
+from sqlalchemy import text as sql
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.core.database import get_agent_db, get_engine
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = "ai"
+SESSION_ARCHIVE = f"{SCHEMA}.agent_session_archive"
+RUN_ARCHIVE = f"{SCHEMA}.agent_run_archive"
+
+# Advisory lock key: one archiver per database across workers
+_ARCHIVE_LOCK = 7_340_019
+
+_tables_ready = False
+# Reflected Agno tables (they may carry app columns such as rolling_summary)
+_hot_tables: Dict[str, Table] = {}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("`zstandard` not installed. Please install using `pip install backend[archive]`")
+    return zstandard
+
+
+def compress(payload: Any) -> Tuple[bytes, int]:
+    """zstd-compressed JSON of a row, and its uncompressed size."""
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return _zstd().ZstdCompressor(level=settings.session_archive_zstd_level).compress(raw), len(raw)
+
+
+def decompress(payload: bytes) -> Any:
+    return json.loads(_zstd().ZstdDecompressor().decompress(payload))
+
+
+def _ensure_tables(engine: Engine) -> None:
+    global _tables_ready
+    if _tables_ready:
+        return
+    with engine.begin() as conn:
+        conn.execute(sql(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+        conn.execute(sql(
+            f"CREATE TABLE IF NOT EXISTS {SESSION_ARCHIVE} ("
+            " session_id TEXT PRIMARY KEY,"
+            " agent_id TEXT,"
+            " user_id TEXT,"
+            " last_activity BIGINT NOT NULL,"
+            " payload BYTEA NOT NULL,"
+            " raw_bytes INTEGER NOT NULL,"
+            " archived_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        ))
+        conn.execute(sql(
+            f"CREATE TABLE IF NOT EXISTS {RUN_ARCHIVE} ("
+            " session_id TEXT NOT NULL,"
+            " run_id TEXT NOT NULL,"
+            " run_index BIGINT,"
+            " created_at BIGINT NOT NULL,"
+            " payload BYTEA NOT NULL,"
+            " raw_bytes INTEGER NOT NULL,"
+            " archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),"
+            " PRIMARY KEY (session_id, run_id))"
+        ))
+    _tables_ready = True
+
+
+def _hot_table(conn: Connection, kind: str) -> Table:
+    """The Agno sessions or runs table, reflected with all its columns."""
+    if kind not in _hot_tables:
+        db = get_agent_db()
+        name = db.session_table_name if kind == "sessions" else db.runs_table_name
+        _hot_tables[kind] = Table(name, MetaData(), schema=db.db_schema, autoload_with=conn)
+    return _hot_tables[kind]
+
+
+def _hot_tables_exist(conn: Connection) -> bool:
+    db = get_agent_db()
+    return all(
+        conn.execute(sql("SELECT to_regclass(:table) IS NOT NULL"), {"table": f"{db.db_schema}.{name}"}).scalar()
+        for name in (db.session_table_name, db.runs_table_name)
+    )
+
+
+def _restorable(table: Table, row: Dict[str, Any]) -> Dict[str, Any]:
+    # Columns dropped since archival (e.g. the legacy runs blob) are left out
+    return {key: value for key, value in row.items() if key in table.c}
+
+
+def _archive_runs(conn: Connection, rows: Sequence[Any], moved: Dict[str, int]) -> None:
+    for row in rows:
+        payload, raw_bytes = compress(dict(row._mapping))
+        conn.execute(
+            sql(
+                f"INSERT INTO {RUN_ARCHIVE} (session_id, run_id, run_index, created_at, payload, raw_bytes)"
+                " VALUES (:session_id, :run_id, :run_index, :created_at, :payload, :raw_bytes)"
+                " ON CONFLICT (session_id, run_id) DO UPDATE SET payload = EXCLUDED.payload,"
+                " raw_bytes = EXCLUDED.raw_bytes, archived_at = now()"
+            ),
+            {
+                "session_id": row.session_id,
+                "run_id": row.run_id,
+                "run_index": row.run_index,
+                "created_at": row.created_at,
+                "payload": payload,
+                "raw_bytes": raw_bytes,
+            },
+        )
+        moved["runs"] += 1
+        moved["raw_bytes"] += raw_bytes
+        moved["stored_bytes"] += len(payload)
+
+
+def _archive_session(conn: Connection, session_id: str, moved: Dict[str, int]) -> None:
+    sessions = _hot_table(conn, "sessions")
+    runs = _hot_table(conn, "runs")
+    row = conn.execute(select(sessions).where(sessions.c.session_id == session_id).with_for_update()).first()
+    if row is None:
+        return
+    _archive_runs(conn, conn.execute(select(runs).where(runs.c.session_id == session_id)).fetchall(), moved)
+
+    payload, raw_bytes = compress(dict(row._mapping))
+    conn.execute(
+        sql(
+            f"INSERT INTO {SESSION_ARCHIVE} (session_id, agent_id, user_id, last_activity, payload, raw_bytes)"
+            " VALUES (:session_id, :agent_id, :user_id, :last_activity, :payload, :raw_bytes)"
+            " ON CONFLICT (session_id) DO UPDATE SET payload = EXCLUDED.payload,"
+            " raw_bytes = EXCLUDED.raw_bytes, last_activity = EXCLUDED.last_activity, archived_at = now()"
+        ),
+        {
+            "session_id": session_id,
+            "agent_id": row.agent_id,
+            "user_id": row.user_id,
+            "last_activity": row.updated_at or row.created_at,
+            "payload": payload,
+            "raw_bytes": raw_bytes,
+        },
+    )
+    # Runs go with the session row (ON DELETE CASCADE)
+    conn.execute(delete(sessions).where(sessions.c.session_id == session_id))
+    moved["sessions"] += 1
+    moved["raw_bytes"] += raw_bytes
+    moved["stored_bytes"] += len(payload)
+
+
+def archive_pass(
+    engine: Optional[Engine] = None,
+    idle_days: Optional[float] = None,
+    hot_runs: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Move idle sessions and old runs to the archive tables.
+
+    Args:
+        engine: Engine (defaults to the shared one)
+        idle_days: Archive sessions untouched this long (defaults to settings)
+        hot_runs: Newest runs kept per session (defaults to settings; 0 keeps all)
+        batch_size: Max sessions and runs moved per pass
+
+    Returns:
+        Counts of moved sessions/runs and their raw vs. compressed size
+    """
+    engine = engine or get_engine()
+    idle_days = settings.session_archive_idle_days if idle_days is None else idle_days
+    hot_runs = settings.session_hot_runs if hot_runs is None else hot_runs
+    batch_size = batch_size or settings.session_archive_batch
+    _ensure_tables(engine)
+    moved = {"sessions": 0, "runs": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+    with engine.connect() as conn:
+        if not conn.execute(sql("SELECT pg_try_advisory_lock(:key)"), {"key": _ARCHIVE_LOCK}).scalar():
+            conn.rollback()
+            return {**moved, "skipped": "another archiver holds the lock"}
+        conn.commit()
+        try:
+            if not _hot_tables_exist(conn):
+                # Agno creates its tables with the first stored session
+                return moved
+            sessions = _hot_table(conn, "sessions")
+            runs = _hot_table(conn, "runs")
+
+            cutoff = int(time.time() - idle_days * 86400)
+            idle = conn.execute(
+                select(sessions.c.session_id)
+                .where(sessions.c.session_type == "agent")
+                .where(func.coalesce(sessions.c.updated_at, sessions.c.created_at) < cutoff)
+                .limit(batch_size)
+            ).scalars().all()
+            conn.commit()
+            for session_id in idle:
+                with conn.begin():
+                    _archive_session(conn, session_id, moved)
+
+            if hot_runs:
+                long_sessions = (
+                    select(runs.c.session_id)
+                    .group_by(runs.c.session_id)
+                    .having(func.count() > hot_runs)
+                )
+                ranked = (
+                    select(
+                        runs.c.run_id,
+                        func.row_number().over(
+                            partition_by=runs.c.session_id,
+                            order_by=(runs.c.run_index.desc().nulls_last(), runs.c.created_at.desc()),
+                        ).label("position"),
+                    )
+                    .where(runs.c.session_id.in_(long_sessions))
+                    .subquery()
+                )
+                with conn.begin():
+                    old = select(ranked.c.run_id).where(ranked.c.position > hot_runs).limit(batch_size)
+                    rows = conn.execute(select(runs).where(runs.c.run_id.in_(old)).with_for_update()).fetchall()
+                    _archive_runs(conn, rows, moved)
+                    if rows:
+                        conn.execute(delete(runs).where(runs.c.run_id.in_([row.run_id for row in rows])))
+        finally:
+            conn.execute(sql("SELECT pg_advisory_unlock(:key)"), {"key": _ARCHIVE_LOCK})
+            conn.commit()
+    return moved
+
+
+def restore_session(session_id: str, engine: Optional[Engine] = None) -> bool:
+    """
+    Bring an archived session back into the hot tables.
+
+    Returns:
+        True when the session was archived and has been restored
+    """
+    engine = engine or get_engine()
+    _ensure_tables(engine)
+    with engine.begin() as conn:
+        row = conn.execute(
+            sql(f"DELETE FROM {SESSION_ARCHIVE} WHERE session_id = :session_id RETURNING payload"),
+            {"session_id": session_id},
+        ).first()
+        if row is None:
+            return False
+        sessions = _hot_table(conn, "sessions")
+        runs = _hot_table(conn, "runs")
+        conn.execute(
+            insert(sessions).values(_restorable(sessions, decompress(row.payload))).on_conflict_do_nothing()
+        )
+        recent = conn.execute(
+            sql(
+                f"DELETE FROM {RUN_ARCHIVE} WHERE session_id = :session_id AND run_id IN ("
+                f" SELECT run_id FROM {RUN_ARCHIVE} WHERE session_id = :session_id"
+                " ORDER BY run_index DESC NULLS LAST, created_at DESC LIMIT :limit)"
+                " RETURNING payload"
+            ),
+            {"session_id": session_id, "limit": settings.session_hot_runs or 2**31 - 1},
+        ).fetchall()
+        if recent:
+            conn.execute(
+                insert(runs)
+                .values([_restorable(runs, decompress(r.payload)) for r in recent])
+                .on_conflict_do_nothing()
+            )
+    logger.info(f"Restored archived session {session_id} with {len(recent)} runs")
+    return True
+
+
+def get_archived_runs(session_id: str, engine: Optional[Engine] = None) -> List[Dict[str, Any]]:
+    """Archived run rows of a session (oldest first), for full history exports."""
+    engine = engine or get_engine()
+    _ensure_tables(engine)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            sql(
+                f"SELECT payload FROM {RUN_ARCHIVE} WHERE session_id = :session_id"
+                " ORDER BY run_index NULLS FIRST, created_at"
+            ),
+            {"session_id": session_id},
+        ).fetchall()
+    return [decompress(row.payload) for row in rows]
+
+
+async def run_archiver() -> None:
+    """Background task running an archival pass every ``session_archive_interval`` seconds."""
+    while True:
+        await asyncio.sleep(settings.session_archive_interval)
+        try:
+            moved = await asyncio.to_thread(archive_pass)
+        except Exception as e:
+            logger.warning(f"Session archival failed: {e}")
+            continue
+        if moved.get("sessions") or moved.get("runs"):
+            logger.info(
+                f"Archived {moved['sessions']} sessions and {moved['runs']} runs "
+                f"({moved['raw_bytes']} -> {moved['stored_bytes']} bytes)"
+            )
+
+
+def storage_report(engine: Optional[Engine] = None, sample: int = 20, history_runs: int = 5) -> Dict[str, Any]:
+    """
+    Size of the hot and archive tables and session load times.
+
+    Load times are measured with a plain (uncached) ``PostgresDb`` on the
+    most recently updated sessions: the full session as agents load it, and
+    only the history window (``history_runs``, the agents' ``num_history_runs``).
+    """
+    from agno.db.postgres import PostgresDb
+
+    engine = engine or get_engine()
+    _ensure_tables(engine)
+    agent_db = get_agent_db()
+    hot = {
+        "sessions": f"{agent_db.db_schema}.{agent_db.session_table_name}",
+        "runs": f"{agent_db.db_schema}.{agent_db.runs_table_name}",
+    }
+    tables = {**hot, "session_archive": SESSION_ARCHIVE, "run_archive": RUN_ARCHIVE}
+
+    report: Dict[str, Any] = {"tables": {}}
+    with engine.connect() as conn:
+        for name, table in tables.items():
+            exists = conn.execute(sql("SELECT to_regclass(:table) IS NOT NULL"), {"table": table}).scalar()
+            report["tables"][name] = {
+                "rows": conn.execute(sql(f"SELECT count(*) FROM {table}")).scalar() if exists else 0,
+                "bytes": conn.execute(sql("SELECT pg_total_relation_size(:table)"), {"table": table}).scalar()
+                if exists else 0,
+            }
+        raw, stored = conn.execute(sql(
+            "SELECT COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(octet_length(payload)), 0) FROM ("
+            f" SELECT raw_bytes, payload FROM {SESSION_ARCHIVE}"
+            f" UNION ALL SELECT raw_bytes, payload FROM {RUN_ARCHIVE}) archived"
+        )).one()
+        report["archive_compression"] = round(raw / stored, 2) if stored else None
+        session_ids = conn.execute(
+            sql(
+                f"SELECT session_id FROM {hot['sessions']} WHERE session_type = 'agent'"
+                " ORDER BY COALESCE(updated_at, created_at) DESC LIMIT :limit"
+            ),
+            {"limit": sample},
+        ).scalars().all() if report["tables"]["sessions"]["rows"] else []
+
+    db = PostgresDb(
+        db_engine=engine,
+        db_schema=agent_db.db_schema,
+        session_table=agent_db.session_table_name,
+        runs_table=agent_db.runs_table_name,
+    )
+    timings: Dict[str, List[float]] = {"full": [], "history": []}
+    runs_loaded: List[int] = []
+    for session_id in session_ids:
+        for kind, runs_limit in (("full", None), ("history", history_runs)):
+            started = time.perf_counter()
+            session = db.get_session(session_id=session_id, runs_limit=runs_limit)
+            timings[kind].append((time.perf_counter() - started) * 1000)
+            if kind == "full" and session is not None:
+                runs_loaded.append(len(session.runs or []))
+    report["load"] = {
+        "sessions": len(session_ids),
+        "avg_runs_loaded": round(statistics.mean(runs_loaded), 1) if runs_loaded else None,
+        **{
+            f"{kind}_p50_ms": round(statistics.median(values), 2) if values else None
+            for kind, values in timings.items()
+        },
+    }
+    return report
+
+
+def migrate_legacy_runs(drop_legacy: bool = False) -> Dict[str, Any]:
+    """
+    Split run histories still stored in the ``runs`` column of
+    ``agent_sessions`` into run rows (Agno's v3 sessions migration).
+
+    Args:
+        drop_legacy: Drop the legacy column afterwards to reclaim its space
+    """
+    from agno.db.migrations.manager import MigrationManager
+
+    db = get_agent_db()
+    asyncio.run(MigrationManager(db).up(table_type="sessions"))
+    dropped = db.cleanup_legacy_runs_column() if drop_legacy else False
+    return {"migrated": True, "legacy_column_dropped": dropped}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage agent session storage and archival")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("report", help="Table sizes and session load times")
+    migrate = sub.add_parser("migrate", help="Move legacy run blobs into the runs table")
+    migrate.add_argument("--drop-legacy", action="store_true", help="Drop the legacy runs column afterwards")
+    archive = sub.add_parser("archive", help="Archive idle sessions and old runs now")
+    archive.add_argument("--idle-days", type=float)
+    archive.add_argument("--hot-runs", type=int)
+    archive.add_argument("--batch-size", type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "report":
+        result = storage_report()
+    else:
+        before = storage_report()
+        if args.command == "migrate":
+            outcome = migrate_legacy_runs(drop_legacy=args.drop_legacy)
+        else:
+            outcome = archive_pass(idle_days=args.idle_days, hot_runs=args.hot_runs, batch_size=args.batch_size)
+        result = {"before": before, "result": outcome, "after": storage_report()}
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+"""Cached agent session storage with write-behind persistence.
+
+Every agent run reads its session (session state and run history) from
+``agent_sessions`` and writes it back together with the new run, all
+through the synchronous ``PostgresDb`` on the event loop. ``SessionStore``
+keeps hot sessions in a per-process LRU instead:
+
+- Reads are served from the cache. Misses are loaded ahead of the run by
+  ``SessionAffinityMiddleware`` over the async (psycopg3) engine, so the
+  event loop does not wait on Postgres.
+- Writes update the cache and are persisted write-behind by a flusher
+  task: a dirty session (row and new runs, coalesced) is written once its
+  response has been sent, and at the latest ``session_flush_max_delay``
+  seconds after its first unflushed change.
+
+Behind several workers a cached session is only trusted on the worker
+that served its previous turn: run responses set the
+``session_affinity_cookie`` to the worker id, which a sticky load balancer
+routes on. Requests arriving without a matching cookie reload the session.
+
+A cache entry always holds the full run history, so runs are only ever
+added to it through ``upsert_run`` (like the runs table). Until the
+flusher is started (scripts, tests), writes go straight through.
+"""
+import asyncio
+import copy
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.db.base import SessionType
+from agno.run.agent import RunOutput
+from agno.run.base import HISTORY_SKIP_STATUSES
+from agno.session.agent import AgentSession
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.asgi import match_run, parse_form, read_body, replay_body
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import InstrumentedPostgresDb, get_async_engine
+from app.core.metrics import SESSION_WRITE_DELAY, SESSION_WRITES, stage
+
+logger = logging.getLogger(__name__)
+
+# Cached marker of a session known not to exist yet
+_ABSENT = object()
+
+
+def _clone(session: AgentSession, runs: List[Any]) -> AgentSession:
+    """Copy of a session callers may mutate; run objects are shared like Agno's run cache."""
+    clone = copy.copy(session)
+    clone.session_data = copy.deepcopy(session.session_data)
+    clone.metadata = copy.deepcopy(session.metadata)
+    clone.agent_data = copy.deepcopy(session.agent_data)
+    clone.runs = list(runs)
+    return clone
+
+
+def _history_runs(runs: List[Any], limit: int) -> List[Any]:
+    """Most recent ``limit`` context runs, like the DB's ``runs_limit`` query."""
+    kept = [run for run in runs if run.parent_run_id is None and run.status not in HISTORY_SKIP_STATUSES]
+    return kept[-limit:] if limit else []
+
+
+@dataclass
+class _Pending:
+    """Unflushed changes of one session."""
+
+    session: Optional[AgentSession] = None
+    # run_id -> (run, user_id, run_index)
+    runs: Dict[str, Tuple[RunOutput, Optional[str], Optional[int]]] = field(default_factory=dict)
+    since: float = field(default_factory=time.monotonic)
+
+
+class SessionStore(InstrumentedPostgresDb):
+    """
+    PostgresDb for agent sessions with a hot-session cache and
+    write-behind persistence.
+
+    Only agent sessions are cached; everything else goes to Postgres as
+    before.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._cache: TTLCache[Any] = TTLCache(
+            max_size=settings.session_cache_size, default_ttl=settings.session_cache_ttl
+        )
+        self._pending: Dict[str, _Pending] = {}
+        # Sessions whose response is still being sent (session_id -> count)
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._async_db: Any = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+        self.writes = 0
+        self.coalesced = 0
+        self.write_failures = 0
+
+    @property
+    def worker_id(self) -> str:
+        # Per process: the store may be created before the server forks its workers
+        return f"{socket.gethostname()}-{os.getpid()}"
+
+    @property
+    def write_behind(self) -> bool:
+        return self._flusher is not None
+
+    def _get_async_db(self) -> Any:
+        if self._async_db is None:
+            from agno.db.postgres import AsyncPostgresDb
+
+            self._async_db = AsyncPostgresDb(
+                id=f"{self.id}-async",
+                db_engine=get_async_engine(),
+                db_schema=self.db_schema,
+                session_table=self.session_table_name,
+                runs_table=self.runs_table_name,
+            )
+        return self._async_db
+
+    # Reads
+
+    def get_session(
+        self,
+        session_id: str,
+        session_type: Optional[SessionType] = None,
+        user_id: Optional[str] = None,
+        deserialize: Optional[bool] = True,
+        runs_limit: Optional[int] = None,
+    ) -> Any:
+        if session_type not in (None, SessionType.AGENT):
+            return super().get_session(session_id, session_type, user_id, deserialize, runs_limit)
+
+        entry = self._cache.get(session_id)
+        if entry is None:
+            self.loads += 1
+            session = super().get_session(session_id, session_type, user_id, True, runs_limit)
+            if runs_limit is None and user_id is None:
+                self._remember(session_id, session)
+            if session is None or deserialize:
+                return session
+            return session.to_dict()
+
+        self.hits += 1
+        if entry is _ABSENT or (user_id is not None and entry.user_id != user_id):
+            return None
+        runs = entry.runs or []
+        session = _clone(entry, _history_runs(runs, runs_limit) if runs_limit is not None else runs)
+        return session if deserialize else session.to_dict()
+
+    def _remember(self, session_id: str, session: Any) -> None:
+        """Cache a fully loaded session (or its absence) unless it changed meanwhile."""
+        if session is not None and not isinstance(session, AgentSession):
+            return
+        with self._lock:
+            if session_id in self._pending:
+                return
+            self._cache.set(session_id, _clone(session, session.runs or []) if session is not None else _ABSENT)
+
+    async def aload(self, session_id: str, reload: bool = False) -> None:
+        """
+        Load a session into the cache over the async engine.
+
+        Args:
+            session_id: Session to load
+            reload: Replace a cached copy (it may be stale if another worker
+                served the session since); local unflushed changes are
+                persisted first
+        """
+        if not reload and self._cache.get(session_id) is not None:
+            return
+        if reload:
+            self.reloads += 1
+            await self.aflush([session_id])
+        self.loads += 1
+        with stage("session_load"):
+            session = await self._get_async_db().get_session(
+                session_id=session_id, session_type=SessionType.AGENT
+            )
+            if session is None and settings.session_archive_enabled:
+                from app.core.session_archive import restore_session
+
+                if await asyncio.to_thread(restore_session, session_id):
+                    session = await self._get_async_db().get_session(
+                        session_id=session_id, session_type=SessionType.AGENT
+                    )
+        self._remember(session_id, session)
+
+    # Writes
+
+    def upsert_session(self, session: Any, deserialize: Optional[bool] = True) -> Any:
+        entry = self._cache.get(session.session_id) if isinstance(session, AgentSession) else None
+        if entry is None:
+            # Not cached: the cache cannot tell whether the history is complete
+            self.flush_session(session.session_id)
+            return super().upsert_session(session, deserialize)
+        if entry is not _ABSENT and entry.user_id is not None and entry.user_id != session.user_id:
+            # Same owner check as the upsert in Postgres
+            return None
+
+        cached = _clone(session, entry.runs or [] if entry is not _ABSENT else [])
+        with self._lock:
+            self._cache.set(session.session_id, cached)
+            pending = self._pending.setdefault(session.session_id, _Pending())
+            if pending.session is not None:
+                self.coalesced += 1
+            pending.session = cached
+        if not self.write_behind:
+            self.flush_session(session.session_id)
+        return session if deserialize else session.to_dict()
+
+    def upsert_run(
+        self,
+        run: Any,
+        session_id: str,
+        user_id: Optional[str] = None,
+        run_index: Optional[int] = None,
+    ) -> None:
+        entry = self._cache.get(session_id)
+        if not isinstance(run, RunOutput) or entry is None or entry is _ABSENT:
+            self.flush_session(session_id)
+            super().upsert_run(run=run, session_id=session_id, user_id=user_id, run_index=run_index)
+            return
+
+        runs = list(entry.runs or [])
+        for i, cached_run in enumerate(runs):
+            if cached_run.run_id == run.run_id:
+                runs[i] = run
+                break
+        else:
+            runs.append(run)
+        with self._lock:
+            entry.runs = runs
+            pending = self._pending.setdefault(session_id, _Pending())
+            if run.run_id in pending.runs:
+                self.coalesced += 1
+            pending.runs[run.run_id] = (run, user_id, run_index)
+        if not self.write_behind:
+            self.flush_session(session_id)
+
+    def _forget(self, session_ids: List[str]) -> None:
+        with self._lock:
+            for session_id in session_ids:
+                self._cache.pop(session_id)
+                self._pending.pop(session_id, None)
+
+    def delete_session(self, session_id: str, user_id: Optional[str] = None) -> bool:
+        self._forget([session_id])
+        return super().delete_session(session_id, user_id)
+
+    def delete_sessions(self, session_ids: List[str], user_id: Optional[str] = None) -> None:
+        self._forget(session_ids)
+        super().delete_sessions(session_ids, user_id)
+
+    def rename_session(self, session_id: str, *args: Any, **kwargs: Any) -> Any:
+        self.flush_session(session_id)
+        self._cache.pop(session_id)
+        return super().rename_session(session_id, *args, **kwargs)
+
+    def get_sessions(self, *args: Any, **kwargs: Any) -> Any:
+        # Listings query Postgres directly, so they must see unflushed sessions
+        self.flush()
+        return super().get_sessions(*args, **kwargs)
+
+    # Write-behind
+
+    def _take(self, session_ids: Optional[List[str]] = None) -> List[Tuple[str, _Pending]]:
+        with self._lock:
+            if session_ids is None:
+                session_ids = list(self._pending)
+            return [(sid, self._pending.pop(sid)) for sid in session_ids if sid in self._pending]
+
+    def _due(self) -> List[str]:
+        """Dirty sessions whose response is done, or that waited the maximum delay."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                session_id
+                for session_id, pending in self._pending.items()
+                if not self._active.get(session_id) or now - pending.since >= settings.session_flush_max_delay
+            ]
+
+    def _restore(self, session_id: str, pending: _Pending) -> None:
+        """Put back changes whose write failed, under any newer ones."""
+        with self._lock:
+            newer = self._pending.get(session_id)
+            if newer is None:
+                self._pending[session_id] = pending
+                return
+            newer.session = newer.session or pending.session
+            for run_id, run in pending.runs.items():
+                newer.runs.setdefault(run_id, run)
+            newer.since = min(newer.since, pending.since)
+
+    def _written(self, pending: _Pending, mode: str) -> None:
+        self.writes += 1
+        if pending.session is not None:
+            SESSION_WRITES.labels("session", mode).inc()
+        SESSION_WRITES.labels("run", mode).inc(len(pending.runs))
+        SESSION_WRITE_DELAY.observe(time.monotonic() - pending.since)
+
+    def _failed(self, session_id: str, pending: _Pending, error: Exception) -> None:
+        self.write_failures += 1
+        logger.warning(f"Persisting session {session_id} failed, will retry: {error}")
+        self._restore(session_id, pending)
+
+    def flush_session(self, session_id: str) -> None:
+        """Synchronously persist unflushed changes of a session."""
+        self.flush([session_id])
+
+    def flush(self, session_ids: Optional[List[str]] = None) -> None:
+        """Synchronously persist unflushed changes (of all sessions by default)."""
+        for session_id, pending in self._take(session_ids):
+            try:
+                with stage("session_save"):
+                    if pending.session is not None:
+                        super().upsert_session(pending.session)
+                    for run, user_id, run_index in pending.runs.values():
+                        super().upsert_run(run=run, session_id=session_id, user_id=user_id, run_index=run_index)
+            except Exception as e:
+                self._failed(session_id, pending, e)
+                continue
+            self._written(pending, "write_behind" if self.write_behind else "write_through")
+
+    async def aflush(self, session_ids: Optional[List[str]] = None) -> None:
+        """Persist unflushed changes over the async engine."""
+        db = self._get_async_db()
+        for session_id, pending in self._take(session_ids):
+            try:
+                if pending.session is not None:
+                    await db.upsert_session(pending.session)
+                for run, user_id, run_index in pending.runs.values():
+                    await db.upsert_run(run=run, session_id=session_id, user_id=user_id, run_index=run_index)
+            except Exception as e:
+                self._failed(session_id, pending, e)
+                continue
+            self._written(pending, "write_behind")
+
+    def hold(self, session_id: str) -> None:
+        """Defer flushing a session while its response is being sent."""
+        with self._lock:
+            self._active[session_id] = self._active.get(session_id, 0) + 1
+
+    def release(self, session_id: str) -> None:
+        """The response of a session was sent; flush it on the next pass."""
+        with self._lock:
+            count = self._active.pop(session_id, 0) - 1
+            if count > 0:
+                self._active[session_id] = count
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), settings.session_flush_interval)
+            self._wake.clear()
+            due = self._due()
+            if due:
+                await self.aflush(due)
+
+    async def start(self) -> asyncio.Task:
+        """Start write-behind persistence on the running event loop.
+
+        Returns:
+            The flusher task
+        """
+        if self._flusher is None:
+            self._wake = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+        return self._flusher
+
+    async def stop(self) -> None:
+        """Stop the flusher and persist everything still pending."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flusher
+            self._flusher = None
+            self._wake = None
+        await self.aflush()
+        # Failed writes get one last synchronous attempt
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.loads
+        return {
+            "worker_id": self.worker_id,
+            "write_behind": self.write_behind,
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "pending": len(self._pending),
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "write_failures": self.write_failures,
+        }
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """The agent DB when it is a ``SessionStore`` (``session_cache_enabled``), else None."""
+    from app.core.database import get_agent_db
+
+    db = get_agent_db()
+    return db if isinstance(db, SessionStore) else None
+
+
+def flush_session(session_id: str) -> None:
+    """Persist unflushed changes of a session before writing to its row directly."""
+    store = get_session_store()
+    if store is not None:
+        store.flush_session(session_id)
+
+
+class SessionAffinityMiddleware:
+    """
+    ASGI middleware preparing the session store for agent runs.
+
+    Loads the run's session into the cache before the agent reads it,
+    reloading it unless the affinity cookie shows this worker served the
+    previous turn, holds the write-behind flush until the response is sent
+    and sets the affinity cookie.
+    """
+
+    def __init__(self, app: ASGIApp, store: SessionStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if match_run(scope) is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        cookie = settings.session_affinity_cookie
+        session_id = None
+        try:
+            session_id = (await parse_form(scope, body)).get("session_id") or None
+            if session_id:
+                pinned = HTTPConnection(scope).cookies.get(cookie) == self.store.worker_id
+                await self.store.aload(session_id, reload=settings.session_affinity and not pinned)
+        except Exception as e:
+            # The agent then loads the session itself
+            logger.warning(f"Preloading session {session_id} failed: {e}")
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(
+                    "set-cookie", f"{cookie}={self.store.worker_id}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        if session_id:
+            self.store.hold(session_id)
+        try:
+            await self.app(scope, replay_body(body, receive), send_with_cookie)
+        finally:
+            if session_id:
+                self.store.release(session_id)
@@ -0,0 +1,119 @@
+"""Single-flight coalescing of identical in-flight calls.
+
+When many users ask the same question at once, every run would embed the
+query and search the knowledge base on its own. A ``SingleFlight`` lets
+the first caller for a key (the leader) do the work while concurrent
+callers with the same key (followers) wait for its result instead of
+issuing the same call again. Nothing is cached: once the leader finishes,
+the next call for the key runs again.
+
+Leader/follower counts go to ``single_flight_calls_total`` and are shown
+by ``GET /api/v1/system/caches``.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from app.core.metrics import COALESCED_CALLS
+
+V = TypeVar("V")
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key.
+
+    ``do`` coalesces calls across threads, ``ado`` across tasks of one
+    event loop. Both return the result and whether it was shared (the
+    caller was a follower). Errors of the leader are raised to every
+    caller.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def _count(self, leader: bool) -> None:
+        if leader:
+            self.leaders += 1
+        else:
+            self.followers += 1
+        COALESCED_CALLS.labels(self.name, "leader" if leader else "follower").inc()
+
+    def do(self, key: Hashable, fn: Callable[..., V], *args: Any, **kwargs: Any) -> Tuple[V, bool]:
+        """Run ``fn`` unless an identical call is in flight, then share its result."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            self._count(leader)
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result, False
+
+    def _finish(self, key: Hashable) -> None:
+        # Forget the call before publishing its result, so later callers start a fresh one
+        with self._lock:
+            self._calls.pop(key, None)
+
+    async def ado(
+        self, key: Hashable, fn: Callable[..., Awaitable[V]], *args: Any, **kwargs: Any
+    ) -> Tuple[V, bool]:
+        """Async ``do``; a follower that is cancelled does not cancel the shared call."""
+        task_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(task_key)
+        leader = task is None
+        if leader:
+            task = self._tasks[task_key] = asyncio.ensure_future(fn(*args, **kwargs))
+
+            def forget(done: asyncio.Future) -> None:
+                if self._tasks.get(task_key) is done:
+                    del self._tasks[task_key]
+
+            task.add_done_callback(forget)
+        with self._lock:
+            self._count(leader)
+        return await asyncio.shield(task), not leader
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls that ran vs. joined an in-flight call."""
+        total = self.leaders + self.followers
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "in_flight": len(self._calls) + len(self._tasks),
+            "fan_out": round(total / self.leaders, 2) if self.leaders else 0.0,
+        }
+
+
+# Process-wide flights, one per coalesced operation
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Get or create the shared ``SingleFlight`` of an operation."""
+    with _flights_lock:
+        if name not in _flights:
+            _flights[name] = SingleFlight(name)
+        return _flights[name]
+
+
+def get_single_flight_stats() -> Dict[str, Dict[str, Any]]:
+    """Leader/follower counters of every operation."""
+    return {name: flight.stats() for name, flight in _flights.items()}
@@ -0,0 +1,136 @@
+"""Startup timing and optional warm-up.
+
+Agents, engines, the Supabase client and the embedder are all created
+lazily, so importing the app never touches the network. ``warm_up`` builds
+them ahead of the first request when ``startup_warmup`` is enabled, and
+every step is recorded in a per-component startup breakdown (``app.main``
+times its imports per group, ``app.agent_os`` the agents and AgentOS).
+NumPy (pricing tables, knowledge replica) and the OpenAI SDK are imported
+on first use, not by the app's imports.
+
+Under gunicorn, ``preload_shared_state`` loads read-only state (pricing
+table, tokenizers, reranker weights, knowledge replica) once in the master process; forked
+workers share those pages copy-on-write instead of each loading a copy.
+"""
+import gc
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Component name -> seconds, in the order the steps ran
+_timings: Dict[str, float] = {}
+
+
+@contextmanager
+def timed(component: str) -> Iterator[None]:
+    """Record how long a startup step takes."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings[component] = time.perf_counter() - started
+
+
+def record(component: str, seconds: float) -> None:
+    """Record a startup step measured elsewhere."""
+    _timings[component] = seconds
+
+
+def get_startup_timings() -> Dict[str, float]:
+    """Startup breakdown in seconds per component."""
+    return dict(_timings)
+
+
+def _check_database() -> None:
+    from sqlalchemy import text as sql
+
+    from app.core.database import get_engine
+
+    # Opens the first pooled connection
+    with get_engine().connect() as conn:
+        conn.execute(sql("SELECT 1"))
+
+
+def _warmup_steps() -> List[Tuple[str, Callable[[], object]]]:
+    from app.agents.pricing import get_pricing_table
+    from app.core.database import get_agent_db, get_supabase
+    from app.core.knowledge_base import ensure_knowledge_schema, get_embedder
+
+    return [
+        ("database", _check_database),
+        ("agent_db", get_agent_db),
+        ("knowledge_schema", ensure_knowledge_schema),
+        ("embedder", get_embedder),
+        ("supabase", get_supabase),
+        ("pricing", get_pricing_table),
+    ]
+
+
+def _preload_steps() -> List[Tuple[str, Callable[[], object]]]:
+    from agno.utils.tokens import count_text_tokens
+
+    from app.agents.pricing import get_pricing_table
+    from app.core.config import settings
+    from app.core.knowledge_base import get_vector_db
+    from app.knowledge.retrieval import get_reranker
+
+    model_ids = [settings.openrouter_model, *settings.model_fallbacks]
+    steps: List[Tuple[str, Callable[[], object]]] = [
+        ("pricing", get_pricing_table),
+        # Tokenizers are cached per model by Agno
+        ("tokenizer", lambda: [count_text_tokens("warm up", model_id=model_id) for model_id in model_ids]),
+    ]
+    if settings.knowledge_replica_enabled:
+        # Memory-maps the snapshot; the workers sync it with the table
+        steps.append(("knowledge_replica", lambda: get_vector_db().replica.load()))
+    if settings.knowledge_search_rerank or any(
+        overrides.get("rerank") for overrides in settings.knowledge_search_overrides.values()
+    ):
+        steps.append(("reranker", lambda: get_reranker()._load()))
+    return steps
+
+
+def preload_shared_state() -> Dict[str, float]:
+    """
+    Load read-only state in the server's master process before workers fork.
+
+    Connections opened meanwhile (e.g. pricing from the DB) are closed, and
+    the loaded objects are moved out of the garbage collector's reach so
+    collections in the workers do not touch (and copy) their pages.
+
+    Returns:
+        Startup breakdown including the preload steps
+    """
+    from app.core.database import dispose_engines
+
+    for component, step in _preload_steps():
+        try:
+            with timed(f"preload.{component}"):
+                step()
+        except Exception as e:
+            logger.warning(f"Preload step '{component}' failed: {e}")
+    dispose_engines()
+    gc.freeze()
+    return get_startup_timings()
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Build shared resources before the first request.
+
+    A failing step is logged and skipped; the resource is then created
+    (and the error raised) on first use instead.
+
+    Returns:
+        Startup breakdown including the warm-up steps
+    """
+    for component, step in _warmup_steps():
+        try:
+            with timed(f"warmup.{component}"):
+                step()
+        except Exception as e:
+            logger.warning(f"Warm-up step '{component}' failed: {e}")
+    return get_startup_timings()
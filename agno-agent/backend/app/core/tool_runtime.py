@@ -0,0 +1,154 @@
+"""Execution layer for agent tools.
+
+``agent_tool`` turns a plain function into an Agno tool that:
+
+- returns compact JSON in a stable shape: no indentation or whitespace,
+  ``None`` fields dropped, float noise rounded away, keys in the order the
+  function builds them. Tool outputs are re-sent with every later model
+  call of the run, so padding costs tokens on each of them;
+- memoizes pure tools by their normalized arguments in a TTL cache
+  (``cache_ttl``), within and across runs;
+- is a coroutine: blocking functions run on a bounded thread pool and
+  coroutine functions are awaited, so the tool calls of one model turn,
+  which Agno starts together with ``asyncio.gather``, overlap instead of
+  running one after the other on the event loop.
+
+Latency per tool is recorded by ``tool_timing_hook`` (``agent_tool_seconds``)
+and the size of every output in tokens in ``agent_tool_output_tokens``.
+"""
+import asyncio
+import functools
+import inspect
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from agno.tools import tool
+from agno.tools.function import Function
+from agno.utils.tokens import count_text_tokens
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import TOOL_OUTPUT_TOKENS, current_agent
+
+logger = logging.getLogger(__name__)
+
+# Decimals kept in float results (prices have 2, multipliers 2-3)
+_FLOAT_DIGITS = 4
+
+# Thread pool of the blocking tools (created on first use)
+_pool: Optional[ThreadPoolExecutor] = None
+# Result caches of the memoized tools, by tool name
+_caches: Dict[str, TTLCache[str]] = {}
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=settings.tool_workers, thread_name_prefix="agent-tool")
+    return _pool
+
+
+def compact(value: Any) -> Any:
+    """Drop ``None`` fields and float noise from a tool result."""
+    if isinstance(value, dict):
+        return {key: compact(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [compact(item) for item in value]
+    if isinstance(value, float):
+        return round(value, _FLOAT_DIGITS)
+    return value
+
+
+def to_output(value: Any) -> str:
+    """Render a tool result as compact JSON (strings are passed through)."""
+    if isinstance(value, str):
+        return value
+    return json.dumps(compact(value), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def default_cache_key(arguments: Dict[str, Any]) -> Hashable:
+    """Cache key of a call: arguments with trimmed, case-folded strings."""
+    return json.dumps(_normalize(arguments), sort_keys=True, default=str)
+
+
+def _record_output(name: str, output: str) -> None:
+    TOOL_OUTPUT_TOKENS.labels(current_agent.get(), name).observe(
+        count_text_tokens(output, settings.openrouter_model)
+    )
+
+
+def agent_tool(
+    cache_ttl: Optional[float] = None,
+    cache_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+    blocking: bool = True,
+    **tool_kwargs: Any,
+) -> Callable[[Callable[..., Any]], Function]:
+    """
+    Decorator building an Agno tool on top of the execution layer.
+
+    The function keeps its signature and docstring (what the model sees)
+    and returns plain data; the layer renders it.
+
+    Args:
+        cache_ttl: Seconds a result is reused for the same normalized
+            arguments (None or 0 = not cached; only for pure tools)
+        cache_key: Normalizes the call arguments into a cache key
+            (defaults to ``default_cache_key``)
+        blocking: Run a synchronous function on the tool thread pool
+            (False for fast CPU-only functions)
+        **tool_kwargs: Passed to Agno's ``@tool``
+    """
+
+    def decorator(func: Callable[..., Any]) -> Function:
+        name = tool_kwargs.get("name") or func.__name__
+        cache: Optional[TTLCache[str]] = None
+        if cache_ttl:
+            cache = _caches[name] = TTLCache(max_size=settings.tool_cache_size, default_ttl=cache_ttl)
+        make_key = cache_key or default_cache_key
+
+        @functools.wraps(func)
+        async def run(**kwargs: Any) -> str:
+            key = make_key(kwargs) if cache is not None else None
+            output = cache.get(key) if key is not None else None
+            if output is None:
+                if inspect.iscoroutinefunction(func):
+                    result = await func(**kwargs)
+                elif blocking:
+                    # Copy the context so stages inside the tool keep the agent label
+                    call = functools.partial(copy_context().run, func, **kwargs)
+                    result = await asyncio.get_running_loop().run_in_executor(_get_pool(), call)
+                else:
+                    result = func(**kwargs)
+                output = to_output(result)
+                if key is not None:
+                    cache.set(key, output)
+            _record_output(name, output)
+            return output
+
+        return tool(**tool_kwargs)(run)
+
+    return decorator
+
+
+def clear_tool_caches() -> None:
+    """Drop every memoized tool result (e.g. after the data behind them changed)."""
+    for cache in _caches.values():
+        cache.clear()
+
+
+def get_tool_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Size and hit/miss counters of the tool result caches."""
+    return {name: cache.stats() for name, cache in _caches.items()}
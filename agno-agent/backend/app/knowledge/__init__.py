@@ -0,0 +1 @@
+"""RAG processing: vector index management, ingestion and retrieval."""
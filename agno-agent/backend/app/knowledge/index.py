@@ -0,0 +1,610 @@
+"""ANN index lifecycle for the ``common_knowledge_chunks`` vector table.
+
+The index type (HNSW or IVFFlat) and its build/search parameters come from
+``Settings``. ``PgVector`` applies the search parameters (``hnsw.ef_search``
+or ``ivfflat.probes``) with ``SET LOCAL`` on every query.
+
+With ``vector_quantization`` the ANN index is built over a compact
+expression of the stored float32 embeddings instead of the embeddings
+themselves (pgvector >= 0.7):
+
+- ``halfvec``: float16 vectors (half the index size),
+- ``binary``: one bit per dimension, hamming distance (1/32),
+- ``matryoshka``: the leading ``vector_quantization_dimensions`` dimensions
+  of ``text-embedding-3-small`` as float16.
+
+Searches take ``vector_rescore_factor`` times more candidates from the
+compact index and re-rank them by exact cosine distance on the float32
+column. Existing rows need no rewrite: ``rebuild`` builds the compact index
+concurrently and drops the previous one.
+
+With ``knowledge_scope_indexes`` every build also creates partial ANN
+indexes, one per region and one per service (see ``app.knowledge.scope``),
+over the same compact expression. A search scoped to a region or service
+walks the much smaller partial index of that scope instead of filtering a
+global top-k, so it neither loses results to the filter nor needs larger
+search parameters.
+
+Usage:
+    python -m app.knowledge.index status
+    python -m app.knowledge.index build            # CREATE INDEX CONCURRENTLY
+    python -m app.knowledge.index rebuild          # build new index, then swap
+    python -m app.knowledge.index report --queries heldout.txt --k 10 \\
+        --values 10,20,40,80,160
+    python -m app.knowledge.index quantization --queries heldout.txt --k 10 \\
+        [--build-missing]
+"""
+import argparse
+import json
+import logging
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from agno.vectordb.pgvector import HNSW, Ivfflat
+from sqlalchemy import text as sql
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.core.database import get_engine, to_vector_literal
+from app.knowledge.scope import (
+    SCOPE_KEYS,
+    scope_expression,
+    scope_predicate,
+    scope_values,
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = "ai"
+TABLE = "common_knowledge_chunks"
+
+VectorIndex = Union[HNSW, Ivfflat]
+
+QUANTIZATION_MODES = ("none", "halfvec", "binary", "matryoshka")
+
+
+@dataclass
+class CompactVectors:
+    """How one quantization mode stores, indexes and queries vectors."""
+
+    expression: str  # Indexed expression over the float32 column
+    ops: str  # Operator class
+    operator: str  # Distance operator the index serves
+    query: str  # Same expression for the query vector (bound as :q)
+    bytes_per_vector: int
+
+
+def get_compact_vectors(mode: Optional[str] = None) -> CompactVectors:
+    """Index expression and query form of a quantization mode."""
+    mode = mode or settings.vector_quantization
+    dims = settings.embedding_dimensions
+    if mode == "none":
+        return CompactVectors("embedding", "vector_cosine_ops", "<=>", "CAST(:q AS vector)", 4 * dims + 8)
+    if mode == "halfvec":
+        return CompactVectors(
+            f"(embedding::halfvec({dims}))", "halfvec_cosine_ops", "<=>",
+            f"CAST(:q AS halfvec({dims}))", 2 * dims + 8,
+        )
+    if mode == "binary":
+        return CompactVectors(
+            f"(binary_quantize(embedding)::bit({dims}))", "bit_hamming_ops", "<~>",
+            f"binary_quantize(CAST(:q AS vector))::bit({dims})", (dims + 7) // 8 + 8,
+        )
+    if mode == "matryoshka":
+        kept = settings.vector_quantization_dimensions
+        if not 0 < kept <= dims:
+            raise ValueError(f"vector_quantization_dimensions must be in 1..{dims}, got {kept}")
+        return CompactVectors(
+            f"(subvector(embedding, 1, {kept})::halfvec({kept}))", "halfvec_cosine_ops", "<=>",
+            f"subvector(CAST(:q AS vector), 1, {kept})::halfvec({kept})", 2 * kept + 8,
+        )
+    raise ValueError(f"Unsupported vector_quantization '{mode}'")
+
+
+def index_name(index_type: Optional[str] = None, quantization: Optional[str] = None) -> str:
+    """Name of the managed ANN index for the given type and quantization."""
+    index_type = index_type or settings.vector_index_type
+    quantization = quantization or settings.vector_quantization
+    if quantization == "none":
+        return f"{TABLE}_{index_type}_idx"
+    return f"{TABLE}_{index_type}_{quantization}_idx"
+
+
+def scope_index_names(index_type: Optional[str] = None, quantization: Optional[str] = None) -> Dict[str, Dict[str, str]]:
+    """Names of the partial ANN indexes, per scope key and value."""
+    # Shortened table prefix keeps every name within Postgres' 63 characters
+    base = index_name(index_type, quantization)[len(TABLE):-len("_idx")]
+    base = f"knowledge_chunks{base}"
+    return {
+        key: {value: f"{base}_{value.lower()}_idx" for value in scope_values(key)}
+        for key in SCOPE_KEYS
+    }
+
+
+def _managed_index_names() -> List[str]:
+    names = []
+    for index_type in ("hnsw", "ivfflat"):
+        for quantization in QUANTIZATION_MODES:
+            names.append(index_name(index_type, quantization))
+            for by_value in scope_index_names(index_type, quantization).values():
+                names.extend(by_value.values())
+    return names
+
+
+def get_vector_index_config() -> VectorIndex:
+    """
+    Build the PgVector index config from settings.
+
+    The returned object also carries the per-query search parameter that
+    PgVector sets before every vector search.
+    """
+    maintenance = {"maintenance_work_mem": settings.vector_index_maintenance_work_mem}
+    if settings.vector_index_type == "ivfflat":
+        return Ivfflat(
+            name=index_name("ivfflat"),
+            lists=settings.ivfflat_lists or 100,
+            probes=settings.ivfflat_probes,
+            dynamic_lists=settings.ivfflat_lists == 0,
+            configuration=maintenance,
+        )
+    if settings.vector_index_type != "hnsw":
+        raise ValueError(f"Unsupported vector_index_type '{settings.vector_index_type}'")
+    return HNSW(
+        name=index_name("hnsw"),
+        m=settings.hnsw_m,
+        ef_construction=settings.hnsw_ef_construction,
+        ef_search=settings.hnsw_ef_search,
+        configuration=maintenance,
+    )
+
+
+def apply_search_params(
+    vector_index: VectorIndex,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+) -> None:
+    """Override the per-query search parameter on a live index config."""
+    if isinstance(vector_index, HNSW) and ef_search is not None:
+        vector_index.ef_search = ef_search
+    if isinstance(vector_index, Ivfflat) and probes is not None:
+        vector_index.probes = probes
+
+
+def _search_param_sql(index_type: str, value: int) -> str:
+    if index_type == "ivfflat":
+        return f"SET LOCAL ivfflat.probes = {int(value)}"
+    return f"SET LOCAL hnsw.ef_search = {int(value)}"
+
+
+def _row_count(conn: Connection) -> int:
+    return conn.execute(sql(f"SELECT count(*) FROM {SCHEMA}.{TABLE}")).scalar_one()
+
+
+def _create_index_sql(
+    name: str, row_count: int, quantization: Optional[str] = None, where: Optional[str] = None
+) -> str:
+    compact = get_compact_vectors(quantization)
+    column = f"{compact.expression} {compact.ops}"
+    predicate = f" WHERE {where}" if where else ""
+    if settings.vector_index_type == "ivfflat":
+        # pgvector guidance: rows/1000 lists up to 1M rows, sqrt(rows) above
+        lists = settings.ivfflat_lists or max(
+            1, row_count // 1000 if row_count <= 1_000_000 else int(row_count ** 0.5)
+        )
+        return (
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {SCHEMA}.{TABLE}"
+            f" USING ivfflat ({column}) WITH (lists = {lists}){predicate}"
+        )
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {SCHEMA}.{TABLE}"
+        f" USING hnsw ({column})"
+        f" WITH (m = {settings.hnsw_m}, ef_construction = {settings.hnsw_ef_construction}){predicate}"
+    )
+
+
+def _check_quantization_support(conn: Connection, quantization: str) -> None:
+    if quantization == "none":
+        return
+    version = conn.execute(sql("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+    if version is None or tuple(int(part) for part in version.split(".")[:2]) < (0, 7):
+        raise RuntimeError(
+            f"vector_quantization '{quantization}' needs pgvector >= 0.7 (installed: {version});"
+            " upgrade the server package, then run ALTER EXTENSION vector UPDATE"
+        )
+
+
+def _autocommit(engine: Engine) -> Connection:
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _prepare_build(conn: Connection) -> None:
+    conn.execute(sql(
+        f"SET maintenance_work_mem = '{settings.vector_index_maintenance_work_mem}'"
+    ))
+    conn.execute(sql(
+        f"SET max_parallel_maintenance_workers = {settings.vector_index_build_workers}"
+    ))
+
+
+def text_index_name() -> str:
+    """Name of the full-text (GIN) index used by keyword/hybrid search."""
+    return f"{TABLE}_content_fts_idx"
+
+
+def _create_text_index_sql() -> str:
+    # Must match the expression PgVector.keyword_search ranks on
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {text_index_name()} ON {SCHEMA}.{TABLE}"
+        f" USING gin (to_tsvector('{settings.knowledge_content_language}', content))"
+    )
+
+
+def scope_filter_index_name() -> str:
+    """Name of the btree index on the region/service metadata (keyword search filters)."""
+    return f"{TABLE}_scope_idx"
+
+
+def _build_scope_indexes(conn: Connection) -> None:
+    """Partial ANN index per region and per service, plus the filter index."""
+    for key, by_value in scope_index_names().items():
+        for value, name in by_value.items():
+            where = scope_predicate(key, value)
+            row_count = conn.execute(sql(f"SELECT count(*) FROM {SCHEMA}.{TABLE} WHERE {where}")).scalar_one()
+            conn.execute(sql(_create_index_sql(name, row_count, where=where)))
+    conn.execute(sql(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {scope_filter_index_name()} ON {SCHEMA}.{TABLE}"
+        f" (({scope_expression('region')}), ({scope_expression('service')}))"
+    ))
+
+
+def build_index(engine: Optional[Engine] = None) -> Dict[str, Any]:
+    """
+    Build the configured ANN index and the full-text index without
+    blocking writes.
+
+    Returns:
+        Index status after the build
+    """
+    engine = engine or get_engine()
+    name = index_name()
+    with _autocommit(engine) as conn:
+        _check_quantization_support(conn, settings.vector_quantization)
+        _prepare_build(conn)
+        started = time.perf_counter()
+        conn.execute(sql(_create_index_sql(name, _row_count(conn))))
+        conn.execute(sql(_create_text_index_sql()))
+        if settings.knowledge_scope_indexes:
+            _build_scope_indexes(conn)
+        logger.info(f"Built {name} in {time.perf_counter() - started:.1f}s")
+    return index_status(engine)
+
+
+def rebuild_index(engine: Optional[Engine] = None) -> Dict[str, Any]:
+    """
+    Rebuild the ANN index with current settings and swap it in.
+
+    A new index is built concurrently under a temporary name, then the old
+    managed indexes are dropped concurrently and the new one is renamed, so
+    searches keep using an index for the whole operation. This is also the
+    migration between quantization modes: the compact vectors are computed
+    from the stored embeddings while the index is built. Partial scope
+    indexes are rebuilt afterwards; scoped searches filter the main index
+    meanwhile.
+    """
+    engine = engine or get_engine()
+    name = index_name()
+    tmp_name = f"{name}_new"
+    with _autocommit(engine) as conn:
+        _check_quantization_support(conn, settings.vector_quantization)
+        _prepare_build(conn)
+        conn.execute(sql(f"DROP INDEX CONCURRENTLY IF EXISTS {SCHEMA}.{tmp_name}"))
+        started = time.perf_counter()
+        conn.execute(sql(_create_index_sql(tmp_name, _row_count(conn))))
+        for old in _managed_index_names():
+            conn.execute(sql(f"DROP INDEX CONCURRENTLY IF EXISTS {SCHEMA}.{old}"))
+        conn.execute(sql(f"ALTER INDEX {SCHEMA}.{tmp_name} RENAME TO {name}"))
+        conn.execute(sql(_create_text_index_sql()))
+        if settings.knowledge_scope_indexes:
+            _build_scope_indexes(conn)
+        logger.info(f"Rebuilt {name} in {time.perf_counter() - started:.1f}s")
+    return index_status(engine)
+
+
+def index_status(engine: Optional[Engine] = None) -> Dict[str, Any]:
+    """Report the ANN and full-text indexes on the chunks table, their size and validity."""
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        rows = conn.execute(sql(
+            "SELECT c.relname AS name, am.amname AS method, i.indisvalid AS valid,"
+            " pg_relation_size(c.oid) AS bytes, pg_get_indexdef(c.oid) AS definition"
+            " FROM pg_index i"
+            " JOIN pg_class c ON c.oid = i.indexrelid"
+            " JOIN pg_am am ON am.oid = c.relam"
+            " WHERE i.indrelid = CAST(:table AS regclass)"
+            " AND am.amname IN ('hnsw', 'ivfflat', 'gin')"
+        ), {"table": f"{SCHEMA}.{TABLE}"}).mappings().all()
+        row_count = _row_count(conn)
+    return {
+        "table": f"{SCHEMA}.{TABLE}",
+        "rows": row_count,
+        "configured": index_name(),
+        "quantization": settings.vector_quantization,
+        "scope_indexes": scope_index_names() if settings.knowledge_scope_indexes else {},
+        "indexes": [dict(row) for row in rows],
+    }
+
+
+def _top_k(conn: Connection, vector: str, k: int) -> List[str]:
+    return [
+        row.id
+        for row in conn.execute(
+            sql(
+                f"SELECT id FROM {SCHEMA}.{TABLE}"
+                " ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"
+            ),
+            {"q": vector, "k": k},
+        )
+    ]
+
+
+def rescored_search_sql(compact: CompactVectors, columns: str = "id") -> str:
+    """
+    Top ``:k`` rows for ``:q``: ``:candidates`` from the compact index,
+    re-ranked by exact cosine distance on the float32 embeddings.
+    """
+    return (
+        f"SELECT {columns}, embedding <=> CAST(:q AS vector) AS distance FROM ("
+        f"SELECT * FROM {SCHEMA}.{TABLE}"
+        f" ORDER BY {compact.expression} {compact.operator} {compact.query} LIMIT :candidates"
+        ") AS candidates ORDER BY distance LIMIT :k"
+    )
+
+
+def candidate_search_param(index_type: str, value: int, candidates: int) -> str:
+    """Search parameter for a compact-index scan (HNSW returns at most ef_search rows)."""
+    if index_type == "hnsw":
+        value = max(value, candidates)
+    return _search_param_sql(index_type, value)
+
+
+def _ann_top_k(conn: Connection, vector: str, k: int, quantization: str) -> List[str]:
+    if quantization == "none":
+        return _top_k(conn, vector, k)
+    return [
+        row.id
+        for row in conn.execute(
+            sql(rescored_search_sql(get_compact_vectors(quantization))),
+            {"q": vector, "k": k, "candidates": k * settings.vector_rescore_factor},
+        )
+    ]
+
+
+def _percentile(values: Sequence[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def recall_report(
+    queries: Sequence[str],
+    k: int = 10,
+    values: Optional[Sequence[int]] = None,
+    engine: Optional[Engine] = None,
+) -> Dict[str, Any]:
+    """
+    Measure recall@k and latency of the ANN index against exact search.
+
+    Exact neighbours come from a sequential scan (index scans disabled);
+    each search parameter value (``ef_search`` for HNSW, ``probes`` for
+    IVFFlat) is then timed over the same held-out queries.
+
+    Args:
+        queries: Held-out query texts
+        k: Number of neighbours compared
+        values: Search parameter values to sweep
+        engine: Engine to use (defaults to the shared engine)
+
+    Returns:
+        Report with one row per parameter value
+    """
+    # Imported here: knowledge_base imports this module for the index config
+    from app.core.knowledge_base import get_embedder
+
+    engine = engine or get_engine()
+    index_type = settings.vector_index_type
+    if values is None:
+        values = [10, 20, 40, 80, 160] if index_type == "hnsw" else [1, 5, 10, 20, 50]
+
+    embedder = get_embedder()
+    vectors = [to_vector_literal(embedder.get_embedding(q)) for q in queries]
+
+    exact: List[List[str]] = []
+    exact_ms: List[float] = []
+    with engine.connect() as conn:
+        for vector in vectors:
+            with conn.begin():
+                conn.execute(sql("SET LOCAL enable_indexscan = off"))
+                started = time.perf_counter()
+                exact.append(_top_k(conn, vector, k))
+                exact_ms.append((time.perf_counter() - started) * 1000)
+
+        rows = []
+        for value in values:
+            latencies: List[float] = []
+            recalls: List[float] = []
+            for vector, truth in zip(vectors, exact):
+                with conn.begin():
+                    conn.execute(sql(_search_param_sql(index_type, value)))
+                    started = time.perf_counter()
+                    found = _ann_top_k(conn, vector, k, settings.vector_quantization)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                if truth:
+                    recalls.append(len(set(found) & set(truth)) / len(truth))
+            rows.append({
+                "ef_search" if index_type == "hnsw" else "probes": value,
+                f"recall@{k}": round(statistics.mean(recalls), 4) if recalls else None,
+                "p50_ms": round(_percentile(latencies, 50), 2),
+                "p95_ms": round(_percentile(latencies, 95), 2),
+            })
+
+    return {
+        "index": index_status(engine),
+        "queries": len(queries),
+        "k": k,
+        "exact_p50_ms": round(_percentile(exact_ms, 50), 2) if exact_ms else None,
+        "results": rows,
+    }
+
+
+def _index_size(conn: Connection, name: str) -> Optional[int]:
+    return conn.execute(
+        sql(
+            "SELECT pg_relation_size(c.oid) FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid"
+            " WHERE c.relname = :name AND i.indisvalid"
+        ),
+        {"name": name},
+    ).scalar()
+
+
+def quantization_report(
+    queries: Sequence[str],
+    k: int = 10,
+    modes: Optional[Sequence[str]] = None,
+    build_missing: bool = False,
+    engine: Optional[Engine] = None,
+) -> Dict[str, Any]:
+    """
+    Compare quantization modes: vector and index size, latency and recall@k.
+
+    Each mode is measured through its own managed index (full-precision
+    re-scoring included); recall is against exact search on the float32
+    embeddings.
+
+    Args:
+        queries: Held-out query texts
+        k: Number of neighbours compared
+        modes: Modes to compare (defaults to all)
+        build_missing: Build missing indexes concurrently first (they stay
+            until the next ``rebuild``)
+        engine: Engine to use (defaults to the shared engine)
+
+    Returns:
+        Report with one row per mode
+    """
+    from app.core.knowledge_base import get_embedder
+
+    engine = engine or get_engine()
+    index_type = settings.vector_index_type
+    search_value = settings.hnsw_ef_search if index_type == "hnsw" else settings.ivfflat_probes
+    candidates = k * settings.vector_rescore_factor
+    embedder = get_embedder()
+    vectors = [to_vector_literal(embedder.get_embedding(q)) for q in queries]
+
+    modes = list(modes or QUANTIZATION_MODES)
+    if build_missing:
+        with _autocommit(engine) as conn:
+            for mode in modes:
+                name = index_name(index_type, mode)
+                if _index_size(conn, name) is None:
+                    _check_quantization_support(conn, mode)
+                    _prepare_build(conn)
+                    started = time.perf_counter()
+                    conn.execute(sql(_create_index_sql(name, _row_count(conn), mode)))
+                    logger.info(f"Built {name} in {time.perf_counter() - started:.1f}s")
+
+    rows = []
+    with engine.connect() as conn:
+        exact: List[List[str]] = []
+        for vector in vectors:
+            with conn.begin():
+                conn.execute(sql("SET LOCAL enable_indexscan = off"))
+                exact.append(_top_k(conn, vector, k))
+        table_bytes = conn.execute(sql(f"SELECT pg_total_relation_size('{SCHEMA}.{TABLE}')")).scalar_one()
+
+        for mode in modes:
+            name = index_name(index_type, mode)
+            index_bytes = _index_size(conn, name)
+            row: Dict[str, Any] = {
+                "mode": mode,
+                "index": name,
+                "bytes_per_vector": get_compact_vectors(mode).bytes_per_vector,
+                "index_bytes": index_bytes,
+            }
+            if index_bytes is None:
+                rows.append({**row, "skipped": "index missing (use --build-missing)"})
+                continue
+            latencies: List[float] = []
+            recalls: List[float] = []
+            for vector, truth in zip(vectors, exact):
+                with conn.begin():
+                    conn.execute(sql(candidate_search_param(index_type, search_value, candidates)))
+                    started = time.perf_counter()
+                    found = _ann_top_k(conn, vector, k, mode)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                if truth:
+                    recalls.append(len(set(found) & set(truth)) / len(truth))
+            rows.append({
+                **row,
+                f"recall@{k}": round(statistics.mean(recalls), 4) if recalls else None,
+                "p50_ms": round(_percentile(latencies, 50), 2),
+                "p95_ms": round(_percentile(latencies, 95), 2),
+            })
+
+    return {
+        "table": f"{SCHEMA}.{TABLE}",
+        "table_bytes": table_bytes,
+        "queries": len(queries),
+        "k": k,
+        "rescore_candidates": candidates,
+        "results": rows,
+    }
+
+
+def _load_queries(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line)["query"] for line in f if line.strip()]
+        return [line.strip() for line in f if line.strip()]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the knowledge ANN index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Show vector indexes on the chunks table")
+    sub.add_parser("build", help="Create the configured index concurrently")
+    sub.add_parser("rebuild", help="Rebuild with current settings and swap")
+    report = sub.add_parser("report", help="Recall vs latency over held-out queries")
+    report.add_argument("--queries", required=True, help="Text (one per line) or JSONL file")
+    report.add_argument("--k", type=int, default=10)
+    report.add_argument("--values", help="Comma-separated ef_search/probes values")
+    quantization = sub.add_parser("quantization", help="Size, latency and recall per quantization mode")
+    quantization.add_argument("--queries", required=True, help="Text (one per line) or JSONL file")
+    quantization.add_argument("--k", type=int, default=10)
+    quantization.add_argument("--modes", help=f"Comma-separated subset of {','.join(QUANTIZATION_MODES)}")
+    quantization.add_argument("--build-missing", action="store_true", help="Build missing indexes first")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "status":
+        result = index_status()
+    elif args.command == "build":
+        result = build_index()
+    elif args.command == "rebuild":
+        result = rebuild_index()
+    elif args.command == "quantization":
+        result = quantization_report(
+            _load_queries(args.queries),
+            k=args.k,
+            modes=args.modes.split(",") if args.modes else None,
+            build_missing=args.build_missing,
+        )
+    else:
+        values = [int(v) for v in args.values.split(",")] if args.values else None
+        result = recall_report(_load_queries(args.queries), k=args.k, values=values)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
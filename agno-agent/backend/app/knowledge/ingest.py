@@ -0,0 +1,539 @@
+"""Bulk document ingestion into the shared knowledge base.
+
+Streams PDF/TXT/Markdown files from a directory or a zip/tar archive,
+extracts and chunks them in a process pool (``chunk_size``/``chunk_overlap``
+from Settings), embeds chunks in large batches under request and token
+rate limits, and writes each document's chunks with multi-row inserts in
+a single transaction together with its checkpoint row. Documents whose
+checkpoint matches their current content hash are skipped, so an
+interrupted load resumes where it stopped.
+
+Re-ingestion is incremental: chunk ids are derived from the document id
+and the chunk's content hash, so when a document changes only new chunks
+are embedded and inserted, vanished chunks are deleted and unchanged
+chunks are left untouched - all in one transaction per document.
+
+Chunks are tagged with the region and service named in their document's
+path (``region``/``service`` metadata, see ``app.knowledge.scope``).
+
+Usage:
+    python -m app.knowledge.ingest /data/policies
+    python -m app.knowledge.ingest /data/policies.zip --workers 8 --force
+"""
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text as sql
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.core.database import get_engine
+from app.core.embedding_cache import embed_texts
+from app.core.knowledge_base import get_contents_db, get_embedder, get_vector_db
+from app.core.rate_limit import TokenBucket
+from app.knowledge.scope import classify_source
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+CHECKPOINT_TABLE = "ai.knowledge_ingest_checkpoints"
+
+# Namespace for deterministic content ids (same source -> same content id)
+_CONTENT_NAMESPACE = uuid.UUID("6c1f3f8e-8d0b-4c4e-9d7e-4a3c2f0e9b11")
+
+
+@dataclass
+class ChunkedDocument:
+    """A source document after extraction and chunking."""
+
+    source: str
+    content_hash: str
+    size: int
+    chunks: List[str]
+    chunk_hashes: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def content_id(self) -> str:
+        return str(uuid.uuid5(_CONTENT_NAMESPACE, self.source))
+
+    def chunk_id(self, chunk_hash: str) -> str:
+        """Content-addressed chunk id: stable while the chunk text is unchanged."""
+        return hashlib.md5(f"{self.content_id}:{chunk_hash}".encode("utf-8")).hexdigest()
+
+    def diff(self, existing_ids: Set[str]) -> "ChunkDiff":
+        """Compare this version's chunks with the chunk ids already stored."""
+        current: Dict[str, Tuple[str, str]] = {}
+        for chunk, chunk_hash in zip(self.chunks, self.chunk_hashes):
+            current.setdefault(self.chunk_id(chunk_hash), (chunk, chunk_hash))
+        return ChunkDiff(
+            added={cid: value for cid, value in current.items() if cid not in existing_ids},
+            removed=existing_ids - current.keys(),
+            unchanged=len(existing_ids & current.keys()),
+        )
+
+
+@dataclass
+class ChunkDiff:
+    """Chunk-level changes between the stored and the new document version."""
+
+    added: Dict[str, Tuple[str, str]]  # chunk id -> (text, chunk hash)
+    removed: Set[str]
+    unchanged: int
+
+
+@dataclass
+class IngestStats:
+    """Progress and throughput counters for an ingestion run."""
+
+    documents: int = 0
+    skipped: int = 0
+    failed: int = 0
+    chunks: int = 0
+    chunks_embedded: int = 0
+    chunks_removed: int = 0
+    chunks_unchanged: int = 0
+    embedding_batches: int = 0
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    errors: List[Dict[str, str]] = field(default_factory=list)
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        data = asdict(self)
+        data["errors"] = self.errors[-20:]
+        data["elapsed_seconds"] = round(elapsed, 2)
+        data["docs_per_minute"] = round(self.documents / elapsed * 60, 2) if elapsed else 0.0
+        data["chunks_per_second"] = round(self.chunks / elapsed, 2) if elapsed else 0.0
+        return data
+
+
+# ----------------------------------------------------------------------
+# Sources
+# ----------------------------------------------------------------------
+
+
+def _supported(name: str) -> bool:
+    return name.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def iter_sources(path: str) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (source name, raw bytes) for every supported file under ``path``.
+
+    ``path`` may be a directory, a single file, a ``.zip`` or a tar archive
+    (optionally compressed). Files are read one at a time.
+    """
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for filename in sorted(files):
+                if _supported(filename):
+                    full_path = os.path.join(root, filename)
+                    with open(full_path, "rb") as f:
+                        yield os.path.relpath(full_path, path), f.read()
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _supported(info.filename):
+                    yield info.filename, archive.read(info)
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path, mode="r|*") as archive:
+            for member in archive:
+                if member.isfile() and _supported(member.name):
+                    extracted = archive.extractfile(member)
+                    if extracted is not None:
+                        yield member.name, extracted.read()
+    elif os.path.isfile(path) and _supported(path):
+        with open(path, "rb") as f:
+            yield os.path.basename(path), f.read()
+    else:
+        raise ValueError(f"Nothing to ingest at '{path}'")
+
+
+# ----------------------------------------------------------------------
+# Extraction and chunking (runs in worker processes)
+# ----------------------------------------------------------------------
+
+
+def extract_text(source: str, data: bytes) -> str:
+    """Extract plain text from a PDF or text file."""
+    if source.lower().endswith(".pdf"):
+        from pypdf import PdfReader
+
+        reader = PdfReader(io.BytesIO(data))
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+    return data.decode("utf-8", errors="replace")
+
+
+def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
+    """
+    Split text into chunks of at most ``chunk_size`` characters.
+
+    Consecutive chunks share up to ``overlap`` characters. Chunk ends snap
+    back to the last whitespace in the second half of the window (and
+    overlaps start on a word boundary) so words are not cut, which also
+    keeps boundaries stable across small edits.
+    """
+    text = text.replace("\x00", "\ufffd").strip()
+    if not text:
+        return []
+    if overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+    chunks: List[str] = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            split = text.rfind(" ", start + chunk_size // 2, end)
+            if split == -1:
+                split = text.rfind("\n", start + chunk_size // 2, end)
+            if split != -1:
+                end = split
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        next_start = end - overlap
+        if overlap:
+            # Start the overlap on a word boundary as well
+            space = text.find(" ", next_start, end)
+            next_start = space + 1 if space != -1 else next_start
+        start = max(next_start, start + 1)
+    return chunks
+
+
+def process_document(source: str, data: bytes, chunk_size: int, overlap: int) -> ChunkedDocument:
+    """Hash, extract and chunk one document (process-pool entry point)."""
+    content_hash = hashlib.sha256(data).hexdigest()
+    try:
+        chunks = chunk_text(extract_text(source, data), chunk_size, overlap)
+        chunk_hashes = [hashlib.sha256(c.encode("utf-8")).hexdigest() for c in chunks]
+        return ChunkedDocument(source, content_hash, len(data), chunks, chunk_hashes)
+    except Exception as e:
+        return ChunkedDocument(source, content_hash, len(data), [], error=str(e))
+
+
+# ----------------------------------------------------------------------
+# Pipeline
+# ----------------------------------------------------------------------
+
+
+class IngestionPipeline:
+    """
+    Parallel, resumable bulk loader for ``common_knowledge_chunks``.
+
+    Args:
+        workers: Processes used for extraction/chunking
+        embed_batch_size: Texts per embedding request
+        embed_concurrency: Embedding requests in flight
+        force: Re-ingest documents even if their checkpoint matches
+        on_progress: Optional callback receiving the stats after each document
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        embed_batch_size: Optional[int] = None,
+        embed_concurrency: Optional[int] = None,
+        force: bool = False,
+        on_progress: Optional[Callable[[IngestStats], None]] = None,
+    ):
+        self.workers = workers or settings.ingest_workers or os.cpu_count() or 1
+        self.embed_batch_size = embed_batch_size or settings.ingest_embed_batch_size
+        self.embed_concurrency = embed_concurrency or settings.ingest_embed_concurrency
+        self.force = force
+        self.on_progress = on_progress
+        self.stats = IngestStats()
+        self.engine = get_engine()
+        self.vector_db = get_vector_db()
+        self.embedder = get_embedder()
+        self._requests = TokenBucket.per_minute(settings.ingest_embed_requests_per_minute)
+        self._tokens = TokenBucket.per_minute(settings.ingest_embed_tokens_per_minute)
+        self._stats_lock = threading.Lock()
+
+    # -- checkpoints ---------------------------------------------------
+
+    def _ensure_tables(self) -> None:
+        self.vector_db.create()
+        with self.engine.begin() as conn:
+            conn.execute(sql(
+                f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} ("
+                " source TEXT PRIMARY KEY,"
+                " content_id TEXT NOT NULL,"
+                " content_hash TEXT NOT NULL,"
+                " chunks INTEGER NOT NULL DEFAULT 0,"
+                " status TEXT NOT NULL,"
+                " error TEXT,"
+                " updated_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+            ))
+
+    def _completed(self) -> Dict[str, str]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql(
+                f"SELECT source, content_hash FROM {CHECKPOINT_TABLE} WHERE status = 'completed'"
+            ))
+            return {row.source: row.content_hash for row in rows}
+
+    def _checkpoint(
+        self, conn: Connection, doc: ChunkedDocument, status: str, error: Optional[str] = None
+    ) -> None:
+        conn.execute(
+            sql(
+                f"INSERT INTO {CHECKPOINT_TABLE}"
+                " (source, content_id, content_hash, chunks, status, error, updated_at)"
+                " VALUES (:source, :content_id, :content_hash, :chunks, :status, :error, now())"
+                " ON CONFLICT (source) DO UPDATE SET content_id = EXCLUDED.content_id,"
+                " content_hash = EXCLUDED.content_hash, chunks = EXCLUDED.chunks,"
+                " status = EXCLUDED.status, error = EXCLUDED.error, updated_at = now()"
+            ),
+            {
+                "source": doc.source,
+                "content_id": doc.content_id,
+                "content_hash": doc.content_hash,
+                "chunks": len(doc.chunks),
+                "status": status,
+                "error": error,
+            },
+        )
+
+    # -- embedding -----------------------------------------------------
+
+    def _embed_batch(self, texts: List[str]) -> Tuple[List[List[float]], List[Optional[Dict]]]:
+        # ~4 characters per token is close enough for rate limiting
+        self._tokens.acquire(sum(len(t) for t in texts) / 4)
+        self._requests.acquire()
+        embeddings, usages = embed_texts(self.embedder, texts)
+        with self._stats_lock:
+            self.stats.embedding_batches += 1
+        return embeddings, usages
+
+    def _embed(self, texts: List[str], pool: ThreadPoolExecutor) -> List[List[float]]:
+        batches = [
+            texts[i:i + self.embed_batch_size]
+            for i in range(0, len(texts), self.embed_batch_size)
+        ]
+        embeddings: List[List[float]] = []
+        for result in pool.map(self._embed_batch, batches):
+            embeddings.extend(result[0])
+        return embeddings
+
+    # -- writes --------------------------------------------------------
+
+    def _existing_chunk_ids(self, content_ids: List[str]) -> Dict[str, Set[str]]:
+        table = self.vector_db.table
+        existing: Dict[str, Set[str]] = {cid: set() for cid in content_ids}
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                table.select()
+                .with_only_columns(table.c.content_id, table.c.id)
+                .where(table.c.content_id.in_(content_ids))
+            )
+            for row in rows:
+                existing[row.content_id].add(row.id)
+        return existing
+
+    def _chunk_rows(
+        self, doc: ChunkedDocument, diff: ChunkDiff, embeddings: List[List[float]]
+    ) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": chunk_id,
+                "name": doc.source,
+                "meta_data": {"source": doc.source, "chunk_hash": chunk_hash, **classify_source(doc.source)},
+                "filters": {},
+                "content": chunk,
+                "embedding": embedding,
+                "usage": None,
+                # Hash of the document version that introduced the chunk
+                "content_hash": doc.content_hash,
+                "content_id": doc.content_id,
+            }
+            for (chunk_id, (chunk, chunk_hash)), embedding in zip(diff.added.items(), embeddings)
+        ]
+
+    def _write_document(
+        self, doc: ChunkedDocument, diff: ChunkDiff, embeddings: List[List[float]]
+    ) -> None:
+        """Apply a chunk diff and the checkpoint atomically."""
+        table = self.vector_db.table
+        rows = self._chunk_rows(doc, diff, embeddings)
+        batch_size = settings.ingest_insert_batch_size
+        with self.engine.begin() as conn:
+            if diff.removed:
+                conn.execute(table.delete().where(table.c.id.in_(list(diff.removed))))
+            for i in range(0, len(rows), batch_size):
+                conn.execute(
+                    pg_insert(table)
+                    .values(rows[i:i + batch_size])
+                    .on_conflict_do_nothing(index_elements=["id"])
+                )
+            self._checkpoint(conn, doc, "completed")
+        self._register_content(doc)
+
+    def _register_content(self, doc: ChunkedDocument) -> None:
+        """Record the document in common_knowledge_contents for the AgentOS UI."""
+        try:
+            from agno.db.schemas.knowledge import KnowledgeRow
+
+            now = int(time.time())
+            get_contents_db().upsert_knowledge_content(KnowledgeRow(
+                id=doc.content_id,
+                name=doc.source,
+                description="",
+                metadata={"source": doc.source, "content_hash": doc.content_hash},
+                type=os.path.splitext(doc.source)[1].lstrip(".") or "text",
+                size=str(doc.size),
+                status="completed",
+                created_at=now,
+                updated_at=now,
+            ))
+        except Exception as e:
+            logger.warning(f"Could not register '{doc.source}' in contents DB: {e}")
+
+    def _fail(self, doc: ChunkedDocument, error: str) -> None:
+        with self.engine.begin() as conn:
+            self._checkpoint(conn, doc, "failed", error)
+        self.stats.failed += 1
+        self.stats.errors.append({"source": doc.source, "error": error})
+        logger.warning(f"Failed to ingest '{doc.source}': {error}")
+
+    def _flush(self, pending: List[ChunkedDocument], pool: ThreadPoolExecutor) -> None:
+        try:
+            existing = self._existing_chunk_ids([doc.content_id for doc in pending])
+            diffs = [doc.diff(existing[doc.content_id]) for doc in pending]
+            texts = [chunk for diff in diffs for chunk, _ in diff.added.values()]
+            embeddings = self._embed(texts, pool) if texts else []
+        except Exception as e:
+            for doc in pending:
+                self._fail(doc, f"embedding failed: {e}")
+            return
+
+        offset = 0
+        for doc, diff in zip(pending, diffs):
+            doc_embeddings = embeddings[offset:offset + len(diff.added)]
+            offset += len(diff.added)
+            try:
+                self._write_document(doc, diff, doc_embeddings)
+            except Exception as e:
+                self._fail(doc, f"write failed: {e}")
+                continue
+            self.stats.documents += 1
+            self.stats.chunks += len(doc.chunks)
+            self.stats.chunks_embedded += len(diff.added)
+            self.stats.chunks_removed += len(diff.removed)
+            self.stats.chunks_unchanged += diff.unchanged
+            if self.on_progress:
+                self.on_progress(self.stats)
+
+    def ingest_document(self, source: str, data: bytes) -> IngestStats:
+        """
+        Add or incrementally update a single document in-process.
+
+        Args:
+            source: Stable document name (identifies the document across versions)
+            data: Raw file contents
+
+        Returns:
+            Stats including embedded/removed/unchanged chunk counts
+        """
+        self._ensure_tables()
+        doc = process_document(source, data, settings.chunk_size, settings.chunk_overlap)
+        if doc.error:
+            self._fail(doc, doc.error)
+        else:
+            with ThreadPoolExecutor(max_workers=self.embed_concurrency) as embed_pool:
+                self._flush([doc], embed_pool)
+        self.stats.finished_at = time.time()
+        return self.stats
+
+    def run(self, path: str) -> IngestStats:
+        """
+        Ingest every supported document under ``path``.
+
+        Returns:
+            Final stats (also logged with throughput figures)
+        """
+        self._ensure_tables()
+        completed = {} if self.force else self._completed()
+        max_in_flight = self.workers * 2
+        pending: List[ChunkedDocument] = []
+        pending_chunks = 0
+        in_flight: List[Future] = []
+
+        def drain(block_until: int) -> None:
+            nonlocal pending_chunks
+            while len(in_flight) > block_until:
+                doc: ChunkedDocument = in_flight.pop(0).result()
+                if doc.error:
+                    self._fail(doc, doc.error)
+                    continue
+                pending.append(doc)
+                pending_chunks += len(doc.chunks)
+                if pending_chunks >= self.embed_batch_size * self.embed_concurrency:
+                    self._flush(pending, embed_pool)
+                    pending.clear()
+                    pending_chunks = 0
+
+        with ProcessPoolExecutor(max_workers=self.workers) as process_pool, \
+                ThreadPoolExecutor(max_workers=self.embed_concurrency) as embed_pool:
+            for source, data in iter_sources(path):
+                if completed.get(source) == hashlib.sha256(data).hexdigest():
+                    self.stats.skipped += 1
+                    continue
+                in_flight.append(process_pool.submit(
+                    process_document, source, data, settings.chunk_size, settings.chunk_overlap
+                ))
+                drain(max_in_flight)
+            drain(0)
+            if pending:
+                self._flush(pending, embed_pool)
+
+        self.stats.finished_at = time.time()
+        report = self.stats.report()
+        logger.info(
+            f"Ingested {report['documents']} documents ({report['chunks']} chunks, "
+            f"{report['chunks_embedded']} embedded, {report['chunks_removed']} removed, "
+            f"{report['skipped']} skipped, {report['failed']} failed) in "
+            f"{report['elapsed_seconds']}s: {report['docs_per_minute']} docs/min, "
+            f"{report['chunks_per_second']} chunks/s"
+        )
+        return self.stats
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk-ingest documents into the knowledge base")
+    parser.add_argument("path", help="Directory, file, .zip or tar archive")
+    parser.add_argument("--workers", type=int, help="Extraction/chunking processes")
+    parser.add_argument("--batch-size", type=int, help="Texts per embedding request")
+    parser.add_argument("--concurrency", type=int, help="Embedding requests in flight")
+    parser.add_argument("--force", action="store_true", help="Ignore checkpoints")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    pipeline = IngestionPipeline(
+        workers=args.workers,
+        embed_batch_size=args.batch_size,
+        embed_concurrency=args.concurrency,
+        force=args.force,
+    )
+    stats = pipeline.run(args.path)
+    print(json.dumps(stats.report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
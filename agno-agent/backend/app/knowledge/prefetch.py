@@ -0,0 +1,231 @@
+"""Speculative knowledge prefetch for agent runs.
+
+With ``search_knowledge=True`` a turn runs in sequence: the first model
+call decides to search, the query is embedded and searched, then a second
+model call answers. With ``knowledge_prefetch_enabled`` the agents in
+``knowledge_prefetch_agents`` start that retrieval on the user's message as
+soon as the run is accepted:
+
+- ``KnowledgePrefetchMiddleware`` embeds the message while AgentOS loads the
+  session and history (the embedding lands in the embedding cache, which a
+  concurrent identical request joins);
+- the ``start_knowledge_prefetch`` pre-hook runs the retriever's search with
+  the run's filters in the background, during the first model call;
+- a search of the same run is served from the prefetched result when its
+  query matches the message (at least ``knowledge_prefetch_min_overlap`` of
+  its words appear in the message) and its filters are the same.
+
+With ``knowledge_prefetch_inject`` the prefetched chunks are also added to
+the user message as references (Agno's ``add_knowledge_to_context``), so
+the model can answer without calling the search tool.
+
+Every turn records its outcome (hit, miss, unused, error) in
+``knowledge_prefetch_turns_total``, and the retrieval time that overlapped
+other work in ``knowledge_prefetch_saved_seconds`` and the run metadata.
+"""
+import asyncio
+import copy
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from agno.knowledge.document import Document
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.asgi import match_run, parse_form, read_body, replay_body
+from app.core.config import settings
+from app.core.embedding_cache import normalize_text
+from app.core.knowledge_base import get_embedder
+from app.core.metrics import KNOWLEDGE_PREFETCH_SAVED, KNOWLEDGE_PREFETCH_TURNS
+from app.knowledge.scope import scoped_filters
+
+logger = logging.getLogger(__name__)
+
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="knowledge-prefetch")
+_WORD = re.compile(r"\w+")
+# Prefetches of runs that never reached their post-hook are dropped after this
+_MAX_AGE = 300.0
+
+
+@dataclass
+class Prefetch:
+    """Background retrieval for one run."""
+
+    agent_id: str
+    query: str
+    filters: str  # Canonical form of the search filters
+    top_k: int
+    future: Optional["Future[List[Document]]"] = None
+    started: float = field(default_factory=time.perf_counter)
+    duration: Optional[float] = None  # Seconds the search took, once done
+    hits: int = 0
+    misses: int = 0
+    saved: float = 0.0  # Retrieval seconds not spent in the run
+
+
+_prefetches: Dict[str, Prefetch] = {}
+_lock = threading.Lock()
+
+
+def _filters_key(filters: Any) -> str:
+    return json.dumps(filters, sort_keys=True, default=str)
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORD.findall(normalize_text(text).lower()))
+
+
+def query_matches(query: str, message: str) -> bool:
+    """Whether a search query was (mostly) taken from the user's message."""
+    words = _words(query)
+    if not words:
+        return False
+    return len(words & _words(message)) / len(words) >= settings.knowledge_prefetch_min_overlap
+
+
+def injects_prefetched(agent_id: str) -> bool:
+    """Whether an agent gets the prefetched chunks in its prompt (``add_knowledge_to_context``)."""
+    return (
+        settings.knowledge_prefetch_enabled
+        and settings.knowledge_prefetch_inject
+        and agent_id in settings.knowledge_prefetch_agents
+    )
+
+
+def _search(prefetch: Prefetch, retriever: Any, filters: Any) -> List[Document]:
+    try:
+        return retriever.search(prefetch.query, top_k=prefetch.top_k, filters=filters)
+    finally:
+        prefetch.duration = time.perf_counter() - prefetch.started
+
+
+def start_knowledge_prefetch(run_input: Any = None, agent: Any = None, run_context: Any = None) -> None:
+    """Agent pre-hook starting retrieval for the user's message in the background."""
+    if not settings.knowledge_prefetch_enabled or run_context is None or run_input is None:
+        return
+    agent_id = getattr(agent, "id", None)
+    retriever = getattr(agent, "knowledge_retriever", None)
+    if agent_id not in settings.knowledge_prefetch_agents or not hasattr(retriever, "search"):
+        return
+    message = run_input.input_content_string()
+    if not message.strip():
+        return
+
+    filters = scoped_filters(run_context.knowledge_filters, run_context.session_state)
+    prefetch = Prefetch(
+        agent_id=agent_id,
+        query=message,
+        filters=_filters_key(filters),
+        top_k=retriever.config.top_k,
+    )
+    # Copy the context so the search's stages are labelled with the agent
+    prefetch.future = _pool.submit(copy_context().run, _search, prefetch, retriever, filters)
+    now = time.perf_counter()
+    with _lock:
+        for run_id in [r for r, p in _prefetches.items() if now - p.started > _MAX_AGE]:
+            _prefetches.pop(run_id).future.cancel()
+        _prefetches[run_context.run_id] = prefetch
+
+
+async def take_prefetched(
+    run_context: Any, query: str, top_k: int, filters: Any
+) -> Optional[List[Document]]:
+    """
+    Documents of the run's prefetched retrieval for a matching search.
+
+    Awaits the prefetch when it is still running (it started earlier
+    than this search would).
+
+    Returns:
+        Copies of the top ``top_k`` documents, or None when the search has
+        to run itself
+    """
+    run_id = getattr(run_context, "run_id", None)
+    with _lock:
+        prefetch = _prefetches.get(run_id) if run_id else None
+    if prefetch is None:
+        return None
+    if top_k > prefetch.top_k or _filters_key(filters) != prefetch.filters or not query_matches(query, prefetch.query):
+        prefetch.misses += 1
+        return None
+    waiting = time.perf_counter()
+    try:
+        documents = await asyncio.wrap_future(prefetch.future)
+    except Exception as e:
+        logger.warning(f"Knowledge prefetch failed, searching again: {e}")
+        return None
+    prefetch.hits += 1
+    prefetch.saved += max(0.0, (prefetch.duration or 0.0) - (time.perf_counter() - waiting))
+    return [copy.copy(doc) for doc in documents[:top_k]]
+
+
+def finish_knowledge_prefetch(run_output: Any = None, run_context: Any = None) -> None:
+    """Agent post-hook recording what the run's prefetch saved."""
+    run_id = getattr(run_context, "run_id", None)
+    with _lock:
+        prefetch = _prefetches.pop(run_id, None) if run_id else None
+    if prefetch is None:
+        return
+    failed = prefetch.future.done() and not prefetch.future.cancelled() and prefetch.future.exception() is not None
+    if prefetch.hits:
+        outcome = "hit"
+    elif failed:
+        outcome = "error"
+    elif prefetch.misses:
+        outcome = "miss"
+    else:
+        outcome = "unused"
+    prefetch.future.cancel()
+
+    KNOWLEDGE_PREFETCH_TURNS.labels(prefetch.agent_id, outcome).inc()
+    if prefetch.hits:
+        KNOWLEDGE_PREFETCH_SAVED.labels(prefetch.agent_id).observe(prefetch.saved)
+    if run_output is not None:
+        if run_output.metadata is None:
+            run_output.metadata = {}
+        run_output.metadata["knowledge_prefetch"] = {
+            "outcome": outcome,
+            "search_ms": round(prefetch.duration * 1000, 1) if prefetch.duration is not None else None,
+            "saved_ms": round(prefetch.saved * 1000, 1),
+        }
+
+
+def _embed(message: str) -> None:
+    try:
+        get_embedder().get_embedding(message)
+    except Exception as e:
+        logger.warning(f"Knowledge prefetch embedding failed: {e}")
+
+
+class KnowledgePrefetchMiddleware:
+    """
+    ASGI middleware embedding the message of an accepted run.
+
+    Runs for ``POST /agents/{agent_id}/runs`` of the configured agents; the
+    embedding overlaps AgentOS' session and history loading, so the
+    prefetch search started by the pre-hook finds it cached.
+    """
+
+    def __init__(self, app: ASGIApp, agent_ids: List[str]):
+        self.app = app
+        self.agent_ids = set(agent_ids)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        agent_id = match_run(scope)
+        if agent_id not in self.agent_ids:
+            await self.app(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        form = await parse_form(scope, body)
+        message = form.get("message")
+        if isinstance(message, str) and message.strip():
+            # Copy the context so the embedding stage is labelled with the agent
+            asyncio.get_running_loop().run_in_executor(_pool, copy_context().run, _embed, message)
+        await self.app(scope, replay_body(body, receive), send)
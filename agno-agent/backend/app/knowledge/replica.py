@@ -0,0 +1,697 @@
+"""In-process replica of the knowledge vectors for exact vector search.
+
+``common_knowledge_chunks`` is small enough to keep in RAM, so every worker
+can answer vector searches itself instead of sending them to Postgres:
+
+- a snapshot of the table (unit-normalized embeddings as one contiguous
+  float32 or float16 matrix, plus the row payloads) is written to
+  ``knowledge_replica_dir`` and memory-mapped, so the workers of a server
+  share one copy of the matrix through the page cache;
+- a search is one matrix product over all chunks (exact cosine ranking,
+  several queries at once for ``search_embeddings``);
+- a trigger on the table NOTIFYs ``knowledge_chunks`` with the id of every
+  changed row. A listener thread per worker applies the changes on top of
+  the snapshot and writes a new snapshot once ``knowledge_replica_max_delta``
+  changes have piled up (one worker builds it, the others load it).
+
+``ServingPgVector.vector_search`` uses the replica when it is in sync
+and falls back to pgvector when it is not: before the first sync, when the
+listener has not confirmed the connection for ``knowledge_replica_max_lag``
+seconds, when the matrix would exceed ``knowledge_replica_max_bytes``, and
+for searches with metadata filters other than the region/service scope.
+
+Usage:
+    python -m app.knowledge.replica status
+    python -m app.knowledge.replica build
+    python -m app.knowledge.replica report --queries heldout.txt --k 10
+"""
+import argparse
+import dataclasses
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import psycopg
+from agno.knowledge.document import Document
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector import PgVector
+from agno.vectordb.score import normalize_score, score_to_distance_threshold
+from sqlalchemy import inspect, null, select
+from sqlalchemy import text as sql
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.core.database import to_vector_literal
+from app.core.metrics import KNOWLEDGE_REPLICA_SEARCHES
+from app.knowledge.index import SCHEMA, TABLE, _load_queries, _percentile, _top_k
+from app.knowledge.scope import ALL, scope_filter_values
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "knowledge_chunks"
+# Notification payload for TRUNCATE (every row is gone)
+_TRUNCATED = "*"
+# Seconds the listener waits for notifications before confirming the connection
+_POLL_INTERVAL = 0.5
+# Notifications applied per batch
+_BATCH = 500
+# float16 matrices are converted to float32 this many rows at a time
+_BLOCK_ROWS = 8192
+
+_replicas: Dict[str, "VectorReplica"] = {}
+_replicas_lock = threading.Lock()
+
+
+class ReplicaTooLarge(Exception):
+    """The chunk matrix would exceed ``knowledge_replica_max_bytes``."""
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _visible(owners: np.ndarray, user_id: Optional[str]) -> np.ndarray:
+    # Same scope as PgVector: the user's rows plus shared (user_id IS NULL) rows
+    return (owners == user_id) | np.equal(owners, None)
+
+
+def _metadata_column(rows: Sequence[Dict[str, Any]], key: str) -> np.ndarray:
+    return np.array([(row["meta_data"] or {}).get(key) or ALL for row in rows], dtype=object)
+
+
+@dataclass
+class _State:
+    """
+    Searchable view of the table.
+
+    States are never modified: the listener builds a new one per batch of
+    changes and swaps it in, so searches need no lock.
+    """
+
+    matrix: np.ndarray  # (rows, dims) snapshot, normalized, memory-mapped
+    rows: List[Dict[str, Any]]
+    owners: np.ndarray  # user_id per snapshot row (object array)
+    alive: np.ndarray  # False for snapshot rows changed or deleted since
+    index: Dict[str, int]  # Snapshot row position by chunk id
+    signature: Optional[str]  # Table signature of the snapshot (None once changed)
+    built_at: float
+    # Rows inserted or updated since the snapshot, by chunk id
+    changes: Dict[str, Tuple[Dict[str, Any], np.ndarray]] = field(default_factory=dict)
+    change_matrix: Optional[np.ndarray] = None
+    change_rows: List[Dict[str, Any]] = field(default_factory=list)
+    change_owners: Optional[np.ndarray] = None
+    # Metadata values per snapshot row, by key (filled on first scoped search)
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.change_rows = [row for row, _ in self.changes.values()]
+        dims = self.matrix.shape[1]
+        self.change_matrix = (
+            np.stack([vector for _, vector in self.changes.values()])
+            if self.changes else np.empty((0, dims), dtype=np.float32)
+        )
+        self.change_owners = np.array([row["user_id"] for row in self.change_rows], dtype=object)
+
+    @property
+    def size(self) -> int:
+        return int(self.alive.sum()) + len(self.changes)
+
+    def apply(self, upserts: Dict[str, Tuple[Dict[str, Any], np.ndarray]], removed: Set[str]) -> "_State":
+        """New state with rows upserted and removed."""
+        alive = self.alive.copy()
+        changes = dict(self.changes)
+        for chunk_id in set(upserts) | removed:
+            position = self.index.get(chunk_id)
+            if position is not None:
+                alive[position] = False
+            changes.pop(chunk_id, None)
+        changes.update(upserts)
+        return _State(
+            matrix=self.matrix,
+            rows=self.rows,
+            owners=self.owners,
+            alive=alive,
+            index=self.index,
+            signature=None,
+            built_at=self.built_at,
+            changes=changes,
+            columns=self.columns,
+        )
+
+    def column(self, key: str) -> np.ndarray:
+        """Metadata value of every snapshot row (untagged rows count as "all")."""
+        values = self.columns.get(key)
+        if values is None:
+            values = self.columns[key] = _metadata_column(self.rows, key)
+        return values
+
+    def scores(
+        self,
+        queries: np.ndarray,
+        user_id: Optional[str],
+        scope: Optional[Dict[str, List[str]]] = None,
+    ) -> np.ndarray:
+        """Cosine similarity of every row to every query, (rows + changes, queries)."""
+        transposed = np.ascontiguousarray(queries.T, dtype=np.float32)
+        if self.matrix.dtype == np.float32:
+            base = self.matrix @ transposed
+        else:
+            # No BLAS for float16: convert block by block
+            base = np.empty((len(self.matrix), len(queries)), dtype=np.float32)
+            for start in range(0, len(self.matrix), _BLOCK_ROWS):
+                block = self.matrix[start:start + _BLOCK_ROWS]
+                base[start:start + len(block)] = block.astype(np.float32) @ transposed
+        base[~self.alive] = -np.inf
+        changed = self.change_matrix @ transposed
+        if user_id is not None:
+            base[~_visible(self.owners, user_id)] = -np.inf
+            changed[~_visible(self.change_owners, user_id)] = -np.inf
+        for key, allowed in (scope or {}).items():
+            base[~np.isin(self.column(key), allowed)] = -np.inf
+            changed[~np.isin(_metadata_column(self.change_rows, key), allowed)] = -np.inf
+        return np.concatenate([base, changed])
+
+    def row(self, position: int) -> Dict[str, Any]:
+        if position < len(self.rows):
+            return self.rows[position]
+        return self.change_rows[position - len(self.rows)]
+
+
+class VectorReplica:
+    """
+    In-memory copy of a PgVector table answering exact vector searches.
+
+    Args:
+        vector_db: Store the replica mirrors (table, embedder, distance)
+        engine: Engine for snapshot builds and change lookups
+    """
+
+    def __init__(self, vector_db: PgVector, engine: Engine):
+        self.vector_db = vector_db
+        self.engine = engine
+        self.dtype = np.dtype(settings.knowledge_replica_dtype)
+        self.status = "unloaded"
+        self.hits = 0
+        self.fallbacks = 0
+        self._state: Optional[_State] = None
+        self._heartbeat = 0.0
+        self._has_owner: Optional[bool] = None
+        self._trigger_ready = False
+        self._listener: Optional[threading.Thread] = None
+        self._listener_pid = 0
+        self._stop = threading.Event()
+        if vector_db.distance != Distance.cosine:
+            self.status = "unsupported"
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _unusable(self, filters: Any) -> Optional[str]:
+        if self.status in ("unsupported", "too_large"):
+            return self.status
+        if self._state is None:
+            return "unloaded"
+        if time.monotonic() - self._heartbeat > settings.knowledge_replica_max_lag:
+            return "stale"
+        if filters and scope_filter_values(filters) is None:
+            return "filters"
+        return None
+
+    def search_embeddings(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        limit: int,
+        user_id: Optional[str] = None,
+        scope: Optional[Dict[str, List[str]]] = None,
+    ) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """
+        Exact top-``limit`` rows for a batch of query embeddings.
+
+        Args:
+            embeddings: Query embeddings, one per row
+            limit: Rows per query
+            user_id: Restrict to the user's rows plus shared rows
+            scope: Allowed region/service values (see ``app.knowledge.scope``)
+
+        Returns:
+            (row, cosine similarity) pairs per query, best first
+        """
+        state = self._state
+        if state is None:
+            raise RuntimeError("Knowledge replica is not loaded")
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+        scores = state.scores(queries, user_id, scope)
+        threshold = None
+        if self.vector_db.similarity_threshold is not None:
+            threshold = 1.0 - score_to_distance_threshold(self.vector_db.similarity_threshold, Distance.cosine)
+
+        results = []
+        for column in scores.T:
+            k = min(limit, len(column))
+            top = np.argpartition(-column, k - 1)[:k] if k else np.empty(0, dtype=int)
+            top = top[np.argsort(-column[top], kind="stable")]
+            results.append([
+                (state.row(int(position)), float(column[position]))
+                for position in top
+                if np.isfinite(column[position]) and (threshold is None or column[position] >= threshold)
+            ])
+        return results
+
+    def vector_search(
+        self,
+        query: str,
+        limit: int = 5,
+        filters: Any = None,
+        user_id: Optional[str] = None,
+    ) -> Optional[List[Document]]:
+        """
+        Vector search against the replica.
+
+        Returns:
+            Documents ranked like ``PgVector.vector_search``, or None when
+            the replica cannot answer and pgvector has to
+        """
+        reason = self._unusable(filters)
+        if reason is not None:
+            self.fallbacks += 1
+            KNOWLEDGE_REPLICA_SEARCHES.labels(reason).inc()
+            return None
+        embedding = self.vector_db.embedder.get_embedding(query)
+        if not embedding:
+            logger.error(f"Error getting embedding for Query: {query}")
+            return []
+        self.hits += 1
+        KNOWLEDGE_REPLICA_SEARCHES.labels("hit").inc()
+        documents = []
+        scope = scope_filter_values(filters) if filters else None
+        for row, similarity in self.search_embeddings([embedding], limit, user_id, scope)[0]:
+            meta_data = dict(row["meta_data"] or {})
+            meta_data["similarity_score"] = normalize_score(1.0 - similarity, Distance.cosine)
+            documents.append(Document(
+                id=row["id"],
+                name=row["name"],
+                meta_data=meta_data,
+                content=row["content"],
+                embedder=self.vector_db.embedder,
+                usage=row["usage"],
+            ))
+        return documents
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(settings.knowledge_replica_dir, f"{self.vector_db.table_name}{suffix}")
+
+    def _current_generation(self) -> Optional[str]:
+        try:
+            with open(self._path(".current"), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _read_header(self, generation: str) -> Dict[str, Any]:
+        with open(self._path(f"-{generation}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def load(self) -> bool:
+        """
+        Memory-map the current snapshot, without touching the database.
+
+        Returns:
+            Whether a snapshot was found
+        """
+        generation = self._current_generation()
+        if generation is None:
+            return False
+        snapshot = self._read_header(generation)
+        matrix = np.load(self._path(f"-{generation}.npy"), mmap_mode="r")
+        rows = snapshot["rows"]
+        self._state = _State(
+            matrix=matrix,
+            rows=rows,
+            owners=np.array([row["user_id"] for row in rows], dtype=object),
+            alive=np.ones(len(rows), dtype=bool),
+            index={row["id"]: position for position, row in enumerate(rows)},
+            signature=snapshot["signature"],
+            built_at=snapshot["built_at"],
+        )
+        if self.status != "unsupported":
+            self.status = "loaded"
+        logger.info(f"Loaded knowledge replica {generation}: {len(rows)} rows, {matrix.dtype}")
+        return True
+
+    def _columns(self, conn: Connection) -> list:
+        table = self.vector_db.table
+        if self._has_owner is None:
+            columns = inspect(conn).get_columns(table.name, schema=table.schema)
+            self._has_owner = any(column["name"] == "user_id" for column in columns)
+        owner = table.c.user_id if self._has_owner else null().label("user_id")
+        return [table.c.id, table.c.name, table.c.meta_data, table.c.content, table.c.usage, owner, table.c.embedding]
+
+    @staticmethod
+    def _row(result: Any) -> Tuple[Dict[str, Any], np.ndarray]:
+        row = {
+            "id": result.id,
+            "name": result.name,
+            "meta_data": result.meta_data,
+            "content": result.content,
+            "usage": result.usage,
+            "user_id": result.user_id,
+        }
+        return row, np.asarray(result.embedding, dtype=np.float32)
+
+    def _signature(self, conn: Connection) -> Tuple[str, int]:
+        table = self.vector_db.table
+        row = conn.execute(sql(
+            "SELECT md5(coalesce(string_agg(id || ':' || md5(coalesce(content, '') || coalesce(meta_data::text, '')),"
+            " ',' ORDER BY id), '')) AS signature,"
+            " count(*) FILTER (WHERE embedding IS NOT NULL) AS vectors"
+            f" FROM {table.schema}.{table.name}"
+        )).one()
+        return row.signature, row.vectors
+
+    def build(self) -> Dict[str, Any]:
+        """
+        Write a new snapshot of the table and make it current.
+
+        The table is read in one repeatable-read transaction, straight into
+        a memory-mapped file, so the process never holds a second copy.
+
+        Raises:
+            ReplicaTooLarge: The matrix would exceed ``knowledge_replica_max_bytes``
+        """
+        os.makedirs(settings.knowledge_replica_dir, exist_ok=True)
+        dims = self.vector_db.dimensions
+        started = time.perf_counter()
+        with self.engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+            signature, count = self._signature(conn)
+            nbytes = count * dims * self.dtype.itemsize
+            if nbytes > settings.knowledge_replica_max_bytes:
+                raise ReplicaTooLarge(
+                    f"{count} x {dims} {self.dtype} vectors need {nbytes} bytes"
+                    f" (knowledge_replica_max_bytes={settings.knowledge_replica_max_bytes})"
+                )
+            generation = f"{int(time.time())}-{signature[:12]}"
+            matrix_path = self._path(f"-{generation}.npy")
+            matrix = np.lib.format.open_memmap(matrix_path + ".tmp", mode="w+", dtype=self.dtype, shape=(count, dims))
+            table = self.vector_db.table
+            rows: List[Dict[str, Any]] = []
+            results = conn.execution_options(stream_results=True, yield_per=1000).execute(
+                select(*self._columns(conn)).where(table.c.embedding.is_not(None)).order_by(table.c.id)
+            )
+            for position, result in enumerate(results):
+                row, vector = self._row(result)
+                matrix[position] = _normalize(vector)
+                rows.append(row)
+            matrix.flush()
+            del matrix
+        os.replace(matrix_path + ".tmp", matrix_path)
+        header_path = self._path(f"-{generation}.json")
+        with open(header_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"signature": signature, "built_at": time.time(), "rows": rows}, f, default=str)
+        os.replace(header_path + ".tmp", header_path)
+        with open(self._path(".current.tmp"), "w", encoding="utf-8") as f:
+            f.write(generation)
+        os.replace(self._path(".current.tmp"), self._path(".current"))
+        self._remove_old_generations(generation)
+        seconds = time.perf_counter() - started
+        logger.info(f"Built knowledge replica {generation}: {count} rows in {seconds:.1f}s")
+        return {"generation": generation, "rows": count, "bytes": nbytes, "seconds": round(seconds, 2)}
+
+    def _remove_old_generations(self, current: str) -> None:
+        # Workers still mapping an old generation keep reading the unlinked file
+        prefix = f"{self.vector_db.table_name}-"
+        for name in os.listdir(settings.knowledge_replica_dir):
+            if name.startswith(prefix) and not name.startswith(f"{prefix}{current}."):
+                with suppress(OSError):
+                    os.remove(os.path.join(settings.knowledge_replica_dir, name))
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the snapshot lock shared by all processes on this host."""
+        os.makedirs(settings.knowledge_replica_dir, exist_ok=True)
+        with open(self._path(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def refresh(self) -> None:
+        """
+        Bring the replica level with the table: load the current snapshot if
+        it matches, otherwise build a new one. One process at a time builds.
+        """
+        with self.locked():
+            with self.engine.connect() as conn:
+                signature, _ = self._signature(conn)
+            state = self._state
+            if state is not None and state.signature == signature:
+                return
+            generation = self._current_generation()
+            if generation is None or self._read_header(generation)["signature"] != signature:
+                self.build()
+            self.load()
+
+    # ------------------------------------------------------------------
+    # Change feed
+    # ------------------------------------------------------------------
+
+    def has_trigger(self) -> bool:
+        """Whether the NOTIFY trigger of migration 0008 is on the table."""
+        if not self._trigger_ready:
+            table = f"{self.vector_db.table.schema}.{self.vector_db.table_name}"
+            with self.engine.connect() as conn:
+                self._trigger_ready = conn.execute(
+                    sql(
+                        "SELECT 1 FROM pg_trigger WHERE tgrelid = to_regclass(:table)"
+                        " AND tgname = :name AND NOT tgisinternal"
+                    ),
+                    {"table": table, "name": f"{self.vector_db.table_name}_notify"},
+                ).first() is not None
+        return self._trigger_ready
+
+    def apply(self, chunk_ids: Iterable[str]) -> None:
+        """Apply notified changes: re-read the rows, drop the ones that are gone."""
+        chunk_ids = set(chunk_ids)
+        state = self._state
+        if (
+            state is None
+            or _TRUNCATED in chunk_ids
+            or len(state.changes) + len(chunk_ids) > settings.knowledge_replica_max_delta
+        ):
+            self.refresh()
+            return
+        table = self.vector_db.table
+        with self.engine.connect() as conn:
+            results = conn.execute(
+                select(*self._columns(conn))
+                .where(table.c.id.in_(list(chunk_ids)), table.c.embedding.is_not(None))
+            )
+            upserts = {}
+            for result in results:
+                row, vector = self._row(result)
+                upserts[row["id"]] = (row, _normalize(vector))
+        self._state = state.apply(upserts, chunk_ids - set(upserts))
+
+    def _conninfo(self) -> str:
+        return self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    def _listen(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                if not self.has_trigger():
+                    # Without the change feed the replica could not stay in sync
+                    if self.status != "no_trigger":
+                        logger.warning("Knowledge replica needs migration 0008 (NOTIFY trigger), searching pgvector")
+                    self.status = "no_trigger"
+                    self._stop.wait(30.0)
+                    continue
+                with psycopg.connect(self._conninfo(), autocommit=True) as conn:
+                    # Listen first: changes made while syncing are notified
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    self.refresh()
+                    self.status = "listening"
+                    self._heartbeat = time.monotonic()
+                    backoff = 1.0
+                    while not self._stop.is_set():
+                        chunk_ids = {
+                            notify.payload
+                            for notify in conn.notifies(timeout=_POLL_INTERVAL, stop_after=_BATCH)
+                        }
+                        if chunk_ids:
+                            self.apply(chunk_ids)
+                        # Confirms the connection (and so that nothing was missed)
+                        conn.execute("SELECT 1")
+                        self._heartbeat = time.monotonic()
+            except ReplicaTooLarge as e:
+                self.status = "too_large"
+                logger.warning(f"Knowledge replica disabled, searching pgvector: {e}")
+                return
+            except Exception as e:
+                self.status = "reconnecting"
+                # Changes may be missed until the next sync checks the table
+                if self._state is not None:
+                    self._state = dataclasses.replace(self._state, signature=None)
+                logger.warning(f"Knowledge replica listener failed, retrying in {backoff:.0f}s: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def start(self) -> None:
+        """Start the change listener (again, in a forked worker)."""
+        if self.status in ("unsupported", "too_large"):
+            return
+        if self._listener is not None and self._listener.is_alive() and self._listener_pid == os.getpid():
+            return
+        self._stop.clear()
+        self._listener_pid = os.getpid()
+        self._listener = threading.Thread(target=self._listen, name="knowledge-replica", daemon=True)
+        self._listener.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._listener is not None and self._listener_pid == os.getpid():
+            self._listener.join(timeout=_POLL_INTERVAL * 4)
+        self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "status": self.status,
+            "rows": state.size if state is not None else 0,
+            "changes_since_snapshot": len(state.changes) if state is not None else 0,
+            "dtype": str(self.dtype),
+            "bytes": state.matrix.nbytes if state is not None else 0,
+            "snapshot_age_seconds": round(time.time() - state.built_at, 1) if state is not None else None,
+            "lag_seconds": round(time.monotonic() - self._heartbeat, 1) if self._heartbeat else None,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def get_vector_replica(vector_db: PgVector) -> VectorReplica:
+    """Get or create the replica of a vector store (one per table and database)."""
+    key = f"{vector_db.db_url or vector_db.db_engine.url}/{vector_db.table_name}"
+    with _replicas_lock:
+        if key not in _replicas:
+            _replicas[key] = VectorReplica(vector_db, vector_db.db_engine)
+        return _replicas[key]
+
+
+def start_replicas() -> None:
+    """Start the change listeners of every replica (in this worker)."""
+    for replica in list(_replicas.values()):
+        replica.start()
+
+
+def stop_replicas() -> None:
+    for replica in list(_replicas.values()):
+        replica.stop()
+
+
+def get_replica_stats() -> Dict[str, Dict[str, Any]]:
+    return {key: replica.stats() for key, replica in _replicas.items()}
+
+
+def _get_replica() -> VectorReplica:
+    # Imported here: knowledge_base attaches replicas to its vector stores
+    from app.core.knowledge_base import get_vector_db
+
+    return get_vector_replica(get_vector_db())
+
+
+def replica_report(queries: Sequence[str], k: int = 10) -> Dict[str, Any]:
+    """
+    Compare replica searches with exact and ANN pgvector searches.
+
+    Args:
+        queries: Held-out query texts
+        k: Number of neighbours compared
+
+    Returns:
+        recall@k of the replica against exact search, and latencies
+    """
+    replica = _get_replica()
+    replica.refresh()
+    embeddings = [replica.vector_db.embedder.get_embedding(q) for q in queries]
+
+    replica_ms: List[float] = []
+    found: List[List[str]] = []
+    for embedding in embeddings:
+        started = time.perf_counter()
+        hits = replica.search_embeddings([embedding], k)[0]
+        replica_ms.append((time.perf_counter() - started) * 1000)
+        found.append([row["id"] for row, _ in hits])
+    started = time.perf_counter()
+    replica.search_embeddings(embeddings, k)
+    batch_ms = (time.perf_counter() - started) * 1000
+
+    exact_ms: List[float] = []
+    ann_ms: List[float] = []
+    recalls: List[float] = []
+    with replica.engine.connect() as conn:
+        for embedding, ids in zip(embeddings, found):
+            vector = to_vector_literal(embedding)
+            with conn.begin():
+                started = time.perf_counter()
+                _top_k(conn, vector, k)
+                ann_ms.append((time.perf_counter() - started) * 1000)
+            with conn.begin():
+                conn.execute(sql("SET LOCAL enable_indexscan = off"))
+                started = time.perf_counter()
+                truth = _top_k(conn, vector, k)
+                exact_ms.append((time.perf_counter() - started) * 1000)
+            if truth:
+                recalls.append(len(set(ids) & set(truth)) / len(truth))
+
+    return {
+        "replica": replica.stats(),
+        "queries": len(queries),
+        "k": k,
+        f"recall@{k}": round(sum(recalls) / len(recalls), 4) if recalls else None,
+        "replica_p50_ms": round(_percentile(replica_ms, 50), 3),
+        "replica_p95_ms": round(_percentile(replica_ms, 95), 3),
+        "replica_batch_ms": round(batch_ms, 3),
+        "pgvector_ann_p50_ms": round(_percentile(ann_ms, 50), 2),
+        "pgvector_exact_p50_ms": round(_percentile(exact_ms, 50), 2),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the in-process knowledge replica")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Show the current snapshot")
+    sub.add_parser("build", help="Write a new snapshot of the chunks table")
+    report = sub.add_parser("report", help="Replica vs pgvector recall and latency")
+    report.add_argument("--queries", required=True, help="Text (one per line) or JSONL file")
+    report.add_argument("--k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    replica = _get_replica()
+    if args.command == "status":
+        replica.load()
+        result = {"table": f"{SCHEMA}.{TABLE}", "generation": replica._current_generation(), **replica.stats()}
+    elif args.command == "build":
+        with replica.locked():
+            result = replica.build()
+        result["trigger"] = replica.has_trigger()
+    else:
+        result = replica_report(_load_queries(args.queries), k=args.k)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Hybrid lexical + vector retrieval over the shared knowledge base.
+
+Vector (pgvector) and full-text (tsvector/GIN) candidate lists are fused
+with reciprocal-rank fusion and optionally re-ranked by a small local
+cross-encoder. ``candidates`` is the pool size fetched from each source
+and ``top_k`` is what finally goes into the prompt, further capped at
+``max_tokens`` of chunk text.
+
+Retrievers are plugged into agents through ``Agent(knowledge_retriever=...)``
+and are configured per agent id (see ``get_retrieval_config``). Agent
+searches are scoped to the region/service of the conversation once it is
+known (see ``app.knowledge.scope``).
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from agno.knowledge.document import Document
+from agno.vectordb.pgvector import PgVector
+
+from app.core.config import settings
+from app.core.context_budget import fit_documents, record_saved
+from app.core.knowledge_base import get_vector_db
+from app.core.metrics import stage
+from app.knowledge.prefetch import take_prefetched
+from app.knowledge.scope import scoped_filters
+
+logger = logging.getLogger(__name__)
+
+# Vector and keyword searches for one query run side by side
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="knowledge-search")
+
+
+@dataclass
+class RetrievalConfig:
+    """Per-agent retrieval settings."""
+
+    mode: str = "hybrid"  # "vector", "keyword" or "hybrid"
+    candidates: int = 30
+    top_k: int = 5
+    rerank: bool = False
+    rrf_k: int = 60
+    max_tokens: int = 0  # Chunk text budget per search (0 = top_k only)
+
+
+def get_retrieval_config(agent_id: Optional[str] = None) -> RetrievalConfig:
+    """
+    Resolve retrieval settings for an agent.
+
+    Defaults come from ``knowledge_search_*`` settings and can be
+    overridden per agent via ``knowledge_search_overrides``
+    (e.g. ``{"general-assistant": {"mode": "vector", "top_k": 3}}``).
+    """
+    config = RetrievalConfig(
+        mode=settings.knowledge_search_mode,
+        candidates=settings.knowledge_search_candidates,
+        top_k=settings.knowledge_search_top_k,
+        rerank=settings.knowledge_search_rerank,
+        max_tokens=settings.knowledge_search_max_tokens,
+    )
+    for key, value in settings.knowledge_search_overrides.get(agent_id or "", {}).items():
+        setattr(config, key, value)
+    return config
+
+
+class CrossEncoderReranker:
+    """Local CPU cross-encoder (sentence-transformers), loaded on first use."""
+
+    def __init__(self, model: str, max_length: int = 512):
+        self.model_name = model
+        self.max_length = max_length
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import CrossEncoder
+                    except ImportError:
+                        raise ImportError(
+                            "`sentence-transformers` not installed. "
+                            "Please install using `pip install backend[rerank]`"
+                        )
+                    self._model = CrossEncoder(
+                        self.model_name, max_length=self.max_length, device="cpu"
+                    )
+        return self._model
+
+    def rerank(self, query: str, documents: List[Document], top_k: int) -> List[Document]:
+        """Score (query, chunk) pairs and return the best ``top_k`` documents."""
+        if not documents:
+            return documents
+        scores = self._load().predict([(query, doc.content) for doc in documents])
+        ranked = sorted(zip(documents, scores), key=lambda pair: float(pair[1]), reverse=True)
+        for doc, score in ranked:
+            doc.reranking_score = float(score)
+        return [doc for doc, _ in ranked[:top_k]]
+
+
+# Singleton reranker instance
+_reranker_instance: Optional[CrossEncoderReranker] = None
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """Get or create the shared cross-encoder reranker."""
+    global _reranker_instance
+    if _reranker_instance is None:
+        _reranker_instance = CrossEncoderReranker(settings.knowledge_reranker_model)
+    return _reranker_instance
+
+
+def _doc_key(doc: Document) -> str:
+    return doc.id or hashlib.md5(doc.content.encode("utf-8")).hexdigest()
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Document]], rrf_k: int = 60
+) -> List[Document]:
+    """
+    Fuse ranked result lists with reciprocal-rank fusion.
+
+    Each document scores ``sum(1 / (rrf_k + rank))`` over the lists it
+    appears in; duplicates are merged by document id.
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever:
+    """
+    Knowledge retriever combining full-text and vector search.
+
+    Instances are async callables with the ``knowledge_retriever`` signature
+    expected by Agno agents; the blocking embedding, searches and re-ranking
+    run in a worker thread so they don't hold up the event loop.
+    """
+
+    def __init__(
+        self,
+        vector_db: PgVector,
+        config: RetrievalConfig,
+        reranker: Optional[CrossEncoderReranker] = None,
+        agent_id: Optional[str] = None,
+    ):
+        self.vector_db = vector_db
+        self.config = config
+        self.reranker = reranker
+        self.agent_id = agent_id
+
+    def _vector(self, query: str, limit: int, filters: Optional[Dict[str, Any]]) -> List[Document]:
+        with stage("vector_search"):
+            return self.vector_db.vector_search(query=query, limit=limit, filters=filters)
+
+    def _keyword(self, query: str, limit: int, filters: Optional[Dict[str, Any]]) -> List[Document]:
+        with stage("keyword_search"):
+            return self.vector_db.keyword_search(query=query, limit=limit, filters=filters)
+
+    def search(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        """
+        Retrieve the best ``top_k`` chunks for a query.
+
+        Args:
+            query: User query
+            top_k: Final number of chunks (defaults to config.top_k)
+            filters: Metadata filters passed to both searches
+
+        Returns:
+            Ranked documents
+        """
+        top_k = top_k or self.config.top_k
+        rerank = self.reranker is not None and self.config.rerank
+        mode = self.config.mode
+        # Single-source search without re-ranking only needs the final top-k
+        limit = self.config.candidates if mode == "hybrid" or rerank else top_k
+        if mode == "vector":
+            candidates = self._vector(query, limit, filters)
+        elif mode == "keyword":
+            candidates = self._keyword(query, limit, filters)
+        else:
+            # Copy the context so pool threads label stages with the current agent
+            vector_future = _search_pool.submit(copy_context().run, self._vector, query, limit, filters)
+            keyword_future = _search_pool.submit(copy_context().run, self._keyword, query, limit, filters)
+            candidates = reciprocal_rank_fusion(
+                [vector_future.result(), keyword_future.result()],
+                rrf_k=self.config.rrf_k,
+            )
+
+        if rerank:
+            try:
+                with stage("rerank"):
+                    return self.reranker.rerank(query, candidates, top_k)
+            except Exception as e:
+                logger.warning(f"Re-ranking failed, using fused order: {e}")
+        return candidates[:top_k]
+
+    async def __call__(
+        self,
+        query: str,
+        num_documents: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        run_context: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> Optional[List[Dict[str, Any]]]:
+        filters = scoped_filters(filters, getattr(run_context, "session_state", None))
+        docs = await take_prefetched(run_context, query, num_documents or self.config.top_k, filters)
+        if docs is None:
+            # to_thread copies the context, so stages keep the agent label
+            docs = await asyncio.to_thread(self.search, query, num_documents, filters)
+        docs, saved = fit_documents(docs, self.config.max_tokens)
+        record_saved(self.agent_id, "knowledge", saved)
+        return [doc.to_dict() for doc in docs]
+
+
+def get_knowledge_retriever(agent_id: str) -> HybridRetriever:
+    """Build the knowledge retriever for an agent from its retrieval config."""
+    config = get_retrieval_config(agent_id)
+    return HybridRetriever(
+        vector_db=get_vector_db(),
+        config=config,
+        reranker=get_reranker() if config.rerank else None,
+        agent_id=agent_id,
+    )
@@ -0,0 +1,309 @@
+"""Region and service scoping of knowledge searches.
+
+Every knowledge chunk carries two typed metadata keys, set at ingestion
+from the document path (``nsw/carpet-cleaning-faq.md``):
+
+- ``region``: a pricing region (``POSTCODE_REGIONS``) or ``"all"``
+- ``service``: a priced service (``PRICING_RULES``) or ``"all"``
+
+Once a conversation's region or service is known - a price lookup records
+them in the session state under ``knowledge_scope`` - agent searches only
+consider chunks for that region/service plus the general ones. The scope
+predicates are rendered as literal SQL over the same expressions as the
+partial ANN indexes built per region and per service (see
+``app.knowledge.index``), so Postgres answers a scoped search from the
+matching partial index instead of post-filtering a global top-k.
+
+Usage:
+    python -m app.knowledge.scope status
+    python -m app.knowledge.scope backfill     # tag chunks ingested before scoping
+"""
+import argparse
+import json
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from agno.filters import EQ, IN, FilterExpr
+from sqlalchemy import text as sql
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.elements import TextClause
+
+from app.core.config import settings
+from app.core.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+SCOPE_KEYS = ("region", "service")
+ALL = "all"  # Chunks that apply to every region/service
+STATE_KEY = "knowledge_scope"
+
+SCHEMA = "ai"
+TABLE = "common_knowledge_chunks"
+
+
+@lru_cache(maxsize=None)
+def _known_values() -> Dict[str, Tuple[str, ...]]:
+    # Imported here: importing app.agents builds the agents, which use this module
+    from app.agents.tools import POSTCODE_REGIONS, PRICING_RULES
+
+    return {"region": tuple(sorted(set(POSTCODE_REGIONS.values()))), "service": tuple(PRICING_RULES)}
+
+
+def scope_values(key: str) -> Tuple[str, ...]:
+    """Values a scope key can take, ``"all"`` excluded."""
+    if key not in SCOPE_KEYS:
+        raise ValueError(f"Unknown scope key '{key}'")
+    return _known_values()[key]
+
+
+def scope_expression(key: str) -> str:
+    """SQL expression of a scope key; untagged chunks count as ``"all"``."""
+    if key not in SCOPE_KEYS:
+        raise ValueError(f"Unknown scope key '{key}'")
+    return f"coalesce(meta_data ->> '{key}', '{ALL}')"
+
+
+def scope_predicate(key: str, value: str) -> str:
+    """Literal SQL selecting the chunks of one region/service (``"all"`` included)."""
+    if value not in scope_values(key):
+        raise ValueError(f"Unknown {key} '{value}'")
+    return f"{scope_expression(key)} IN ('{value}', '{ALL}')"
+
+
+def scope_condition(filter_expr: Mapping[str, Any]) -> Optional[TextClause]:
+    """
+    Literal SQL for a scope filter.
+
+    ``IN(key, [value, "all"])`` and ``EQ(key, value)`` on a scope key become
+    the predicate of the matching partial index; values are whitelisted, so
+    inlining them is safe.
+
+    Returns:
+        The condition, or None for any other filter
+    """
+    key = filter_expr.get("key")
+    if key not in SCOPE_KEYS:
+        return None
+    if filter_expr.get("op") == "IN":
+        values = [str(v) for v in filter_expr["values"]]
+    elif filter_expr.get("op") == "EQ":
+        values = [str(filter_expr["value"])]
+    else:
+        return None
+    named = [v for v in values if v != ALL]
+    if len(named) == 1 and ALL in values:
+        return sql(scope_predicate(key, named[0]))
+    allowed = set(scope_values(key)) | {ALL}
+    unknown = [v for v in values if v not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {key} {unknown}")
+    quoted = ", ".join(f"'{v}'" for v in sorted(set(values)))
+    return sql(f"{scope_expression(key)} IN ({quoted})")
+
+
+def is_scope_filter(filter_expr: Any) -> bool:
+    """Whether a filter (FilterExpr or its dict form) is a region/service filter."""
+    if hasattr(filter_expr, "to_dict"):
+        filter_expr = filter_expr.to_dict()
+    return isinstance(filter_expr, Mapping) and filter_expr.get("op") in ("IN", "EQ") \
+        and filter_expr.get("key") in SCOPE_KEYS
+
+
+def scope_filter_values(filters: Any) -> Optional[Dict[str, List[str]]]:
+    """Allowed values per scope key when ``filters`` holds only scope filters, else None."""
+    if not isinstance(filters, (list, tuple)):
+        return None
+    allowed: Dict[str, List[str]] = {}
+    for f in filters:
+        if not is_scope_filter(f):
+            return None
+        f = f.to_dict() if hasattr(f, "to_dict") else f
+        values = [str(v) for v in f["values"]] if f["op"] == "IN" else [str(f["value"])]
+        key = f["key"]
+        allowed[key] = [v for v in allowed[key] if v in values] if key in allowed else values
+    return allowed
+
+
+def _tokens(source: str) -> str:
+    return "_" + re.sub(r"[^a-z0-9]+", "_", source.lower()) + "_"
+
+
+def classify_source(source: str) -> Dict[str, str]:
+    """
+    Scope metadata of a document from its path.
+
+    Region and service names in directory or file names select the scope
+    (``docs/vic/tile_cleaning.md``, ``NSW-upholstery-cleaning-guide.pdf``);
+    documents naming no or several regions (services) apply to all.
+    """
+    tokens = _tokens(source)
+    regions = [r for r in scope_values("region") if f"_{r.lower()}_" in tokens]
+    services = [s for s in scope_values("service") if f"_{s}_" in tokens]
+    return {
+        "region": regions[0] if len(regions) == 1 else ALL,
+        "service": services[0] if len(services) == 1 else ALL,
+    }
+
+
+@dataclass(frozen=True)
+class KnowledgeScope:
+    """The region and service a conversation is about, when known."""
+
+    region: Optional[str] = None
+    service: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.region or self.service)
+
+    def filters(self) -> List[FilterExpr]:
+        """Search filters keeping this scope's chunks and the general ones."""
+        return [
+            IN(key, [value, ALL])
+            for key, value in (("region", self.region), ("service", self.service))
+            if value
+        ]
+
+    def to_dict(self) -> Dict[str, str]:
+        return {key: value for key, value in (("region", self.region), ("service", self.service)) if value}
+
+    @classmethod
+    def from_session_state(cls, session_state: Optional[Mapping[str, Any]]) -> "KnowledgeScope":
+        stored = (session_state or {}).get(STATE_KEY) or {}
+        region = stored.get("region")
+        service = stored.get("service")
+        return cls(
+            region=region if region in scope_values("region") else None,
+            service=service if service in scope_values("service") else None,
+        )
+
+
+def scoped_filters(filters: Any, session_state: Optional[Mapping[str, Any]]) -> Any:
+    """
+    Add the session's scope to a search's filters.
+
+    Explicit region/service filters win over the session scope. Dict
+    filters (JSONB containment) are converted to the list form so both
+    can be combined.
+    """
+    if not settings.knowledge_scope_enabled:
+        return filters
+    scope = KnowledgeScope.from_session_state(session_state)
+    if not scope:
+        return filters
+    if isinstance(filters, Mapping):
+        if any(key in filters for key in SCOPE_KEYS):
+            return filters
+        filters = [EQ(key, value) for key, value in filters.items()]
+    filters = list(filters or [])
+    explicit = {(f.to_dict() if hasattr(f, "to_dict") else f).get("key") for f in filters if is_scope_filter(f)}
+    return filters + [f for f in scope.filters() if f.key not in explicit]
+
+
+def _scope_from_request(request: Mapping[str, Any]) -> Dict[str, Optional[str]]:
+    from app.agents.pricing import normalize_service_type
+    from app.agents.tools import get_region_from_postcode
+
+    service = normalize_service_type(str(request.get("service_type") or ""))
+    region = get_region_from_postcode(str(request.get("postcode") or ""))
+    return {
+        "region": region if region in scope_values("region") else None,
+        "service": service if service in scope_values("service") else None,
+    }
+
+
+def _common(values: Sequence[Optional[str]]) -> Optional[str]:
+    distinct = set(values)
+    return values[0] if len(distinct) == 1 else None
+
+
+def remember_scope_hook(
+    function_name: str,
+    function_call: Callable[..., Any],
+    arguments: Dict[str, Any],
+    run_context: Any = None,
+) -> Any:
+    """
+    Agno tool hook recording the region and service of price lookups.
+
+    The postcode and service of a lookup (or the ones shared by every
+    request of a bulk lookup) are stored in the session state, so later
+    knowledge searches of the conversation are scoped to them.
+    """
+    result = function_call(**arguments)
+    session_state = getattr(run_context, "session_state", None)
+    if session_state is None:
+        return result
+    if "requests" in arguments:
+        requested = [_scope_from_request(r) for r in arguments["requests"] or [] if isinstance(r, Mapping)]
+        if not requested:
+            return result
+        scope = {key: _common([r[key] for r in requested]) for key in SCOPE_KEYS}
+    elif "service_type" in arguments or "postcode" in arguments:
+        scope = _scope_from_request(arguments)
+    else:
+        return result
+    known = {key: value for key, value in scope.items() if value}
+    if known:
+        session_state[STATE_KEY] = {**(session_state.get(STATE_KEY) or {}), **known}
+    return result
+
+
+def backfill(engine: Optional[Engine] = None) -> Dict[str, Any]:
+    """
+    Tag chunks ingested before scoping with region/service metadata.
+
+    Chunks are classified by their source document (``name``); chunks that
+    already carry both keys are left untouched.
+    """
+    engine = engine or get_engine()
+    updated = 0
+    with engine.begin() as conn:
+        sources = conn.execute(sql(
+            f"SELECT DISTINCT name FROM {SCHEMA}.{TABLE}"
+            " WHERE NOT (meta_data ? 'region' AND meta_data ? 'service')"
+        )).scalars().all()
+        for source in sources:
+            updated += conn.execute(
+                sql(
+                    f"UPDATE {SCHEMA}.{TABLE}"
+                    " SET meta_data = coalesce(meta_data, '{}'::jsonb) || CAST(:scope AS jsonb)"
+                    " WHERE name IS NOT DISTINCT FROM :name"
+                    " AND NOT (meta_data ? 'region' AND meta_data ? 'service')"
+                ),
+                {"scope": json.dumps(classify_source(source or "")), "name": source},
+            ).rowcount
+    logger.info(f"Tagged {updated} chunks from {len(sources)} documents")
+    return {"documents": len(sources), "chunks": updated}
+
+
+def scope_status(engine: Optional[Engine] = None) -> Dict[str, Any]:
+    """Chunk counts per region and per service."""
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        counts = {
+            key: dict(conn.execute(sql(
+                f"SELECT {scope_expression(key)} AS value, count(*) FROM {SCHEMA}.{TABLE}"
+                " GROUP BY 1 ORDER BY 1"
+            )).all())
+            for key in SCOPE_KEYS
+        }
+    return {"enabled": settings.knowledge_scope_enabled, "chunks": counts}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Region/service scoping of the knowledge chunks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Chunk counts per region and service")
+    sub.add_parser("backfill", help="Tag untagged chunks from their source path")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    result = backfill() if args.command == "backfill" else scope_status()
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,49 @@
 """Main FastAPI application entry point with AgentOS integration."""
-from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import settings
-from app.agent_os import agent_os
+import asyncio
 import logging
 import time
+from contextlib import asynccontextmanager
+
+from app.core.startup import get_startup_timings, record, timed, warm_up
 
-# Record startup time
+# Record startup time (before the timed imports below, so they are included)
 _startup_begin = time.time()
 
+# Each group of imports is its own startup component
+with timed("import.config"):
+    from app.core.config import settings
+
+with timed("import.fastapi"):
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse
+
+with timed("import.agno_os"):
+    from app.agent_os import get_agent_os
+
+with timed("import.database"):
+    from app.core.database import dispose_async_engines, dispose_engines
+
+with timed("import.api"):
+    from app.api.knowledge import router as knowledge_router
+    from app.api.pricing import router as pricing_router
+    from app.api.system import router as system_router
+
+with timed("import.middleware"):
+    from app.agents.price_router import PriceRouterMiddleware
+    from app.agents.pricing import start_pricing_listener, stop_pricing_listener
+    from app.core.admission import AdmissionMiddleware
+    from app.core.health import liveness, readiness, watch_task
+    from app.core.metrics import (
+        AgentRunMetricsMiddleware,
+        metrics_endpoint,
+        setup_tracing,
+    )
+    from app.core.response_cache import ResponseCacheMiddleware
+    from app.core.session_archive import run_archiver
+    from app.core.session_store import SessionAffinityMiddleware, get_session_store
+    from app.knowledge.prefetch import KnowledgePrefetchMiddleware
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -17,11 +51,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+record("imports.total", time.time() - _startup_begin)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown."""
     # Startup
+    setup_tracing()
+    if settings.startup_warmup:
+        await asyncio.to_thread(warm_up)
+    if session_store is not None:
+        watch_task("session_flusher", await session_store.start())
+    if settings.knowledge_replica_enabled:
+        # Imported here: the replica module loads NumPy
+        from app.knowledge.replica import start_replicas
+
+        start_replicas()
+    if settings.pricing_reload_broadcast:
+        start_pricing_listener()
+    archiver = asyncio.create_task(run_archiver()) if settings.session_archive_enabled else None
+    if archiver is not None:
+        watch_task("session_archiver", archiver)
     startup_time = time.time() - _startup_begin
     logger.info("=" * 60)
     logger.info("🚀 Electrodry AI Helpdesk API Starting")
@@ -36,17 +87,34 @@ async def lifespan(app: FastAPI):
     logger.info("  ✓ Production Monitoring")
     logger.info("=" * 60)
     logger.info(f"⏱️  Backend startup completed in {startup_time:.3f} seconds")
+    for component, seconds in get_startup_timings().items():
+        logger.info(f"   {component:<24}{seconds * 1000:9.1f} ms")
     logger.info("=" * 60)
     
     yield
     
     # Shutdown
     logger.info("Shutting down Electrodry AI Helpdesk API")
+    if archiver is not None:
+        archiver.cancel()
+    if session_store is not None:
+        await session_store.stop()
+    if settings.knowledge_replica_enabled:
+        from app.knowledge.replica import stop_replicas
+
+        stop_replicas()
+    if settings.pricing_reload_broadcast:
+        stop_pricing_listener()
+    dispose_engines()
+    await dispose_async_engines()
 
 
 # Option 1: Use AgentOS app as base (RECOMMENDED for production)
 # This gives you all AgentOS built-in endpoints + custom routes
-app = agent_os.get_app()
+# Agents are built here without touching the network (see app.core.startup)
+agent_os = get_agent_os()
+with timed("app"):
+    app = agent_os.get_app()
 
 # Update app metadata
 app.title = "Electrodry AI Helpdesk API"
@@ -67,7 +135,46 @@ app.router.lifespan_context = lifespan
 #     openapi_url="/api/openapi.json"
 # )
 
+app.include_router(system_router)
+app.include_router(knowledge_router)
+app.include_router(pricing_router)
+
+# Embed the message of admitted runs while AgentOS loads the session
+# (added before admission control so only admitted runs prefetch)
+if settings.knowledge_prefetch_enabled:
+    app.add_middleware(KnowledgePrefetchMiddleware, agent_ids=settings.knowledge_prefetch_agents)
+
+# Cap concurrent LLM runs per model and tenant (503 + Retry-After when saturated)
+if settings.admission_enabled:
+    app.add_middleware(
+        AdmissionMiddleware,
+        agent_models={agent.id: agent.model.id for agent in agent_os.agents},
+    )
+
+# Serve repeated FAQ answers from the semantic response cache
+# (added after admission control so cached answers never wait for a slot)
+if settings.response_cache_enabled:
+    app.add_middleware(ResponseCacheMiddleware, agent_ids=settings.response_cache_agents)
+
+# Answer pure price quotes without running the agent (in front of the cache
+# and admission control: no embedding lookup, no LLM slot)
+if settings.price_router_enabled:
+    app.add_middleware(PriceRouterMiddleware, agent_ids=settings.price_router_agents)
+
+# Load sessions ahead of runs and persist them after the response
+# (outside the fast path and response cache, which read and write sessions too)
+session_store = get_session_store()
+if session_store is not None:
+    app.add_middleware(SessionAffinityMiddleware, store=session_store)
+
+# Per-run latency, token and cache metrics (outside the fast path and caches, so their replies are timed too)
+if settings.metrics_enabled:
+    app.add_middleware(AgentRunMetricsMiddleware)
+    app.add_route(settings.metrics_path, metrics_endpoint, include_in_schema=False)
+
 # Configure CORS - Allow Agno Control Plane URLs
+# (added last, so it is the outermost layer: fast-path quotes, cached
+# answers and admission 503s get CORS headers too)
 cors_origins = [
     settings.frontend_url,
     "http://localhost:3000",
@@ -94,33 +201,22 @@ logger.info(f"AgentOS provides built-in endpoints at /v1/")
 logger.info(f"Custom endpoints available at /api/v1/")
 
 
-@app.get("/")
-async def root():
-    """Root endpoint."""
-    return {
-        "message": "Electrodry AI Helpdesk API",
-        "version": "0.1.0",
-        "powered_by": "AgentOS",
-        "endpoints": {
-            "agno_built_in_api": "/v1/",
-            "docs": "/docs",
-            "agent_os_ui": "https://os.agno.com"
-        }
-    }
-
-
-@app.get("/health")
-async def health():
-    """Health check endpoint for AgentOS control plane."""
-    return {
-        "status": "healthy",
-        "service": "electrodry-ai-helpdesk",
-        "version": "0.1.0",
-        "agent_os": "ready"
-    }
+# AgentOS serves "/" and "/health"; the worker probes sit next to them
+@app.get("/health/live")
+async def health_live():
+    """Liveness probe: restart the worker when this fails."""
+    alive, body = liveness()
+    return JSONResponse(body, status_code=200 if alive else 503)
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness probe: stop routing traffic to the worker when this fails."""
+    ready, body = await readiness()
+    return JSONResponse(body, status_code=200 if ready else 503)
 
 
 if __name__ == "__main__":
-    agent_os.serve(app="app.main:app",reload=True)
+    agent_os.serve(app="app.main:app", reload=settings.environment == "development")
 
 
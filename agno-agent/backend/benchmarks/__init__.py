@@ -0,0 +1,7 @@
+"""Offline load-test and benchmark suite.
+
+Runs the real app against a local OpenAI-compatible stub (chat and
+embeddings) and a local pgvector, and reports latency percentiles,
+time-to-first-token, throughput and DB queries per request. See
+``benchmarks.run`` for usage.
+"""
@@ -0,0 +1,140 @@
+"""Benchmark statistics, baselines and regression comparison."""
+import json
+import statistics
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+# Metrics where a higher value is a regression (everything else: lower is)
+LOWER_IS_BETTER = (
+    "p50_ms", "p95_ms", "p99_ms",
+    "ttft_p50_ms", "ttft_p95_ms", "ttft_p99_ms",
+    "db_queries_per_request",
+)
+HIGHER_IS_BETTER = ("throughput_rps", "tokens_per_s")
+
+
+@dataclass
+class Sample:
+    """One timed request."""
+
+    scenario: str
+    latency_ms: float
+    ok: bool = True
+    ttft_ms: Optional[float] = None
+    tokens: int = 0
+    error: Optional[str] = None
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Linear-interpolated percentile, or None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _round(value: Optional[float], digits: int = 2) -> Optional[float]:
+    return round(value, digits) if value is not None else None
+
+
+def summarize(
+    samples: Sequence[Sample],
+    wall_seconds: float,
+    db_queries: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Aggregate samples of one scenario.
+
+    Args:
+        samples: Requests of the scenario
+        wall_seconds: Wall-clock duration of the scenario
+        db_queries: SQL statements executed by the app during the scenario
+
+    Returns:
+        Latency percentiles, time-to-first-token, throughput and DB queries
+    """
+    ok = [s for s in samples if s.ok]
+    latencies = [s.latency_ms for s in ok]
+    ttfts = [s.ttft_ms for s in ok if s.ttft_ms is not None]
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "mean_ms": _round(statistics.mean(latencies)) if latencies else None,
+        "p50_ms": _round(percentile(latencies, 50)),
+        "p95_ms": _round(percentile(latencies, 95)),
+        "p99_ms": _round(percentile(latencies, 99)),
+        "ttft_p50_ms": _round(percentile(ttfts, 50)),
+        "ttft_p95_ms": _round(percentile(ttfts, 95)),
+        "ttft_p99_ms": _round(percentile(ttfts, 99)),
+        "throughput_rps": _round(len(ok) / wall_seconds if wall_seconds else None),
+        "tokens_per_s": _round(sum(s.tokens for s in ok) / wall_seconds if wall_seconds else None),
+        "db_queries_per_request": (
+            _round(db_queries / len(samples)) if db_queries is not None and samples else None
+        ),
+        "sample_errors": sorted({s.error for s in samples if s.error})[:5],
+    }
+
+
+def save(result: Dict[str, Any], path: str) -> None:
+    """Write a benchmark result (or baseline) as JSON."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = 0.10,
+) -> List[Dict[str, Any]]:
+    """
+    Compare scenario metrics against a baseline.
+
+    Args:
+        current: Result of this run
+        baseline: Previously saved result
+        threshold: Relative change treated as a regression (0.10 = 10%)
+
+    Returns:
+        One row per metric present in both, with ``regression`` set when
+        the metric got worse by more than ``threshold``
+    """
+    rows: List[Dict[str, Any]] = []
+    for scenario, metrics in current.get("scenarios", {}).items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base:
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            now, before = metrics.get(metric), base.get(metric)
+            if now is None or not before:
+                continue
+            change = (now - before) / before
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            rows.append({
+                "scenario": scenario,
+                "metric": metric,
+                "baseline": before,
+                "current": now,
+                "change_pct": round(change * 100, 1),
+                "regression": worse,
+            })
+    return rows
+
+
+def format_table(result: Dict[str, Any]) -> str:
+    """Human-readable summary of a result."""
+    columns = ("requests", "errors", "p50_ms", "p95_ms", "p99_ms", "ttft_p50_ms",
+               "throughput_rps", "db_queries_per_request")
+    headers = ("requests", "errors", "p50_ms", "p95_ms", "p99_ms", "ttft_p50",
+               "rps", "db_q/req")
+    lines = [f"{'scenario':<12}" + "".join(f"{h:>12}" for h in headers)]
+    for scenario, metrics in result.get("scenarios", {}).items():
+        lines.append(f"{scenario:<12}" + "".join(f"{metrics.get(c)!s:>12}" for c in columns))
+    return "\n".join(lines)
@@ -0,0 +1,247 @@
+"""Run the offline benchmark suite against the real app.
+
+The app (``app.main:app``) is started under uvicorn with the LLM and
+embedding endpoints pointed at the local stub server, a synthetic corpus
+is ingested into the configured pgvector database, and the chat,
+knowledge and pricing scenarios are driven at the requested concurrency.
+
+Usage:
+    python -m benchmarks.run --output benchmarks/results/latest.json
+    python -m benchmarks.run --baseline benchmarks/results/main.json --fail-on-regression
+    python -m benchmarks.run --scenarios chat --concurrency 32 --ttft-ms 800 \\
+        --env KNOWLEDGE_SEARCH_MODE=vector
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+import jwt
+
+from benchmarks import report, scenarios
+from benchmarks.stub_llm import StubConfig, serve_stub
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JWT_SECRET = "benchmark-jwt-secret-not-for-production"
+DEFAULT_DB_URL = "postgresql+psycopg://ai:ai@localhost:5532/ai"
+
+TOPICS = [
+    ("Carpet drying", "Most carpets are dry within four to six hours after hot water extraction."),
+    ("Stain protection", "A fabric protector can be applied after cleaning to repel spills."),
+    ("Pet odour", "Enzyme treatments break down urine crystals that cause pet odours."),
+    ("Tile sealing", "Grout is sealed after cleaning to slow down future staining."),
+    ("Leather care", "Leather upholstery is cleaned with pH-neutral products and conditioned."),
+    ("Cancellations", "Bookings can be moved or cancelled free of charge up to 24 hours before."),
+]
+
+
+def make_token(role: str = "user", ttl: int = 3600) -> str:
+    """Bearer token accepted by the app's local HS256 verification."""
+    now = int(time.time())
+    return jwt.encode(
+        {"sub": f"benchmark-{role}", "role": role, "aud": "authenticated", "iat": now, "exp": now + ttl},
+        JWT_SECRET,
+        algorithm="HS256",
+    )
+
+
+def write_corpus(directory: str, documents: int) -> None:
+    """Write a deterministic synthetic knowledge corpus."""
+    rng = random.Random(7)
+    for i in range(documents):
+        title, fact = TOPICS[i % len(TOPICS)]
+        paragraphs = [f"{title} guide {i}.", fact]
+        paragraphs += [
+            " ".join(rng.choice(fact.split()) for _ in range(60)) for _ in range(8)
+        ]
+        with open(os.path.join(directory, f"doc_{i:04d}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+
+
+def app_environment(args: argparse.Namespace) -> Dict[str, str]:
+    stub_url = f"http://127.0.0.1:{args.stub_port}/v1"
+    env = dict(os.environ)
+    env.update({
+        "PGVECTOR_DB_URL": args.db_url,
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": stub_url,
+        "OPENROUTER_API_KEY": "stub",
+        "OPENROUTER_BASE_URL": stub_url,
+        # Auth is verified locally; Supabase itself is never contacted
+        "SUPABASE_URL": "http://127.0.0.1:9",
+        "SUPABASE_SERVICE_KEY": "stub",
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "AUTH_VERIFICATION_MODE": "local",
+        "AUTH_ADMIN_REMOTE_CHECK": "false",
+        "AGNO_TELEMETRY": "false",
+    })
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+def seed_knowledge(env: Dict[str, str], documents: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(directory, documents)
+        subprocess.run(
+            [sys.executable, "-m", "app.knowledge.ingest", directory],
+            cwd=BACKEND_DIR, env=env, check=True,
+        )
+
+
+def start_app(env: Dict[str, str], port: int, workers: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("App did not become healthy within 60s")
+
+
+async def _query_count(client: httpx.AsyncClient, admin_token: str) -> Optional[int]:
+    response = await client.get(
+        "/api/v1/system/pools", headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    if response.status_code != 200:
+        return None
+    return sum(pool.get("queries", 0) for pool in response.json()["pools"].values())
+
+
+async def run_scenarios(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    admin_token = make_token("admin")
+    jobs = {
+        "chat": lambda: scenarios.chat_jobs(args.sessions, rng),
+        "knowledge": lambda: scenarios.knowledge_jobs(args.knowledge_requests, rng),
+        "pricing": lambda: scenarios.pricing_jobs(
+            args.pricing_requests, make_token(), args.price_batch, rng
+        ),
+    }
+    results: Dict[str, Any] = {}
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout, limits=limits
+    ) as client:
+        for name in args.scenarios:
+            # Query counts come from one worker's engines, so only exact with one worker
+            before = await _query_count(client, admin_token) if args.workers == 1 else None
+            started = time.perf_counter()
+            samples = await scenarios.run_jobs(client, jobs[name](), args.concurrency)
+            wall = time.perf_counter() - started
+            after = await _query_count(client, admin_token) if before is not None else None
+            db_queries = after - before if after is not None else None
+            results[name] = report.summarize(samples, wall, db_queries)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite (stub LLM and embedder)")
+    parser.add_argument("--db-url", default=os.environ.get("BENCH_DB_URL", DEFAULT_DB_URL))
+    parser.add_argument("--port", type=int, default=8765, help="App port")
+    parser.add_argument("--stub-port", type=int, default=8100, help="Stub OpenAI server port")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--scenarios", default="chat,knowledge,pricing")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sessions", type=int, default=20, help="Chat sessions")
+    parser.add_argument("--knowledge-requests", type=int, default=100)
+    parser.add_argument("--pricing-requests", type=int, default=200)
+    parser.add_argument("--price-batch", type=int, default=10, help="Items per quote request")
+    parser.add_argument("--documents", type=int, default=60, help="Synthetic docs to ingest (0 = skip)")
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--output-tokens", type=int, default=60)
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--env", action="append", default=[], help="Extra app setting KEY=VALUE")
+    parser.add_argument("--name", default="local", help="Label stored in the result")
+    parser.add_argument("--output", help="Write the result JSON here")
+    parser.add_argument("--baseline", help="Compare against this saved result")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regression threshold")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+
+    stub = StubConfig(
+        ttft_ms=args.ttft_ms,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        embedding_latency_ms=args.embedding_latency_ms,
+    )
+    server = serve_stub(stub, port=args.stub_port)
+    env = app_environment(args)
+    if args.documents:
+        seed_knowledge(env, args.documents)
+    app = start_app(env, args.port, args.workers)
+    try:
+        scenario_results = asyncio.run(run_scenarios(args))
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+        server.should_exit = True
+
+    result = {
+        "name": args.name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "config": {
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "sessions": args.sessions,
+            "knowledge_requests": args.knowledge_requests,
+            "pricing_requests": args.pricing_requests,
+            "price_batch": args.price_batch,
+            "documents": args.documents,
+            "stub": vars(stub),
+            "env": args.env,
+        },
+        "scenarios": scenario_results,
+    }
+    print(report.format_table(result))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        report.save(result, args.output)
+
+    if args.baseline:
+        rows = report.compare(result, report.load(args.baseline), args.threshold)
+        regressions: List[Dict[str, Any]] = [row for row in rows if row["regression"]]
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['scenario']:<12}{row['metric']:<26}{row['baseline']:>12}"
+                  f"{row['current']:>12}{row['change_pct']:>9}% {flag}")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
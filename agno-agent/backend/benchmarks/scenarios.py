@@ -0,0 +1,179 @@
+"""Scripted benchmark scenarios driven over HTTP.
+
+Each scenario is a list of jobs run with bounded concurrency. A chat job is
+a whole multi-turn session (turns are sequential within a session); the
+knowledge and pricing jobs are single requests.
+"""
+import asyncio
+import json
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+import httpx
+
+from benchmarks.report import Sample
+
+Job = Callable[[httpx.AsyncClient], Awaitable[List[Sample]]]
+
+CHAT_SCRIPTS: Dict[str, List[List[str]]] = {
+    "helpdesk-assistant": [
+        [
+            "How do I prepare my home for a carpet clean?",
+            "What is the price for carpet cleaning of 30 sqm in 2000?",
+            "How long until the carpet is dry?",
+            "Thanks, that's all.",
+        ],
+        [
+            "Do you clean leather couches?",
+            "Can I get a quote for upholstery cleaning in 3000?",
+            "Great, thank you.",
+        ],
+        [
+            "What is the price of tile cleaning for 45 sqm in 4000?",
+            "Is sealing included?",
+        ],
+    ],
+    "general-assistant": [
+        [
+            "What does hot water extraction mean?",
+            "Summarise that in one sentence.",
+        ],
+    ],
+}
+
+KNOWLEDGE_QUERIES = [
+    "how long does carpet take to dry",
+    "stain protection after cleaning",
+    "pet odour treatment",
+    "tile and grout sealing",
+    "leather upholstery care",
+    "booking cancellation policy",
+]
+
+PRICE_ITEMS = [
+    {"service_type": "carpet_cleaning", "postcode": "2000", "area_size": 30},
+    {"service_type": "upholstery_cleaning", "postcode": "3000", "item_count": 3},
+    {"service_type": "tile_cleaning", "postcode": "4000", "area_size": 45},
+    {"service_type": "carpet_cleaning", "postcode": "6000", "area_size": 80},
+    {"service_type": "tile_cleaning", "postcode": "5000", "area_size": 20},
+]
+
+
+async def _chat_turn(
+    client: httpx.AsyncClient, agent_id: str, message: str, session_id: str, user_id: str
+) -> Sample:
+    started = time.perf_counter()
+    ttft: Optional[float] = None
+    tokens = 0
+    event = None
+    error = None
+    try:
+        async with client.stream(
+            "POST",
+            f"/agents/{agent_id}/runs",
+            data={"message": message, "stream": "true", "session_id": session_id, "user_id": user_id},
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                error = f"HTTP {response.status_code}"
+            else:
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:") and event in ("RunContent", "RunError"):
+                        data = json.loads(line[5:])
+                        if event == "RunError":
+                            error = str(data.get("content") or "RunError")[:200]
+                        elif data.get("content"):
+                            tokens += 1
+                            if ttft is None:
+                                ttft = (time.perf_counter() - started) * 1000
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    return Sample(
+        scenario="chat",
+        latency_ms=(time.perf_counter() - started) * 1000,
+        ok=error is None,
+        ttft_ms=ttft,
+        tokens=tokens,
+        error=error,
+    )
+
+
+def chat_session_job(agent_id: str, script: List[str]) -> Job:
+    """A multi-turn session against one agent (turns run in order)."""
+
+    async def job(client: httpx.AsyncClient) -> List[Sample]:
+        session_id = str(uuid4())
+        user_id = f"bench-{session_id[:8]}"
+        return [await _chat_turn(client, agent_id, message, session_id, user_id) for message in script]
+
+    return job
+
+
+def knowledge_search_job(query: str) -> Job:
+    """One knowledge search through the AgentOS knowledge API."""
+
+    async def job(client: httpx.AsyncClient) -> List[Sample]:
+        started = time.perf_counter()
+        error = None
+        try:
+            response = await client.post("/knowledge/search", json={"query": query, "max_results": 5})
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        return [Sample("knowledge", (time.perf_counter() - started) * 1000, error is None, error=error)]
+
+    return job
+
+
+def price_quote_job(token: str, batch_size: int, rng: random.Random) -> Job:
+    """One bulk quote request with ``batch_size`` items."""
+    items = [rng.choice(PRICE_ITEMS) for _ in range(batch_size)]
+
+    async def job(client: httpx.AsyncClient) -> List[Sample]:
+        started = time.perf_counter()
+        error = None
+        try:
+            response = await client.post(
+                "/api/v1/pricing/quotes",
+                json={"items": items},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        return [Sample("pricing", (time.perf_counter() - started) * 1000, error is None, error=error)]
+
+    return job
+
+
+def chat_jobs(sessions: int, rng: random.Random) -> List[Job]:
+    scripts = [(agent_id, script) for agent_id, items in CHAT_SCRIPTS.items() for script in items]
+    return [chat_session_job(*rng.choice(scripts)) for _ in range(sessions)]
+
+
+def knowledge_jobs(requests: int, rng: random.Random) -> List[Job]:
+    return [knowledge_search_job(rng.choice(KNOWLEDGE_QUERIES)) for _ in range(requests)]
+
+
+def pricing_jobs(requests: int, token: str, batch_size: int, rng: random.Random) -> List[Job]:
+    return [price_quote_job(token, batch_size, rng) for _ in range(requests)]
+
+
+async def run_jobs(
+    client: httpx.AsyncClient, jobs: List[Job], concurrency: int
+) -> List[Sample]:
+    """Run jobs with at most ``concurrency`` in flight and collect samples."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(job: Job) -> List[Sample]:
+        async with semaphore:
+            return await job(client)
+
+    results = await asyncio.gather(*(bounded(job) for job in jobs))
+    return [sample for samples in results for sample in samples]
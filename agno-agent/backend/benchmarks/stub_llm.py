@@ -0,0 +1,207 @@
+"""OpenAI-compatible stub server for offline benchmarks.
+
+Serves ``/v1/chat/completions`` (streaming and non-streaming, including
+tool calls) and ``/v1/embeddings`` with configurable latency, so the real
+agents, retrievers and tools can be exercised without network access.
+
+The chat stub is scripted: a user turn that asks for a price calls
+``price_lookup_tool``, a question calls ``search_knowledge_base`` and
+anything else (or a turn after a tool result) is answered with filler
+text streamed at ``tokens_per_second``.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+from uuid import uuid4
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "Electrodry", "technicians", "use", "hot", "water", "extraction", "to", "lift",
+    "dirt", "from", "carpet", "fibres", "and", "most", "rooms", "are", "dry",
+    "within", "a", "few", "hours", "after", "the", "clean",
+)
+
+SERVICES = ("carpet_cleaning", "upholstery_cleaning", "tile_cleaning")
+
+
+@dataclass
+class StubConfig:
+    """Latency profile of the stub server."""
+
+    ttft_ms: float = 300.0  # Delay before the first token
+    tokens_per_second: float = 80.0  # Streaming rate after the first token
+    output_tokens: int = 60  # Tokens per text answer
+    embedding_latency_ms: float = 20.0  # Per embeddings request
+
+
+def stub_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector for a text (same text -> same vector)."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+
+def _tool_names(body: Dict[str, Any]) -> List[str]:
+    return [tool["function"]["name"] for tool in body.get("tools") or [] if "function" in tool]
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def plan_tool_call(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Decide whether the stub model calls a tool for this request."""
+    messages = body.get("messages") or []
+    if not messages or messages[-1].get("role") != "user":
+        return None
+    question = _text(messages[-1].get("content")).lower()
+    tools = _tool_names(body)
+    if "price_lookup_tool" in tools and ("price" in question or "quote" in question):
+        postcode = re.search(r"\b\d{4}\b", question)
+        area = re.search(r"(\d+)\s*(?:sqm|m2|square)", question)
+        service = next((s for s in SERVICES if s.split("_")[0] in question), SERVICES[0])
+        arguments: Dict[str, Any] = {
+            "service_type": service,
+            "postcode": postcode.group(0) if postcode else "2000",
+        }
+        if area:
+            arguments["area_size"] = float(area.group(1))
+        return {"name": "price_lookup_tool", "arguments": arguments}
+    if "search_knowledge_base" in tools and "?" in question:
+        return {"name": "search_knowledge_base", "arguments": {"query": question}}
+    return None
+
+
+def _usage(body: Dict[str, Any], completion_tokens: int) -> Dict[str, int]:
+    prompt_tokens = sum(len(_text(m.get("content")).split()) for m in body.get("messages") or [])
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def create_stub_app(config: StubConfig) -> FastAPI:
+    """Build the stub OpenAI API."""
+    app = FastAPI(title="OpenAI stub")
+
+    def chunk(completion_id: str, model: str, delta: Dict[str, Any], finish: Optional[str] = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def stream(body: Dict[str, Any], call: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
+        completion_id = f"chatcmpl-{uuid4().hex}"
+        model = body.get("model", "stub")
+        await asyncio.sleep(config.ttft_ms / 1000)
+        if call:
+            yield chunk(completion_id, model, {"role": "assistant", "tool_calls": [{
+                "index": 0,
+                "id": f"call_{uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+            }]})
+            yield chunk(completion_id, model, {}, "tool_calls")
+            completion_tokens = 20
+        else:
+            delay = 1.0 / config.tokens_per_second
+            for i in range(config.output_tokens):
+                if i:
+                    await asyncio.sleep(delay)
+                yield chunk(completion_id, model, {"role": "assistant", "content": WORDS[i % len(WORDS)] + " "})
+            yield chunk(completion_id, model, {}, "stop")
+            completion_tokens = config.output_tokens
+        if (body.get("stream_options") or {}).get("include_usage"):
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": _usage(body, completion_tokens),
+            }
+            yield f"data: {json.dumps(payload)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        call = plan_tool_call(body)
+        if body.get("stream"):
+            return StreamingResponse(stream(body, call), media_type="text/event-stream")
+
+        await asyncio.sleep(
+            config.ttft_ms / 1000 + (0 if call else config.output_tokens / config.tokens_per_second)
+        )
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        if call:
+            message["tool_calls"] = [{
+                "id": f"call_{uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+            }]
+        else:
+            message["content"] = " ".join(WORDS[i % len(WORDS)] for i in range(config.output_tokens))
+        return JSONResponse({
+            "id": f"chatcmpl-{uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if call else "stop",
+            }],
+            "usage": _usage(body, 20 if call else config.output_tokens),
+        })
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = int(body.get("dimensions") or 1536)
+        await asyncio.sleep(config.embedding_latency_ms / 1000)
+        return JSONResponse({
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": stub_embedding(text, dimensions)}
+                for i, text in enumerate(inputs)
+            ],
+            "model": body.get("model", "stub"),
+            "usage": {
+                "prompt_tokens": sum(len(t.split()) for t in inputs),
+                "total_tokens": sum(len(t.split()) for t in inputs),
+            },
+        })
+
+    return app
+
+
+def serve_stub(config: StubConfig, host: str = "127.0.0.1", port: int = 8100) -> uvicorn.Server:
+    """Start the stub server in a background thread and wait until it is up."""
+    server = uvicorn.Server(uvicorn.Config(
+        create_stub_app(config), host=host, port=port, log_level="warning"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Stub server did not start on {host}:{port}")
+        time.sleep(0.05)
+    return server
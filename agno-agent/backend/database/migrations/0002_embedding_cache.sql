@@ -0,0 +1,15 @@
+-- Persistent embedding cache used by app.core.embedding_cache.CachingEmbedder.
+-- Keys are "<model>:<dimensions>:<sha256(normalized text)>"; embeddings are
+-- packed float32 arrays so the table is independent of the vector dimension.
+CREATE SCHEMA IF NOT EXISTS ai;
+
+CREATE TABLE IF NOT EXISTS ai.embedding_cache (
+    cache_key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    dimensions INTEGER NOT NULL,
+    embedding BYTEA NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS embedding_cache_created_at_idx
+    ON ai.embedding_cache (created_at);
@@ -0,0 +1,17 @@
+-- Semantic response cache used by app.core.response_cache.
+-- The vector dimension must match EMBEDDING_DIMENSIONS.
+CREATE SCHEMA IF NOT EXISTS ai;
+
+CREATE TABLE IF NOT EXISTS ai.agent_response_cache (
+    id BIGSERIAL PRIMARY KEY,
+    agent_id TEXT NOT NULL,
+    query TEXT NOT NULL,
+    query_hash TEXT NOT NULL,
+    embedding vector(1536) NOT NULL,
+    response TEXT NOT NULL,
+    knowledge_version TEXT NOT NULL,
+    hit_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_hit_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    UNIQUE (agent_id, query_hash)
+);
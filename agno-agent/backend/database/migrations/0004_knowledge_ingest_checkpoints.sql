@@ -0,0 +1,12 @@
+-- Per-document checkpoints for app.knowledge.ingest (resumable bulk loads).
+CREATE SCHEMA IF NOT EXISTS ai;
+
+CREATE TABLE IF NOT EXISTS ai.knowledge_ingest_checkpoints (
+    source TEXT PRIMARY KEY,
+    content_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    error TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,27 @@
+-- Pricing source tables for app.agents.pricing (PRICING_SOURCE=db).
+CREATE SCHEMA IF NOT EXISTS ai;
+
+CREATE TABLE IF NOT EXISTS ai.pricing_services (
+    service_type TEXT PRIMARY KEY,
+    base_price NUMERIC(10, 2) NOT NULL,
+    per_sqm NUMERIC(10, 2),
+    per_item NUMERIC(10, 2)
+);
+
+CREATE TABLE IF NOT EXISTS ai.pricing_service_regions (
+    service_type TEXT NOT NULL REFERENCES ai.pricing_services (service_type) ON DELETE CASCADE,
+    region TEXT NOT NULL,
+    available BOOLEAN NOT NULL DEFAULT TRUE,
+    multiplier NUMERIC(6, 3) NOT NULL DEFAULT 1.0,
+    PRIMARY KEY (service_type, region)
+);
+
+-- Postcode ranges; narrower ranges override wider ones (suburb-level pricing)
+CREATE TABLE IF NOT EXISTS ai.pricing_postcodes (
+    start_postcode INTEGER NOT NULL CHECK (start_postcode BETWEEN 0 AND 9999),
+    end_postcode INTEGER NOT NULL CHECK (end_postcode BETWEEN 0 AND 9999),
+    region TEXT NOT NULL,
+    multiplier NUMERIC(6, 3) NOT NULL DEFAULT 1.0,
+    PRIMARY KEY (start_postcode, end_postcode),
+    CHECK (start_postcode <= end_postcode)
+);
@@ -0,0 +1,4 @@
+-- Rolling per-session summaries maintained by app.core.rolling_summary.
+-- Agno creates ai.agent_sessions on first use: on a fresh database, run
+-- this migration again once the table exists (summaries stay off until then).
+ALTER TABLE IF EXISTS ai.agent_sessions ADD COLUMN IF NOT EXISTS rolling_summary JSONB;
@@ -0,0 +1,30 @@
+-- Cold storage for app.core.session_archive: sessions idle for
+-- SESSION_ARCHIVE_IDLE_DAYS and runs beyond the newest SESSION_HOT_RUNS of a
+-- session. Payloads are zstd-compressed JSON rows of ai.agent_sessions and
+-- its runs table. The app also creates these tables at runtime.
+--
+-- Sessions stored before Agno's runs table (whole history in the legacy
+-- agent_sessions.runs column) are split into run rows with:
+--   python -m app.core.session_archive migrate [--drop-legacy]
+CREATE SCHEMA IF NOT EXISTS ai;
+
+CREATE TABLE IF NOT EXISTS ai.agent_session_archive (
+    session_id TEXT PRIMARY KEY,
+    agent_id TEXT,
+    user_id TEXT,
+    last_activity BIGINT NOT NULL,
+    payload BYTEA NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS ai.agent_run_archive (
+    session_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    run_index BIGINT,
+    created_at BIGINT NOT NULL,
+    payload BYTEA NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (session_id, run_id)
+);
@@ -0,0 +1,25 @@
+-- Change feed of ai.common_knowledge_chunks for app.knowledge.replica: every
+-- inserted, updated or deleted chunk is NOTIFYed on the knowledge_chunks
+-- channel with its id ('*' for TRUNCATE). Workers holding an in-process
+-- replica of the vectors LISTEN and re-read the notified rows; they only
+-- check that the trigger exists and search pgvector until it does.
+CREATE OR REPLACE FUNCTION ai.notify_knowledge_chunks() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('knowledge_chunks', '*');
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('knowledge_chunks', OLD.id);
+    ELSE
+        PERFORM pg_notify('knowledge_chunks', NEW.id);
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE TRIGGER common_knowledge_chunks_notify
+    AFTER INSERT OR UPDATE OR DELETE ON ai.common_knowledge_chunks
+    FOR EACH ROW EXECUTE FUNCTION ai.notify_knowledge_chunks();
+
+CREATE OR REPLACE TRIGGER common_knowledge_chunks_notify_truncate
+    AFTER TRUNCATE ON ai.common_knowledge_chunks
+    FOR EACH STATEMENT EXECUTE FUNCTION ai.notify_knowledge_chunks();
@@ -0,0 +1,11 @@
+-- Region/service scope of ai.common_knowledge_chunks (app.knowledge.scope).
+-- Chunks ingested before scoping have no region/service metadata and count
+-- as "all" until `python -m app.knowledge.scope backfill` tags them from
+-- their source path. The partial ANN indexes per region and service depend
+-- on the configured index type and quantization and are created by
+-- `python -m app.knowledge.index build` (KNOWLEDGE_SCOPE_INDEXES=true).
+CREATE INDEX IF NOT EXISTS common_knowledge_chunks_scope_idx
+    ON ai.common_knowledge_chunks (
+        (coalesce(meta_data ->> 'region', 'all')),
+        (coalesce(meta_data ->> 'service', 'all'))
+    );
@@ -0,0 +1,44 @@
+"""Production server profile.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Runs one uvicorn worker per CPU (``WEB_CONCURRENCY``). The app and its
+read-only state are loaded once in the master and shared with the workers
+copy-on-write; every worker opens its own DB pools after the fork. Workers
+are recycled after ``SERVER_MAX_REQUESTS`` requests and drain in-flight
+responses on SIGTERM for up to ``SERVER_GRACEFUL_TIMEOUT`` seconds.
+"""
+import multiprocessing
+import os
+from app.core.config import settings
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = settings.web_concurrency or multiprocessing.cpu_count()
+worker_class = "app.core.server.DrainingUvicornWorker"
+
+preload_app = True
+max_requests = settings.server_max_requests
+max_requests_jitter = settings.server_max_requests_jitter
+graceful_timeout = settings.server_graceful_timeout
+# Heartbeat timeout; long agent runs are async and keep the worker responsive
+timeout = 60
+keepalive = settings.server_keepalive
+
+forwarded_allow_ips = "*"
+accesslog = "-"
+errorlog = "-"
+loglevel = "info"
+
+
+def when_ready(server):
+    from app.core.startup import preload_shared_state
+
+    for component, seconds in preload_shared_state().items():
+        if component.startswith("preload."):
+            server.log.info(f"Preloaded {component[8:]} in {seconds * 1000:.1f} ms")
+
+
+def post_fork(server, worker):
+    from app.core.database import reset_after_fork
+
+    reset_after_fork()
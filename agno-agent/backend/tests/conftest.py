@@ -1,7 +1,23 @@
+import os
+
 import pytest
-from httpx import AsyncClient, ASGITransport
+
+# Placeholder configuration: importing the app does not connect anywhere
+for _name, _value in {
+    "SUPABASE_URL": "http://localhost:54321",
+    "SUPABASE_SERVICE_KEY": "test-service-key",
+    "PGVECTOR_DB_URL": "postgresql+psycopg://ai:ai@localhost:5532/ai",
+    "OPENAI_API_KEY": "test-openai-key",
+    "OPENROUTER_API_KEY": "test-openrouter-key",
+    "STARTUP_WARMUP": "false",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+from httpx import ASGITransport, AsyncClient
+
 from app.main import app
 
+
 @pytest.fixture
 async def async_client():
     """Async client for testing."""
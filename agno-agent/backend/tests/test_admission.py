@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import jwt
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.responses import PlainTextResponse
+
+from app.core import admission
+from app.core.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejected,
+)
+from app.core.config import settings
+
+SECRET = "test-secret-with-enough-length-for-hs256"
+
+
+@pytest.mark.asyncio
+async def test_queued_runs_are_served_round_robin_across_tenants():
+    controller = AdmissionController("test-model", max_concurrency=1, max_per_tenant=5, max_queue=10)
+    await controller.acquire("holder")
+    order = []
+
+    async def run(tenant):
+        await controller.acquire(tenant)
+        order.append(tenant)
+        controller.release(tenant)
+
+    # A burst from one user must not starve the other
+    tasks = [asyncio.create_task(run(t)) for t in ("alice", "alice", "alice", "bob")]
+    await asyncio.sleep(0)
+    controller.release("holder")
+    await asyncio.gather(*tasks)
+
+    assert order[:2] == ["alice", "bob"]
+    assert controller.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_per_tenant_cap_does_not_block_other_tenants():
+    controller = AdmissionController("test-model", max_concurrency=4, max_per_tenant=1, max_queue=10, max_wait=0.05)
+    await controller.acquire("alice")
+
+    assert await controller.acquire("bob") == 0.0
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire("alice")
+    assert rejected.value.reason == "timeout"
+    assert controller.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately_with_retry_after():
+    controller = AdmissionController("test-model", max_concurrency=1, max_queue=1, max_wait=5)
+    await controller.acquire("a")
+    waiting = asyncio.create_task(controller.acquire("b"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire("c")
+    assert rejected.value.reason == "queue_full"
+    assert rejected.value.retry_after >= 1
+
+    controller.release("a")
+    await waiting
+    stats = controller.stats()
+    assert stats["in_flight"] == 1
+    assert stats["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_exhausted_rate_limit_rejects_before_queueing():
+    controller = AdmissionController("test-model", max_wait=1, requests_per_minute=2)
+    controller.throttle()
+    controller.throttle()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire("a")
+    assert rejected.value.reason == "rate_limit"
+    assert rejected.value.retry_after >= 1
+
+
+@pytest.mark.asyncio
+async def test_tenant_is_the_verified_token_subject(monkeypatch):
+    monkeypatch.setattr(settings, "supabase_jwt_secret", SECRET)
+    monkeypatch.setitem(
+        admission._controllers, "m", AdmissionController("m", max_concurrency=4, max_per_tenant=1, max_wait=0.05)
+    )
+    release = asyncio.Event()
+
+    async def agent(scope, receive, send):
+        await release.wait()
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    token = jwt.encode(
+        {"sub": "user-1", "aud": settings.auth_jwt_audience, "exp": int(time.time()) + 60}, SECRET, algorithm="HS256"
+    )
+    app = AdmissionMiddleware(agent, agent_models={"helpdesk-assistant": "m"})
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+
+        def run(user_id):
+            return client.post(
+                "/agents/helpdesk-assistant/runs",
+                data={"message": "hi", "user_id": user_id},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+
+        first = asyncio.create_task(run("a"))
+        await asyncio.sleep(0.01)
+        # Rotating the form's user_id does not get around the per-user cap
+        rejected = await asyncio.wait_for(run("b"), timeout=1)
+        release.set()
+        assert (await first).status_code == 200
+    assert rejected.status_code == 503
@@ -2,10 +2,10 @@ import pytest
 
 @pytest.mark.asyncio
 async def test_root_endpoint(async_client):
-    """Test the root endpoint."""
+    """Test the root endpoint (served by AgentOS)."""
     response = await async_client.get("/")
     assert response.status_code == 200
-    assert response.json()["message"] == "Electrodry AI Helpdesk API"
+    assert response.json()["health"] == "/health"
 
 @pytest.mark.asyncio
 async def test_health_check(async_client):
@@ -21,3 +21,24 @@ async def test_health_check(async_client):
     if response.status_code != 404:
         assert response.status_code == 200
 
+
+def test_app_import_opens_no_connections():
+    """Importing the app builds agents without connecting to anything."""
+    from app.core import database
+
+    assert database._supabase_client is None
+    assert all(engine.pool.checkedout() == 0 for engine in database._engines.values())
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(async_client):
+    """Stage timings and cache counters are exported for Prometheus."""
+    from app.core.metrics import stage
+
+    with stage("auth", agent="helpdesk-assistant"):
+        pass
+
+    response = await async_client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    assert 'agent_stage_seconds_count{agent="helpdesk-assistant",stage="auth"}' in response.text
+    assert 'cache_hits_total{cache="auth_tokens"}' in response.text
@@ -0,0 +1,56 @@
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.core import auth
+from app.core.config import settings
+
+SECRET = "test-secret-with-enough-length-for-hs256"
+
+
+def _make_token(**overrides):
+    claims = {
+        "sub": "user-123",
+        "email": "user@example.com",
+        "role": "authenticated",
+        "aud": "authenticated",
+        "exp": int(time.time()) + 60,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, SECRET, algorithm="HS256")
+
+
+@pytest.fixture(autouse=True)
+def local_secret(monkeypatch):
+    monkeypatch.setattr(settings, "supabase_jwt_secret", SECRET)
+    auth.get_token_cache().clear()
+
+
+@pytest.mark.asyncio
+async def test_local_verification_caches_claims():
+    token = _make_token()
+    user = await auth.verify_token_local(token)
+    assert user == {
+        "user_id": "user-123",
+        "email": "user@example.com",
+        "role": "authenticated",
+    }
+
+    cache = auth.get_token_cache()
+    hits = cache.hits
+    assert await auth.verify_token_local(token) == user
+    assert cache.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_local_verification_rejects_expired_and_forged_tokens():
+    with pytest.raises(HTTPException) as exc:
+        await auth.verify_token_local(_make_token(exp=int(time.time()) - 10))
+    assert exc.value.status_code == 401
+
+    forged = jwt.encode({"sub": "x", "aud": "authenticated", "exp": int(time.time()) + 60},
+                        "another-secret-with-enough-length!!", algorithm="HS256")
+    with pytest.raises(HTTPException):
+        await auth.verify_token_local(forged)
@@ -0,0 +1,28 @@
+from benchmarks.report import Sample, compare, percentile, summarize
+from benchmarks.stub_llm import plan_tool_call, stub_embedding
+
+
+def test_summary_and_regression_check():
+    samples = [Sample("chat", float(ms), ttft_ms=ms / 2, tokens=10) for ms in range(1, 101)]
+    samples.append(Sample("chat", 0.0, ok=False, error="HTTP 500"))
+    summary = summarize(samples, wall_seconds=10.0, db_queries=202)
+    assert summary["errors"] == 1
+    assert summary["p50_ms"] == percentile(range(1, 101), 50) == 50.5
+    assert summary["throughput_rps"] == 10.0
+    assert summary["db_queries_per_request"] == 2.0
+
+    baseline = {"scenarios": {"chat": summary}}
+    slower = {"scenarios": {"chat": dict(summary, p95_ms=summary["p95_ms"] * 1.5)}}
+    assert not any(row["regression"] for row in compare(baseline, baseline))
+    assert [row["metric"] for row in compare(slower, baseline) if row["regression"]] == ["p95_ms"]
+
+
+def test_stub_is_deterministic_and_scripted():
+    assert stub_embedding("carpet", 8) == stub_embedding("carpet", 8)
+    tools = [{"type": "function", "function": {"name": "price_lookup_tool"}},
+             {"type": "function", "function": {"name": "search_knowledge_base"}}]
+    call = plan_tool_call({"tools": tools, "messages": [
+        {"role": "user", "content": "Price for tile cleaning of 45 sqm in 4000?"}]})
+    assert call["arguments"] == {"service_type": "tile_cleaning", "postcode": "4000", "area_size": 45.0}
+    assert plan_tool_call({"tools": tools, "messages": [
+        {"role": "user", "content": "How long to dry?"}]})["name"] == "search_knowledge_base"
@@ -0,0 +1,138 @@
+from types import SimpleNamespace
+
+import pytest
+from agno.knowledge.document import Document
+from agno.models.message import Message
+from agno.run.base import RunStatus
+
+from app.core import rolling_summary
+from app.core.config import settings
+from app.core.context_budget import (
+    OMITTED_TOOL_RESULT,
+    fit_documents,
+    fit_history,
+    uncovered_history_turns,
+)
+
+
+def conversation(turns, current="What about tiles?"):
+    """System message, ``turns`` history turns (each with a big tool result) and the new question."""
+    messages = [Message(role="system", content="You are a helpdesk assistant.")]
+    for i in range(turns):
+        messages += [
+            Message(role="user", content=f"Question {i}", from_history=True),
+            Message(
+                role="assistant",
+                tool_calls=[{"id": f"call_{i}", "type": "function",
+                             "function": {"name": "search_knowledge_base", "arguments": "{}"}}],
+                from_history=True,
+            ),
+            Message(role="tool", tool_call_id=f"call_{i}", content="chunk " * 400, from_history=True),
+            Message(role="assistant", content=f"Answer {i}", from_history=True),
+        ]
+    messages.append(Message(role="user", content=current))
+    return messages
+
+
+def test_fit_history_under_budget_is_untouched():
+    messages = conversation(2)
+    fitted, before, after = fit_history(messages, max_tokens=100000)
+    assert fitted is messages
+    assert before == after
+
+
+def test_fit_history_compresses_old_tool_results_first():
+    messages = conversation(3)
+    _, before, _ = fit_history(messages, max_tokens=0)
+    # Room for everything except two of the three tool results
+    fitted, _, after = fit_history(messages, max_tokens=before - 1000)
+
+    assert after <= before - 1000
+    assert len(fitted) == len(messages)
+    tool_results = [m.content for m in fitted if m.role == "tool"]
+    assert tool_results[:2] == [OMITTED_TOOL_RESULT] * 2
+    assert tool_results[2] != OMITTED_TOOL_RESULT
+    # The stored messages are not modified
+    assert all(m.content != OMITTED_TOOL_RESULT for m in messages)
+
+
+def test_fit_history_drops_oldest_turns_and_keeps_current_run():
+    messages = conversation(4)
+    fitted, _, after = fit_history(messages, max_tokens=150)
+
+    assert after <= 150
+    assert fitted[0].role == "system"
+    assert fitted[-1].content == "What about tiles?"
+    # Turns are dropped whole, so no tool result is left without its call
+    call_ids = {c["id"] for m in fitted for c in (m.tool_calls or [])}
+    assert all(m.tool_call_id in call_ids for m in fitted if m.role == "tool")
+
+
+def test_fit_history_keeps_only_turns_not_covered_by_summary():
+    messages = conversation(4)
+    fitted, before, after = fit_history(messages, max_tokens=0, keep_turns=1)
+
+    assert [m.content for m in fitted if m.role == "user"] == ["Question 3", "What about tiles?"]
+    assert after < before
+
+
+def test_fit_documents_keeps_ranked_chunks_within_budget():
+    docs = [Document(content="word " * 400, id=str(i)) for i in range(5)]
+    kept, saved = fit_documents(docs, max_tokens=1100)
+
+    assert [d.id for d in kept] == ["0", "1"]
+    assert saved > 0
+    assert fit_documents(docs, max_tokens=0) == (docs, 0)
+
+
+def test_fit_documents_truncates_an_oversized_best_chunk():
+    kept, saved = fit_documents([Document(content="word " * 4000)], max_tokens=500)
+
+    assert len(kept) == 1
+    assert len(kept[0].content) <= 2000
+    assert saved > 0
+
+
+async def test_rolling_summary_is_served_from_the_worker_cache(monkeypatch):
+    monkeypatch.setattr(settings, "context_summary_enabled", True)
+    monkeypatch.setattr(rolling_summary, "get_engine", lambda: pytest.fail("summary read from Postgres"))
+    rolling_summary._records().set("s1", {"summary": "Wants a carpet quote in 3000.", "last_run_id": "r1"})
+    session = SimpleNamespace(
+        session_id="s1", summary=None, runs=[SimpleNamespace(run_id=f"r{i}") for i in range(4)]
+    )
+
+    await rolling_summary.load_rolling_summary(session, SimpleNamespace(run_id="r3"))
+    assert session.summary.summary == "Wants a carpet quote in 3000."
+    # r2 is the only history turn the summary does not cover
+    assert uncovered_history_turns.get() == 1
+
+
+async def test_rolling_summary_counts_history_turns_not_runs(monkeypatch):
+    monkeypatch.setattr(settings, "context_summary_enabled", True)
+    monkeypatch.setattr(settings, "context_summary_keep_turns", 1)
+    rolling_summary._records().set("s2", {"summary": "Asked about carpets.", "last_run_id": "r0"})
+
+    def run(run_id, agent_id="helpdesk", status=RunStatus.completed, parent_run_id=None):
+        return SimpleNamespace(
+            run_id=run_id, agent_id=agent_id, status=status, parent_run_id=parent_run_id,
+            input=None, content=None,
+        )
+
+    # Only r0, r3 and r5 are turns Agno replays for the helpdesk agent
+    runs = [
+        run("r0"), run("r1", status=RunStatus.error), run("r2", agent_id="general-assistant"),
+        run("r3"), run("r4", parent_run_id="r3"), run("r5"),
+    ]
+    session = SimpleNamespace(session_id="s2", summary=None, runs=[*runs, run("r6")])
+
+    await rolling_summary.load_rolling_summary(
+        session, SimpleNamespace(run_id="r6"), SimpleNamespace(id="helpdesk")
+    )
+    assert uncovered_history_turns.get() == 2
+
+    folded = []
+    monkeypatch.setattr(rolling_summary._summary_pool, "submit", lambda fn, *args: folded.append(args))
+    rolling_summary.update_rolling_summary(session.runs[-1], session)
+    rolling_summary._in_flight.discard("s2")
+    # The newest turn stays verbatim; the turns before it are folded
+    assert [run_id for run_id, _ in folded[0][2]] == ["r0", "r3", "r5"]
@@ -0,0 +1,85 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from agno.knowledge.embedder.base import Embedder
+
+from app.core.embedding_cache import CachingEmbedder
+
+
+@dataclass
+class _Embedder(Embedder):
+    """Deterministic embedder recording every upstream batch."""
+
+    dimensions: int = 3
+    batches: List[List[str]] = field(default_factory=list)
+
+    def get_embedding_and_usage(self, text):
+        embeddings, usages = self.get_embeddings_batch_and_usage([text])
+        return embeddings[0], usages[0]
+
+    def get_embeddings_batch_and_usage(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(t)), 0.0, 1.0] for t in texts], [{"tokens": len(t)} for t in texts]
+
+    async def async_get_embeddings_batch_and_usage(self, texts):
+        return self.get_embeddings_batch_and_usage(texts)
+
+
+class _PersistentCachingEmbedder(CachingEmbedder):
+    """CachingEmbedder whose Postgres tier is a dict."""
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.table: Dict[str, List[float]] = {}
+        self.db_lookups: List[List[str]] = []
+
+    def _db_get_many(self, keys):
+        self.db_lookups.append(list(keys))
+        return {key: self.table[key] for key in keys if key in self.table}
+
+    def _db_put_many(self, entries):
+        self.table.update(entries)
+
+
+def test_repeated_and_normalized_texts_are_embedded_once():
+    upstream = _Embedder()
+    embedder = CachingEmbedder(embedder=upstream, memory_size=10)
+
+    first, usage = embedder.get_embedding_and_usage("How much  is carpet cleaning?")
+    again, cached_usage = embedder.get_embedding_and_usage(" How much is carpet cleaning? ")
+    assert first == again
+    assert usage == {"tokens": 28} and cached_usage is None
+    assert upstream.batches == [["How much is carpet cleaning?"]]
+    assert (embedder.memory_hits, embedder.misses) == (1, 1)
+
+
+def test_memory_lru_falls_back_to_postgres_tier():
+    upstream = _Embedder()
+    embedder = _PersistentCachingEmbedder(embedder=upstream, memory_size=1)
+    embedder.get_embedding("a")
+    embedder.get_embedding("bb")  # Evicts "a" from memory
+
+    assert embedder.get_embedding("a") == [1.0, 0.0, 1.0]
+    assert upstream.batches == [["a"], ["bb"]]
+    assert embedder.stats()["db_hits"] == 1
+
+
+def test_batch_resolves_cached_texts_in_one_lookup():
+    upstream = _Embedder(batch_size=2)
+    embedder = _PersistentCachingEmbedder(embedder=upstream, memory_size=10)
+    embedder.get_embedding("a")
+    embedder.table[embedder.cache_key("bb")] = [9.0, 9.0, 9.0]
+    embedder.db_lookups.clear()
+
+    embeddings, _ = embedder.get_embeddings_batch_and_usage(["a", "bb", "ccc", "dddd", "eeeee", "ccc"])
+    assert embeddings[:2] == [[1.0, 0.0, 1.0], [9.0, 9.0, 9.0]]
+    assert embeddings[2] == embeddings[5]
+    # "a" came from memory; the other distinct keys in one Postgres query
+    assert len(embedder.db_lookups) == 1 and len(embedder.db_lookups[0]) == 4
+    # Only the misses go upstream, batch_size at a time
+    assert upstream.batches[1:] == [["ccc", "dddd"], ["eeeee"]]
+
+    async_embeddings, _ = asyncio.run(embedder.async_get_embeddings_batch_and_usage(["ccc", "eeeee"]))
+    assert async_embeddings == [embeddings[2], embeddings[4]]
+    assert len(upstream.batches) == 3
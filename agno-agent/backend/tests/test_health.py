@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from app.core import health
+from app.core.config import settings
+from app.core.model_router import get_circuit_breaker
+
+
+@pytest.mark.asyncio
+async def test_probes(monkeypatch):
+    probes = []
+
+    async def provider():
+        probes.append(1)
+        return {"ok": True, "status_code": 200}
+
+    async def database():
+        return {"ok": True}
+
+    monkeypatch.setattr(health, "_probe_provider", provider)
+    monkeypatch.setattr(health, "check_database", database)
+    monkeypatch.setattr(health, "_provider_check", None)
+    monkeypatch.setattr(settings, "model_fallbacks", [])
+
+    ready, body = await health.readiness()
+    assert ready and body["checks"]["models"]["available_models"] == [settings.openrouter_model]
+
+    # Not ready once every model of the chain is circuit-broken
+    breaker = get_circuit_breaker(settings.openrouter_model)
+    monkeypatch.setattr(type(breaker), "is_open", property(lambda self: True))
+    ready, body = await health.readiness()
+    assert not ready and body["checks"]["models"]["available_models"] == []
+    assert len(probes) == 1  # provider check reused within the TTL
+
+    # Not alive once a watched background task has died
+    monkeypatch.setattr(health, "_tasks", {})
+    task = asyncio.create_task(asyncio.sleep(0))
+    health.watch_task("session_flusher", task)
+    assert health.liveness()[0] is True
+    await task
+    assert health.liveness()[0] is False
+
+
+@pytest.mark.asyncio
+async def test_database_errors_are_not_exposed(monkeypatch):
+    def select_one():
+        raise ConnectionError('connection to server at "10.0.0.5", port 5432 failed for user "ai"')
+
+    monkeypatch.setattr(health, "_select_one", select_one)
+    assert await health.check_database() == {"ok": False, "error": "ConnectionError"}
@@ -0,0 +1,96 @@
+from app.core.config import settings
+from app.knowledge import index
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+    def scalar_one(self):
+        return self.value
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return []
+
+
+class _Engine:
+    """Records the statements of index builds against a table of ``rows`` chunks."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        text = str(statement)
+        self.statements.append(text)
+        if "extversion" in text:
+            return _Result("0.8.0")
+        return _Result(self.rows if text.startswith("SELECT count") else None)
+
+    def execution_options(self, **options):
+        return self
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def ddl(self):
+        return [s for s in self.statements if s.startswith(("CREATE", "DROP", "ALTER"))]
+
+
+def test_build_sizes_ivfflat_lists_from_row_count(monkeypatch):
+    monkeypatch.setattr(settings, "vector_index_type", "ivfflat")
+    monkeypatch.setattr(settings, "ivfflat_lists", 0)
+    monkeypatch.setattr(settings, "knowledge_scope_indexes", False)
+    engine = _Engine(rows=250_000)
+
+    status = index.build_index(engine)
+    vector_index, text_index = engine.ddl()
+    assert vector_index == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS common_knowledge_chunks_ivfflat_idx"
+        " ON ai.common_knowledge_chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 250)"
+    )
+    assert "USING gin (to_tsvector('english', content))" in text_index
+    assert "SET max_parallel_maintenance_workers = 2" in engine.statements
+    assert status["rows"] == 250_000 and status["configured"] == "common_knowledge_chunks_ivfflat_idx"
+
+
+def test_rebuild_swaps_in_a_concurrently_built_index(monkeypatch):
+    monkeypatch.setattr(settings, "vector_index_type", "hnsw")
+    monkeypatch.setattr(settings, "knowledge_scope_indexes", False)
+    engine = _Engine(rows=100)
+
+    index.rebuild_index(engine)
+    ddl = engine.ddl()
+    assert ddl[0] == "DROP INDEX CONCURRENTLY IF EXISTS ai.common_knowledge_chunks_hnsw_idx_new"
+    assert ddl[1].startswith("CREATE INDEX CONCURRENTLY IF NOT EXISTS common_knowledge_chunks_hnsw_idx_new")
+    assert "WITH (m = 16, ef_construction = 200)" in ddl[1]
+    # Every managed index (other types and quantizations) is dropped before the rename
+    drops = [s for s in ddl[2:] if s.startswith("DROP")]
+    assert "DROP INDEX CONCURRENTLY IF EXISTS ai.common_knowledge_chunks_ivfflat_halfvec_idx" in drops
+    assert ddl[2 + len(drops)] == (
+        "ALTER INDEX ai.common_knowledge_chunks_hnsw_idx_new RENAME TO common_knowledge_chunks_hnsw_idx"
+    )
+
+
+def test_scope_indexes_are_partial(monkeypatch):
+    monkeypatch.setattr(settings, "vector_index_type", "hnsw")
+    monkeypatch.setattr(settings, "knowledge_scope_indexes", True)
+    engine = _Engine(rows=100)
+
+    index.build_index(engine)
+    partial = [s for s in engine.ddl() if " WHERE " in s]
+    assert len(partial) == sum(len(names) for names in index.scope_index_names().values())
+    assert any(s.endswith("WHERE coalesce(meta_data ->> 'region', 'all') IN ('NSW', 'all')") for s in partial)
+    assert all(len(name) <= 63 for names in index.scope_index_names().values() for name in names.values())
@@ -0,0 +1,101 @@
+import zipfile
+
+import pytest
+
+from app.api import knowledge as knowledge_api
+from app.core.config import settings
+from app.core.embedding_cache import embed_texts
+from app.core.rate_limit import TokenBucket
+from app.knowledge.ingest import chunk_text, iter_sources, process_document
+
+
+def test_chunk_text_respects_size_and_overlap():
+    text = " ".join(f"word{i}" for i in range(500))
+    chunks = chunk_text(text, chunk_size=200, overlap=50)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    # Consecutive chunks overlap and no words are cut
+    assert chunks[0].split()[-1] in chunks[1]
+    assert all(word.startswith("word") for chunk in chunks for word in chunk.split())
+    assert chunk_text("  \n ", chunk_size=200, overlap=50) == []
+    with pytest.raises(ValueError):
+        chunk_text(text, chunk_size=100, overlap=100)
+
+
+def test_sources_from_directories_and_archives(tmp_path):
+    docs = tmp_path / "docs"
+    (docs / "nsw").mkdir(parents=True)
+    (docs / "nsw" / "faq.md").write_text("Opening hours")
+    (docs / "notes.txt").write_text("Carpet care")
+    (docs / "image.png").write_bytes(b"\x89PNG")
+    assert sorted(iter_sources(str(docs))) == [("notes.txt", b"Carpet care"), ("nsw/faq.md", b"Opening hours")]
+
+    archive = tmp_path / "docs.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("policies/refunds.txt", "Refunds within 7 days")
+        zf.writestr("logo.svg", "<svg/>")
+    assert list(iter_sources(str(archive))) == [("policies/refunds.txt", b"Refunds within 7 days")]
+    with pytest.raises(ValueError):
+        list(iter_sources(str(docs / "image.png")))
+
+
+def test_embed_texts_batches_through_the_async_api():
+    calls = []
+
+    class AsyncOnlyEmbedder:
+        async def async_get_embeddings_batch_and_usage(self, texts):
+            calls.append(texts)
+            return [[float(len(t))] for t in texts], [None] * len(texts)
+
+    embeddings, _ = embed_texts(AsyncOnlyEmbedder(), ["a", "bb", "ccc"])
+    assert embeddings == [[1.0], [2.0], [3.0]]
+    assert calls == [["a", "bb", "ccc"]]
+
+
+def test_token_bucket_reserves_ahead():
+    bucket = TokenBucket.per_minute(60)  # 1 token/s, burst of 60
+    assert bucket.try_acquire(60)
+    assert not bucket.try_acquire(1)
+    assert 1.9 < bucket.wait_time(2) <= 2.0
+
+
+def test_diff_only_touches_changed_chunks():
+    paragraphs = [f"Paragraph {i}. " + "carpet cleaning " * 20 for i in range(6)]
+    original = process_document("policy.txt", "\n".join(paragraphs).encode(), 400, 0)
+    stored = set(original.diff(set()).added)
+    assert len(stored) == len(original.chunks)
+
+    paragraphs[-1] = "Paragraph 5 was rewritten. " + "tile cleaning " * 20
+    updated = process_document("policy.txt", "\n".join(paragraphs).encode(), 400, 0)
+    diff = updated.diff(stored)
+
+    assert updated.content_id == original.content_id
+    assert diff.unchanged > 0
+    assert 0 < len(diff.added) < len(updated.chunks)
+    assert diff.removed and diff.removed <= stored
+
+
+def test_finished_ingestion_jobs_expire(monkeypatch):
+    class Pipeline:
+        def __init__(self, **_):
+            pass
+
+        def run(self, path):
+            raise FileNotFoundError(path)
+
+    monkeypatch.setattr(knowledge_api, "IngestionPipeline", Pipeline)
+    monkeypatch.setattr(knowledge_api, "_jobs_cache", None)
+    monkeypatch.setattr(settings, "ingest_job_history", 2)
+    monkeypatch.setattr(settings, "ingest_job_ttl", 0)
+
+    jobs = [{"job_id": str(i), "path": "/missing", "status": "running", "stats": None} for i in range(3)]
+    for job in jobs:
+        knowledge_api._jobs().set(job["job_id"], job)
+    # Bounded: the oldest job is dropped
+    assert knowledge_api._jobs().get("0") is None
+    assert knowledge_api._jobs().get("2") is jobs[2]
+
+    knowledge_api._run_job(jobs[2], knowledge_api.IngestRequest(path="/missing"))
+    assert jobs[2]["status"] == "failed"
+    assert knowledge_api._jobs().get("2") is None
+    assert knowledge_api._jobs().get("1") is jobs[1]
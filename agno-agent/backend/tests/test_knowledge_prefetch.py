@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from agno.knowledge.document import Document
+from agno.run.agent import RunInput
+
+from app.core.config import settings
+from app.knowledge.prefetch import (
+    finish_knowledge_prefetch,
+    start_knowledge_prefetch,
+    take_prefetched,
+)
+from app.knowledge.retrieval import RetrievalConfig
+
+
+def _take(*args):
+    return asyncio.run(take_prefetched(*args))
+
+
+class _Retriever:
+    def __init__(self):
+        self.config = RetrievalConfig(top_k=3)
+        self.release = threading.Event()
+        self.calls = []
+
+    def search(self, query, top_k=None, filters=None):
+        self.calls.append(query)
+        self.release.wait(5)
+        return [Document(id=f"d{i}", content=f"chunk {i}") for i in range(top_k)]
+
+
+def test_matching_search_is_served_from_prefetch(monkeypatch):
+    monkeypatch.setattr(settings, "knowledge_prefetch_enabled", True)
+    retriever = _Retriever()
+    agent = SimpleNamespace(id="helpdesk-assistant", knowledge_retriever=retriever)
+    run_context = SimpleNamespace(run_id="r1", knowledge_filters=None, session_state={})
+    message = "What is your cancellation policy for carpet cleaning bookings?"
+
+    start_knowledge_prefetch(RunInput(input_content=message), agent, run_context)
+    # Different words or more documents than prefetched: the run searches itself
+    assert _take(run_context, "opening hours", 3, None) is None
+    assert _take(run_context, "cancellation policy", 5, None) is None
+
+    retriever.release.set()
+    docs = _take(run_context, "Cancellation policy", 2, None)
+    assert [doc.id for doc in docs] == ["d0", "d1"]
+    assert retriever.calls == [message]
+
+    run_output = SimpleNamespace(metadata=None)
+    finish_knowledge_prefetch(run_output, run_context)
+    assert run_output.metadata["knowledge_prefetch"]["outcome"] == "hit"
+    # The prefetch belongs to its run only
+    assert _take(run_context, "cancellation policy", 2, None) is None
@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+
+from app.core.knowledge_base import get_vector_db
+from app.knowledge.replica import VectorReplica, _normalize, _State
+
+
+def _replica(vectors, owners):
+    replica = VectorReplica(get_vector_db(), get_vector_db().db_engine)
+    rows = [
+        {"id": f"c{i}", "name": "doc", "meta_data": {}, "content": f"chunk {i}", "usage": None, "user_id": owner}
+        for i, owner in enumerate(owners)
+    ]
+    replica._state = _State(
+        matrix=_normalize(vectors).astype(np.float16),
+        rows=rows,
+        owners=np.array(owners, dtype=object),
+        alive=np.ones(len(rows), dtype=bool),
+        index={row["id"]: i for i, row in enumerate(rows)},
+        signature="s",
+        built_at=time.time(),
+    )
+    return replica
+
+
+def test_exact_search_with_changes_and_owner_scope():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    owners = [None] * 190 + ["u1"] * 10
+    replica = _replica(vectors, owners)
+    queries = rng.normal(size=(3, 16))
+
+    results = replica.search_embeddings(queries, 5)
+    expected = np.argsort(-(_normalize(vectors) @ _normalize(queries).T), axis=0)[:5].T
+    assert [[row["id"] for row, _ in hits] for hits in results] == [[f"c{i}" for i in ids] for ids in expected]
+
+    # Shared rows plus the user's own rows only
+    scoped = replica.search_embeddings(queries, 200, user_id="u2")[0]
+    assert len(scoped) == 190
+
+    # An updated row is searched with its new vector, a deleted one is gone
+    best = results[0][0][0]["id"]
+    replica._state = replica._state.apply(
+        {"c5": ({**replica._state.rows[5], "content": "new"}, _normalize(queries[0]).astype(np.float32))},
+        removed={best},
+    )
+    top = replica.search_embeddings(queries[:1], 2)[0]
+    assert top[0][0]["content"] == "new" and best not in {row["id"] for row, _ in top}
+    assert replica.stats()["rows"] == 199
+
+
+def test_falls_back_to_pgvector_unless_in_sync():
+    replica = _replica(np.ones((2, 4), dtype=np.float32), [None, None])
+    # No confirmed change feed yet
+    assert replica.vector_search("carpet cleaning") is None
+    replica._heartbeat = time.monotonic()
+    assert replica.vector_search("carpet cleaning", filters={"source": "faq.md"}) is None
+    assert replica.stats()["fallbacks"] == 2
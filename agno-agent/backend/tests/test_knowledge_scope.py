@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+from agno.filters import EQ
+from sqlalchemy.dialects import postgresql
+
+from app.core.knowledge_base import get_vector_db
+from app.knowledge.scope import (
+    STATE_KEY,
+    classify_source,
+    remember_scope_hook,
+    scoped_filters,
+)
+
+
+def test_classify_source():
+    assert classify_source("policies/nsw/carpet-cleaning-faq.md") == {"region": "NSW", "service": "carpet_cleaning"}
+    assert classify_source("VIC_Tile_Cleaning.pdf") == {"region": "VIC", "service": "tile_cleaning"}
+    # "wa" inside a word is not a region; several services means general
+    assert classify_source("warranty/carpet_cleaning-vs-tile_cleaning.txt") == {"region": "all", "service": "all"}
+
+
+def test_price_lookup_scopes_later_searches():
+    run_context = SimpleNamespace(session_state={})
+    remember_scope_hook(
+        "price_lookup_tool", lambda **kwargs: "{}", {"service_type": "Tile Cleaning", "postcode": "3000"}, run_context
+    )
+    assert run_context.session_state[STATE_KEY] == {"region": "VIC", "service": "tile_cleaning"}
+
+    # Bulk lookups across regions keep only the shared service
+    remember_scope_hook(
+        "bulk_price_lookup_tool",
+        lambda **kwargs: "[]",
+        {"requests": [
+            {"service_type": "carpet_cleaning", "postcode": "2000"},
+            {"service_type": "carpet_cleaning", "postcode": "4000"},
+        ]},
+        run_context,
+    )
+    assert run_context.session_state[STATE_KEY] == {"region": "VIC", "service": "carpet_cleaning"}
+
+    filters = scoped_filters({"source": "faq.md"}, run_context.session_state)
+    assert [f.to_dict() for f in filters] == [
+        {"op": "EQ", "key": "source", "value": "faq.md"},
+        {"op": "IN", "key": "region", "values": ["VIC", "all"]},
+        {"op": "IN", "key": "service", "values": ["carpet_cleaning", "all"]},
+    ]
+    # An explicit scope filter wins over the session's
+    assert [f.key for f in scoped_filters([EQ("region", "SA")], run_context.session_state)] == ["region", "service"]
+    assert scoped_filters(None, {}) is None
+
+
+def test_scope_filters_match_partial_index_predicates():
+    vector_db = get_vector_db()
+    filters = scoped_filters(None, {STATE_KEY: {"region": "NSW"}})
+    condition = vector_db._dsl_to_sqlalchemy(filters[0].to_dict(), vector_db.table)
+    compiled = str(condition.compile(dialect=postgresql.dialect()))
+    assert compiled == "coalesce(meta_data ->> 'region', 'all') IN ('NSW', 'all')"
@@ -0,0 +1,53 @@
+from agno.exceptions import ContextWindowExceededError, ModelProviderError
+from agno.models.message import Message
+
+from app.core.model_router import (
+    CircuitBreaker,
+    RoutedOpenAIChat,
+    is_retryable,
+    is_simple_turn,
+)
+
+
+def test_simple_turns_are_greetings_and_short_price_questions():
+    assert is_simple_turn("Hi there!")
+    assert is_simple_turn("thanks")
+    assert is_simple_turn("How much for carpet cleaning 40 sqm in 3000?")
+    assert not is_simple_turn("How much does carpet cleaning cost?")  # No postcode
+    assert not is_simple_turn("Hi, my couch has a red wine stain, what can I do about it?")
+
+
+def test_fast_model_only_leads_the_chain_for_simple_turns():
+    model = RoutedOpenAIChat(id="primary", api_key="test", fallback_models=["backup"], fast_model="fast")
+    history = [Message(role="user", content="Hello", from_history=True)]
+
+    assert model.route([*history, Message(role="user", content="Hello")]) == ["fast", "primary", "backup"]
+    assert model.route([*history, Message(role="user", content="Why is my carpet still damp?")]) == [
+        "primary",
+        "backup",
+    ]
+
+
+def test_circuit_opens_after_consecutive_failures_and_probes_after_cooldown():
+    breaker = CircuitBreaker("m", failure_threshold=2, cooldown=0)
+    breaker.failure()
+    assert breaker.allow() and not breaker.is_open
+    breaker.failure()
+    assert breaker.is_open
+
+    # Cooldown elapsed: one probe goes through and its success closes the circuit
+    assert breaker.allow()
+    breaker.success()
+    assert not breaker.is_open
+
+    closed = CircuitBreaker("m", failure_threshold=1, cooldown=60)
+    closed.failure()
+    assert not closed.allow()
+
+
+def test_only_transient_provider_errors_fall_back():
+    assert is_retryable(ModelProviderError("down", status_code=503))
+    assert is_retryable(ModelProviderError("slow down", status_code=429))
+    assert not is_retryable(ModelProviderError("bad request", status_code=400))
+    assert not is_retryable(ContextWindowExceededError("too long"))
+    assert not is_retryable(ValueError("bug"))
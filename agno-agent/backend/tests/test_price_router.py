@@ -0,0 +1,63 @@
+import pytest
+
+from app.agents import price_router
+from app.agents.price_router import (
+    FastPathStats,
+    PriceQuery,
+    is_price_question,
+    parse_price_query,
+    render_quote,
+)
+
+
+def test_pure_quote_requests_are_parsed():
+    assert parse_price_query("How much for carpet cleaning 40 sqm in 3000?") == PriceQuery(
+        service_type="carpet_cleaning", postcode="3000", area_size=40.0
+    )
+    assert parse_price_query("quote for 2 couches, postcode 2000") == PriceQuery(
+        service_type="upholstery_cleaning", postcode="2000", item_count=2
+    )
+
+
+def test_anything_else_goes_to_the_agent():
+    assert parse_price_query("How much is carpet cleaning in 3000?") is None  # No area
+    assert parse_price_query("carpet cleaning 40 sqm") is None  # No postcode
+    assert parse_price_query("carpet and tile cleaning 40 sqm in 3000") is None
+    assert parse_price_query("Does carpet cleaning remove wine stains? 40 sqm in 3000") is None
+    # Seat counts are not item counts: one 3-seater sofa is not three items
+    assert parse_price_query("quote to clean a 3 seater sofa in 2000") is None
+    assert parse_price_query("3-seater couch 2000") is None
+
+
+def test_quote_wording():
+    query = PriceQuery(service_type="carpet_cleaning", postcode="3000", area_size=40.0)
+    answer = render_quote(
+        query, {"available": True, "region": "Melbourne", "final_price": 1234.5, "currency": "AUD"}
+    )
+    assert "$1,234.50 AUD" in answer and "Melbourne" in answer
+    assert render_quote(query, {"available": False, "region": None}) is None
+
+
+def test_seconds_saved_compares_with_price_questions_only():
+    assert is_price_question("How much for a 3 seater sofa in 2000?")
+    assert not is_price_question("My carpet is still damp after the clean")
+
+    stats = FastPathStats("helpdesk-assistant")
+    stats.record_fallback(2.0, price_question=True)
+    stats.record_fallback(30.0, price_question=False)  # A long conversation turn
+    stats.record_answer(0.5)
+    assert stats.stats()["fallbacks"] == 2
+    assert stats.stats()["avg_agent_run_ms"] == 2000.0
+    assert stats.stats()["seconds_saved"] == 1.5
+
+
+@pytest.mark.asyncio
+async def test_fast_path_answers_carry_cors_headers(async_client, monkeypatch):
+    monkeypatch.setattr(price_router, "record_run", lambda *args: None)
+    response = await async_client.post(
+        "/agents/helpdesk-assistant/runs",
+        data={"message": "How much for carpet cleaning 40 sqm in 3000?"},
+        headers={"Origin": "http://localhost:3000"},
+    )
+    assert response.headers["X-Fast-Path"] == "pricing"
+    assert response.headers["Access-Control-Allow-Origin"] == "http://localhost:3000"
@@ -0,0 +1,124 @@
+import os
+import threading
+
+import pytest
+
+from app.agents.pricing import compile_pricing
+from app.agents.tools import (
+    POSTCODE_REGIONS,
+    PRICING_RULES,
+    lookup_price,
+    lookup_prices,
+)
+from app.api import pricing as pricing_api
+from app.core.auth import get_current_user, verify_admin
+from app.main import app
+
+
+def reference_price(service_type, postcode, area_size=None, item_count=None):
+    """The original dict-walking implementation of lookup_price."""
+    service_type = service_type.lower().replace(" ", "_")
+    if service_type not in PRICING_RULES:
+        return {
+            "available": False,
+            "error": f"Service type '{service_type}' not found. Available services: {', '.join(PRICING_RULES.keys())}"
+        }
+    region = None
+    try:
+        for range_str, name in POSTCODE_REGIONS.items():
+            start, end = map(int, range_str.split("-"))
+            if start <= int(postcode) <= end:
+                region = name
+                break
+    except ValueError:
+        pass
+    if not region:
+        return {"available": False, "error": f"Invalid postcode '{postcode}' or region not supported"}
+    pricing = PRICING_RULES[service_type]
+    region_info = pricing["regions"].get(region)
+    if not region_info or not region_info["available"]:
+        return {
+            "available": False,
+            "error": f"Service '{service_type}' is not available in {region}",
+            "region": region
+        }
+    variable_cost = 0.0
+    if "per_sqm" in pricing and area_size:
+        variable_cost = pricing["per_sqm"] * area_size
+    elif "per_item" in pricing and item_count:
+        variable_cost = pricing["per_item"] * item_count
+    return {
+        "available": True,
+        "service_type": service_type,
+        "region": region,
+        "base_price": pricing["base_price"],
+        "variable_cost": variable_cost,
+        "regional_multiplier": region_info["multiplier"],
+        "final_price": round((pricing["base_price"] + variable_cost) * region_info["multiplier"], 2),
+        "currency": "AUD"
+    }
+
+
+REQUESTS = [
+    {"service_type": service, "postcode": postcode, "area_size": area, "item_count": items}
+    for service in [*PRICING_RULES, "Carpet Cleaning", "window_cleaning"]
+    for postcode in ["2000", "3999", "4500", "5000", "6999", "0800", "7000", "abc", "12000"]
+    for area, items in [(None, None), (25.5, None), (None, 3), (10, 2)]
+]
+
+
+def test_lookup_price_matches_original_implementation():
+    for req in REQUESTS:
+        assert lookup_price(**req) == reference_price(**req), req
+
+
+def test_batch_lookup_matches_single_lookups():
+    assert lookup_prices(REQUESTS) == [lookup_price(**req) for req in REQUESTS]
+
+
+def test_narrow_postcode_ranges_override_wide_ones():
+    table = compile_pricing(PRICING_RULES, {
+        "2000-2999": "NSW",
+        "2010-2019": {"region": "NSW", "multiplier": 1.5},
+    })
+    assert table.quote("carpet_cleaning", "2015")["regional_multiplier"] == (
+        table.quote("carpet_cleaning", "2500")["regional_multiplier"] * 1.5
+    )
+    assert table.region_for("2015") == "NSW"
+
+
+@pytest.mark.asyncio
+async def test_bulk_quotes_are_priced_off_the_event_loop(async_client, monkeypatch):
+    threads = []
+
+    def lookup(requests):
+        threads.append(threading.get_ident())
+        return lookup_prices(requests)
+
+    monkeypatch.setattr(pricing_api, "lookup_prices", lookup)
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: {"sub": "user-1"})
+    response = await async_client.post(
+        "/api/v1/pricing/quotes", json={"items": [{"service_type": "tile_cleaning", "postcode": "2000", "area_size": 10}]}
+    )
+    assert response.status_code == 200
+    assert response.json()["quotes"] == [lookup_price("tile_cleaning", "2000", area_size=10)]
+    assert threads and threads[0] != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_reload_is_broadcast_to_the_other_workers(async_client, monkeypatch):
+    broadcasts = []
+    monkeypatch.setattr(pricing_api, "broadcast_pricing_reload", lambda: broadcasts.append(1))
+    monkeypatch.setitem(app.dependency_overrides, verify_admin, lambda: {"sub": "admin"})
+
+    body = (await async_client.post("/api/v1/pricing/reload")).json()
+    assert body["worker"] == os.getpid() and body["broadcast"] is True
+    assert broadcasts == [1]
+
+    def unreachable():
+        raise ConnectionError("database is down")
+
+    # The local reload still succeeds without the database
+    monkeypatch.setattr(pricing_api, "broadcast_pricing_reload", unreachable)
+    body = (await async_client.post("/api/v1/pricing/reload")).json()
+    assert body["services"] == len(PRICING_RULES) and body["broadcast"] is False
@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.responses import PlainTextResponse
+
+from app.core import response_cache
+from app.core.response_cache import (
+    ResponseCache,
+    ResponseCacheMiddleware,
+    cache_response_hook,
+)
+
+
+class _Result:
+    def __init__(self, row):
+        self.row = row
+
+    def one(self):
+        return self.row
+
+    def first(self):
+        return self.row
+
+
+class _Engine:
+    """Records statements; answers knowledge fingerprints and nearest-answer queries."""
+
+    def __init__(self):
+        self.statements = []
+        self.knowledge_rows = 3
+        self.nearest = None
+
+    def execute(self, statement, params=None):
+        text = str(statement)
+        self.statements.append(text)
+        if "string_agg" in text:
+            return _Result(SimpleNamespace(n=self.knowledge_rows, digest="d"))
+        if text.startswith("SELECT id, response"):
+            return _Result(self.nearest)
+        return _Result(None)
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    connect = begin
+
+
+def _cache(engine):
+    cache = ResponseCache(engine, dimensions=3, similarity=0.9, ttl=60, max_entries=10)
+    cache._table_ready = True
+    return cache
+
+
+def test_lookup_threshold_and_invalidation_on_knowledge_change():
+    engine = _Engine()
+    cache = _cache(engine)
+
+    engine.nearest = SimpleNamespace(id=1, response="We open at 8am.", similarity=0.95)
+    assert cache.lookup("helpdesk-assistant", [0.1, 0.2, 0.3]) == "We open at 8am."
+    engine.nearest = SimpleNamespace(id=1, response="We open at 8am.", similarity=0.85)
+    assert cache.lookup("helpdesk-assistant", [0.1, 0.2, 0.3]) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Stale answers are purged once per knowledge version
+    assert sum(s.startswith("DELETE") for s in engine.statements) == 1
+
+    engine.knowledge_rows = 4
+    cache._version_cache.clear()
+    cache.lookup("helpdesk-assistant", [0.1, 0.2, 0.3])
+    assert sum(s.startswith("DELETE") for s in engine.statements) == 2
+
+
+def test_store_trims_to_max_entries():
+    engine = _Engine()
+    cache = _cache(engine)
+    cache.store("helpdesk-assistant", "  What are your   hours? ", [0.1, 0.2, 0.3], "8am to 6pm.")
+    insert, trim = [s for s in engine.statements if "string_agg" not in s]
+    assert insert.startswith("INSERT INTO ai.agent_response_cache")
+    assert "OFFSET :max_entries" in trim
+    assert cache.stats()["stored"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hook_caches_knowledge_answers_only(monkeypatch):
+    stored = []
+    monkeypatch.setattr(response_cache, "_store", lambda *args: stored.append(args))
+
+    def run(*tools):
+        return SimpleNamespace(
+            run_id="r1",
+            agent_id="helpdesk-assistant",
+            content="We open at 8am.",
+            input=SimpleNamespace(input_content="When do you open?"),
+            tools=[SimpleNamespace(tool_name=name) for name in tools],
+        )
+
+    await cache_response_hook(run("search_knowledge_base"), session=SimpleNamespace(runs=[]))
+    await cache_response_hook(run("search_knowledge_base", "price_lookup_tool"))
+    # Later turns depend on the conversation
+    await cache_response_hook(run(), session=SimpleNamespace(runs=[SimpleNamespace(run_id="r0")]))
+    assert stored == [("helpdesk-assistant", "When do you open?", "We open at 8am.")]
+
+
+@pytest.mark.asyncio
+async def test_hit_is_answered_and_recorded_in_a_new_session(monkeypatch):
+    recorded = []
+    cache = SimpleNamespace(lookup=lambda agent_id, embedding: "We open at 8am.")
+    monkeypatch.setattr(response_cache, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(response_cache, "_embed", lambda message: [0.1, 0.2, 0.3])
+    monkeypatch.setattr(response_cache, "record_run", lambda *args: recorded.append(args))
+
+    app = ResponseCacheMiddleware(PlainTextResponse("agent"), agent_ids=["helpdesk-assistant"])
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/agents/helpdesk-assistant/runs", data={"message": "When do you open?"})
+        other = await client.post("/agents/general-assistant/runs", data={"message": "When do you open?"})
+
+    body = response.json()
+    assert response.headers["X-Response-Cache"] == "hit"
+    assert body["content"] == "We open at 8am." and body["session_id"]
+    _, session_id, _, run_id, message, _, metadata = recorded[0]
+    assert (session_id, run_id) == (body["session_id"], body["run_id"])
+    assert (message, metadata) == ("When do you open?", {"response_cache": "hit"})
+    assert other.text == "agent"
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+from agno.knowledge.document import Document
+
+from app.knowledge.retrieval import (
+    HybridRetriever,
+    RetrievalConfig,
+    reciprocal_rank_fusion,
+)
+
+
+def _docs(*ids):
+    return [Document(id=doc_id, content=f"chunk {doc_id}") for doc_id in ids]
+
+
+class _VectorDb:
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+
+    def vector_search(self, query, limit, filters=None):
+        self.calls.append(("vector", limit))
+        self.threads.add(threading.get_ident())
+        return _docs("a", "b", "c")[:limit]
+
+    def keyword_search(self, query, limit, filters=None):
+        self.calls.append(("keyword", limit))
+        self.threads.add(threading.get_ident())
+        return _docs("c", "d")[:limit]
+
+
+class _Reranker:
+    def rerank(self, query, documents, top_k):
+        return sorted(documents, key=lambda doc: doc.id, reverse=True)[:top_k]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([_docs("a", "b", "c"), _docs("c", "d")], rrf_k=60)
+    # "c" is in both lists, the rest keep their rank order
+    assert [doc.id for doc in fused] == ["c", "a", "b", "d"]
+
+
+def test_search_modes():
+    vector_db = _VectorDb()
+    config = RetrievalConfig(mode="vector", candidates=30, top_k=2)
+    assert [doc.id for doc in HybridRetriever(vector_db, config).search("q")] == ["a", "b"]
+    # Single-source search without re-ranking only fetches top_k
+    assert vector_db.calls == [("vector", 2)]
+
+    vector_db.calls.clear()
+    config = RetrievalConfig(mode="hybrid", candidates=30, top_k=3, rerank=True)
+    retriever = HybridRetriever(vector_db, config, reranker=_Reranker())
+    assert [doc.id for doc in retriever.search("q")] == ["d", "c", "b"]
+    assert sorted(vector_db.calls) == [("keyword", 30), ("vector", 30)]
+
+
+def test_agent_searches_run_off_the_event_loop():
+    vector_db = _VectorDb()
+    retriever = HybridRetriever(vector_db, RetrievalConfig(mode="keyword", top_k=5))
+
+    async def search():
+        return threading.get_ident(), await retriever(query="q", num_documents=1)
+
+    loop_thread, docs = asyncio.run(search())
+    assert [doc["content"] for doc in docs] == ["chunk c"]
+    assert loop_thread not in vector_db.threads
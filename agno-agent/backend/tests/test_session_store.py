@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from agno.run.agent import RunOutput
+from agno.session.agent import AgentSession
+
+from app.core.database import InstrumentedPostgresDb, get_engine
+from app.core.session_store import SessionStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """SessionStore whose Postgres reads/writes are recorded instead of executed."""
+    rows = {"s1": AgentSession(session_id="s1", user_id="u1", runs=[RunOutput(run_id="r0", session_id="s1")])}
+    calls = []
+    monkeypatch.setattr(
+        InstrumentedPostgresDb,
+        "get_session",
+        lambda self, session_id, *args, **kwargs: calls.append(("load", session_id)) or rows.get(session_id),
+    )
+    monkeypatch.setattr(
+        InstrumentedPostgresDb,
+        "upsert_session",
+        lambda self, session, deserialize=True: calls.append(("session", session.session_id)) or session,
+    )
+    monkeypatch.setattr(
+        InstrumentedPostgresDb,
+        "upsert_run",
+        lambda self, run, session_id, user_id=None, run_index=None: calls.append(("run", run.run_id)),
+    )
+    store = SessionStore(id="agent-db", db_engine=get_engine(), session_table="agent_sessions")
+    store.calls = calls
+    return store
+
+
+def _turn(store, run_id, state):
+    session = store.get_session("s1")
+    session.session_data = {"session_state": state}
+    run = RunOutput(run_id=run_id, session_id="s1")
+    session.runs.append(run)
+    store.upsert_session(session)
+    store.upsert_run(run, session_id="s1", user_id="u1")
+    return session
+
+
+def test_hot_sessions_are_read_once(store):
+    _turn(store, "r1", {"recent_topics": ["carpet"]})
+    first = _turn(store, "r2", {"recent_topics": ["carpet", "tiles"]})
+    first.session_data["session_state"]["recent_topics"].append("changed after save")
+
+    session = store.get_session("s1")
+    assert [run.run_id for run in session.runs] == ["r0", "r1", "r2"]
+    assert session.session_data == {"session_state": {"recent_topics": ["carpet", "tiles"]}}
+    assert [run.run_id for run in store.get_session("s1", runs_limit=1).runs] == ["r2"]
+    assert store.get_session("s1", user_id="someone-else") is None
+    # Without the flusher every change is written through
+    assert store.calls == [
+        ("load", "s1"), ("session", "s1"), ("run", "r1"), ("session", "s1"), ("run", "r2"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_writes_are_deferred_until_the_response_is_sent(store, monkeypatch):
+    async def persist(session_ids=None):
+        store.flush(session_ids)
+
+    monkeypatch.setattr(store, "aflush", persist)
+    await store.start()
+    store.hold("s1")
+    _turn(store, "r1", {})
+    _turn(store, "r2", {})
+    await asyncio.sleep(0.3)
+    assert store.calls == [("load", "s1")]
+
+    store.release("s1")
+    await asyncio.sleep(0.05)
+    # Both turns are persisted in one coalesced write
+    assert store.calls[1:] == [("session", "s1"), ("run", "r1"), ("run", "r2")]
+    await store.stop()
+    assert store.stats()["pending"] == 0
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def search(query):
+        calls.append(query)
+        release.wait(5)
+        return [query.upper()]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(flight.do, "spot removal", search, "spot removal") for _ in range(8)]
+        while flight.leaders + flight.followers < 8:
+            pass
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert calls == ["spot removal"]
+    assert all(result == ["SPOT REMOVAL"] for result, _ in results)
+    assert sum(shared for _, shared in results) == 7
+    assert flight.stats()["fan_out"] == 8.0
+    # Nothing is cached once the call is done
+    assert flight.do("spot removal", search, "again") == (["AGAIN"], False)
+
+
+def test_leader_error_is_raised_to_followers():
+    flight = SingleFlight("test")
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        while flight.followers < 1:
+            pass
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", failing)
+        started.wait(5)
+        follower = pool.submit(flight.do, "key", failing)
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+
+
+@pytest.mark.asyncio
+async def test_async_calls_are_coalesced_per_key():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def embed(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return len(text)
+
+    results = await asyncio.gather(
+        flight.ado("a", embed, "tiles"),
+        flight.ado("a", embed, "tiles"),
+        flight.ado("b", embed, "carpet"),
+    )
+
+    assert calls == ["tiles", "carpet"]
+    assert results == [(5, False), (5, True), (6, False)]
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+
+# Runs in a fresh interpreter: the test session has imported everything already
+_IMPORT_APP = """
+import json, sys
+import app.main
+from app.core.startup import get_startup_timings
+print(json.dumps({"timings": list(get_startup_timings()), "numpy": "numpy" in sys.modules}))
+"""
+
+# Modules outside the app and agents do not need the environment to import
+_IMPORT_WITHOUT_SETTINGS = """
+import app.api.pricing, app.api.system, app.core.auth, app.core.rolling_summary
+from app.core.config import get_settings
+try:
+    get_settings()
+except ValueError:
+    print("missing settings")
+"""
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_startup_is_timed_per_component_without_numpy():
+    env = dict(os.environ, KNOWLEDGE_REPLICA_ENABLED="false")
+    output = subprocess.run(
+        [sys.executable, "-c", _IMPORT_APP],
+        capture_output=True, text=True, check=True, env=env,
+        cwd=_BACKEND,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert result["timings"] == [
+        "import.config",
+        "import.fastapi",
+        "import.agno_os",
+        "import.database",
+        "import.api",
+        "import.middleware",
+        "imports.total",
+        "agents",
+        "agent_os",
+        "app",
+    ]
+    # Pricing tables and the replica load NumPy on first use
+    assert result["numpy"] is False
+
+
+def test_settings_are_loaded_on_first_use():
+    env = {name: value for name, value in os.environ.items() if name not in (
+        "SUPABASE_URL", "SUPABASE_SERVICE_KEY", "PGVECTOR_DB_URL", "OPENAI_API_KEY", "OPENROUTER_API_KEY",
+    )}
+    output = subprocess.run(
+        [sys.executable, "-c", _IMPORT_WITHOUT_SETTINGS],
+        capture_output=True, text=True, check=True, env=env, cwd=_BACKEND,
+    ).stdout
+    assert output.strip() == "missing settings"
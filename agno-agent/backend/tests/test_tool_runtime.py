@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+from app.core.tool_runtime import agent_tool, get_tool_cache_stats
+
+
+def test_compact_cached_output():
+    calls = []
+
+    @agent_tool(cache_ttl=60, name="quote_tool")
+    def quote(service_type: str, postcode: str) -> dict:
+        """Quote a service."""
+        calls.append(service_type)
+        return {"service_type": service_type.strip().lower(), "multiplier": 1.05 * 1.1, "note": None}
+
+    first = asyncio.run(quote.entrypoint(service_type="Tile ", postcode="3000"))
+    again = asyncio.run(quote.entrypoint(service_type=" tile", postcode="3000"))
+    assert first == again == '{"service_type":"tile","multiplier":1.155}'
+    assert calls == ["Tile "]
+    assert get_tool_cache_stats()["quote_tool"]["hits"] == 1
+
+
+def test_blocking_tools_of_one_turn_overlap():
+    @agent_tool()
+    def slow_lookup(key: str) -> dict:
+        """Blocking lookup."""
+        time.sleep(0.2)
+        return {"key": key}
+
+    async def turn():
+        return await asyncio.gather(*(slow_lookup.entrypoint(key=str(i)) for i in range(4)))
+
+    started = time.perf_counter()
+    outputs = asyncio.run(turn())
+    assert outputs == [f'{{"key":"{i}"}}' for i in range(4)]
+    assert time.perf_counter() - started < 0.6